@@ -1,4 +1,5 @@
 import asyncio
+import importlib
 import json
 import typer
 from datetime import datetime
@@ -7,29 +8,45 @@ from pathlib import Path
 from rich import print
 from rich.console import Console
 from rich.table import Table
+from typer.core import TyperGroup
+
+from typing import Annotated, Optional, TYPE_CHECKING
 
-from big5_databases.databases.db_models import DBCollectionTask
-from src.system_notify import send_notify
-from tools.env_root import root
-from typing import Annotated, Optional, Any
-
-from big5_databases.databases.c_db_merge import merge_database
-from big5_databases.databases.db_merge import DBMerger
-from big5_databases.databases.db_mgmt import DatabaseManager
-from big5_databases.databases.db_stats import generate_db_stats
-from big5_databases.databases.db_utils import reset_task_states
-from big5_databases.databases.external import CollectionStatus, DBConfig, SQliteConnection, DBStats
-from big5_databases.databases.meta_database import add_db, MetaDatabase
 from src.const import BASE_DATA_PATH, BIG5_CONFIG
-from src.platform_orchestration import PlatformOrchestrator
-from big5_databases.commands import app as db_app
 
-app = typer.Typer(name="Platform-Collection commands",
+if TYPE_CHECKING:
+    from big5_databases.databases.db_mgmt import DatabaseManager
+
+# the commands import their modules (clients, sqlalchemy models, orchestrator) when they run,
+# so that the cli starts fast and commands like status only load what they use
+
+# name -> (module with a typer app, help). imported when they are called (or listed in the help)
+LAZY_SUB_APPS: dict[str, tuple[str, str]] = {
+    ".db": ("big5_databases.commands", "Commands for database management and stats"),
+}
+
+
+class LazySubAppGroup(TyperGroup):
+    """
+    resolves the sub apps of LAZY_SUB_APPS when click looks up the command (python main.py, typer main.py run)
+    """
+
+    def list_commands(self, ctx: typer.Context) -> list[str]:
+        return super().list_commands(ctx) + [name for name in LAZY_SUB_APPS if name not in self.commands]
+
+    def get_command(self, ctx: typer.Context, cmd_name: str):
+        if cmd_name not in self.commands and cmd_name in LAZY_SUB_APPS:
+            module, help_text = LAZY_SUB_APPS[cmd_name]
+            wrapper = typer.Typer()
+            wrapper.add_typer(importlib.import_module(module).app, name=cmd_name, help=help_text)
+            self.add_command(typer.main.get_command(wrapper).commands[cmd_name], cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+
+app = typer.Typer(name="Platform-Collection commands", cls=LazySubAppGroup,
                   short_help="Information and process commands for platform collection")
 console = Console()
 
-app.add_typer(db_app, name=".db", help="Commands for database management and stats")
-
 
 # cuz Typer does not work with literals
 class TimeWindow(str, Enum):
@@ -40,18 +57,41 @@ class TimeWindow(str, Enum):
 
 @app.command(short_help="Get the number of posts, and tasks statuses of all specified databases (RUN_CONFIG)")
 def database_names():
-    orchestrator = PlatformOrchestrator()
-    for platform, manager in orchestrator.platform_managers.items():
-        print(platform, manager.platform_db.db_config.connection_str)
+    from src.status import run_config_db_configs
+    for platform, db_config in run_config_db_configs().items():
+        print(platform, db_config.connection_str)
 
 
 @app.command(short_help="Get the number of posts, and tasks statuses of all specified databases (RUN_CONFIG)")
 def status(task_status: bool = True,
-           database: Optional[Path] = None):
-    results: list[dict[str, Any]] = MetaDatabase().general_databases_status(task_status)
-    table = Table(*list(results[0].keys()))
-    for r in results:
-        table.add_row(*r.values())
+           database: Annotated[Optional[list[Path]], typer.Option(
+               help="database files (instead of the RUN_CONFIG databases)")] = None,
+           fast: Annotated[bool, typer.Option(
+               help="number of posts from the post counters (or estimated) instead of counting them")] = False,
+           workers: Annotated[int, typer.Option(help="databases that are scanned in parallel")] = 8):
+    from rich.live import Live
+    from src.status import scan_databases, run_config_databases, TASK_STATUS_TYPES
+
+    databases = [(None, db_path) for db_path in database] if database else run_config_databases()
+    columns = ["platform", "total", "size", "path"] + (TASK_STATUS_TYPES if task_status else [])
+    table = Table(*columns)
+    # rows are added as the databases are done
+    with Live(table, console=console, refresh_per_second=4):
+        for row in scan_databases(databases, task_status, fast, workers):
+            table.add_row(*[str(row[c]) for c in columns])
+
+
+@app.command(short_help="Set the post counters (status --fast) of the databases (RUN_CONFIG) to the exact counts")
+def reconcile_counts(database: Annotated[Optional[list[Path]], typer.Option(
+    help="database files (instead of the RUN_CONFIG databases)")] = None):
+    from src.post_counter import reconcile_post_counter
+    from src.status import run_config_databases
+
+    db_paths = database if database else [db_path for _, db_path in run_config_databases()]
+    table = Table("path", "counter", "posts")
+    for db_path in db_paths:
+        before, count = reconcile_post_counter(db_path)
+        table.add_row(str(db_path), "-" if before is None else str(before), str(count))
     console.print(table)
 
 
@@ -59,38 +99,25 @@ def complete_path(current: str):
     return [sub.name for sub in Path(current).glob("*")]
 
 
-@app.command(short_help="Get the stats of a database. monthly or daily count")
+@app.command(short_help="Get the stats of a database. monthly or daily count. "
+                        "The first run writes a post histogram into the database (tables, trigger, a full scan)")
 def db_stats(
         db_path: Annotated[Optional[Path], typer.Argument(help="Path to sqlite database")] = None,
         period: Annotated[TimeWindow, typer.Option(help="day,month,year")] = TimeWindow.DAY,
-        use_last_if_available: bool = typer.Option(True),
+        full: Annotated[bool, typer.Option(help="recount all posts, instead of the posts since the last update")] = False,
         store: bool = True):
-    def stats_for(db: DatabaseManager):
-        stats_dir = BASE_DATA_PATH / f"stats"
-        stats_dir.mkdir(parents=True, exist_ok=True)
-        db_path = db.config.db_connection.db_path
-        create_stats = not use_last_if_available
-        stats = None
-        if not create_stats:
-            stats_files = list(stats_dir.glob(f"{db_path.stem}-*.json"))
-            if len(stats_files) >= 1:
-                stats_file = sorted(stats_files)[-1]
-                stats = DBStats.model_validate(json.load(stats_file.open()))
-            else:
-                create_stats = True
-        if create_stats:
-            stats = generate_db_stats(db, period)
-        print(stats.model_dump())
-        if store and create_stats:
-            dest = stats_dir / f"{db_path.stem}-{datetime.now():%Y%m%d_%H%M}.json"
-            json.dump(stats.model_dump(), dest.open("w", encoding="utf-8"), indent=2)
-
-    if not db_path:
-        orchestrator = PlatformOrchestrator()
-        for platform, manager in orchestrator.platform_managers.items():
-            stats_for(manager.platform_db.db_mgmt)
-    else:
-        stats_for(DatabaseManager.sqlite_db_from_path(db_path, False))
+    from big5_databases.databases.db_mgmt import DatabaseManager
+    from src.incremental_stats import update_stats
+    from src.status import run_config_databases
+
+    db_paths = [db_path] if db_path else [path for _, path in run_config_databases()]
+    for path in db_paths:
+        stats = update_stats(DatabaseManager.sqlite_db_from_path(path, False), period.value, full, store)
+        table = Table(period.value, "posts", title=stats.db_path)
+        for bucket, count in stats.counts.items():
+            table.add_row(bucket, str(count))
+        console.print(table)
+        print(f"total: {stats.total_posts}, counted up to post id: {stats.max_post_id}")
 
 
 # todo, use Enum
@@ -101,6 +128,7 @@ def autocomplete_conflict_types() -> list[str]:
 @app.command(short_help="Check the posts,tasks of two databases for orverlaps")
 def check_conflicts(item_type: Annotated[str, typer.Option(autocompletion=autocomplete_conflict_types)],
                     db1: Path, db2: Path):
+    from big5_databases.databases.db_merge import DBMerger
     if item_type == "post":
         conflicts = DBMerger.find_conflicting_posts([db1, db2])
     else:
@@ -113,9 +141,226 @@ def check_conflicts(item_type: Annotated[str, typer.Option(autocompletion=autoco
     json.dump(conflicts, dest_file.open("w", encoding="utf-8"))
 
 
+class Granularity(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+    MONTH = "month"
+    YEAR = "year"
+
+
+class KeepDuplicate(str, Enum):
+    OLDEST = "oldest"
+    NEWEST = "newest"
+    RICHEST = "richest"
+
+
+@app.command(short_help="Remove duplicate posts (same platform_id) of a database")
+def dedupe(db_path: Annotated[Path, typer.Argument(help="Path to sqlite database")],
+           keep: Annotated[KeepDuplicate, typer.Option(help="oldest/newest (insertion) or richest (longest content)")] = KeepDuplicate.OLDEST,
+           dry_run: Annotated[bool, typer.Option(help="only report the duplicates")] = True,
+           col: str = "platform_id",
+           batch_size: int = 5000):
+    from big5_databases.databases.db_mgmt import DatabaseManager
+    from src.scripts.find_db_duplicates import find_duplicates
+    report = find_duplicates(DatabaseManager.sqlite_db_from_path(db_path, False), col,
+                             dry=dry_run, keep=keep.value, batch_size=batch_size)
+    table = Table(col, "rows")
+    for value, count in report.examples:
+        table.add_row(str(value), str(count))
+    console.print(table)
+    action = "Would remove" if dry_run else "Removed"
+    print(f"{report.duplicate_groups} duplicate values. {action} {report.rows_to_remove if dry_run else report.removed} rows")
+    if report.removed:
+        from src.post_histogram import histogram_exists, rebuild_histogram
+        db = DatabaseManager.sqlite_db_from_path(db_path, False)
+        if histogram_exists(db):
+            rebuild_histogram(db)
+
+
+@app.command(short_help="Posts per hour/day/month/year from the post histogram of the databases (RUN_CONFIG)")
+def histogram(db_path: Annotated[Optional[Path], typer.Option(help="use this database instead of RUN_CONFIG")] = None,
+              granularity: Annotated[Granularity, typer.Option()] = Granularity.MONTH,
+              from_time: Annotated[Optional[datetime], typer.Option()] = None,
+              to_time: Annotated[Optional[datetime], typer.Option()] = None,
+              rebuild: Annotated[bool, typer.Option(help="recount all posts")] = False):
+    from src.coverage import BUCKET_FORMAT
+    from src.post_histogram import histogram_counts, rebuild_histogram, update_histogram
+    if db_path:
+        from big5_databases.databases.db_mgmt import DatabaseManager
+        databases = [DatabaseManager.sqlite_db_from_path(db_path, False)]
+    else:
+        from src.platform_orchestration import PlatformOrchestrator
+        databases = [m.platform_db.db_mgmt for m in PlatformOrchestrator().platform_managers.values()]
+    for db in databases:
+        if rebuild:
+            print(f"{db.config.db_connection.db_path}: {rebuild_histogram(db)} hours")
+        else:
+            update_histogram(db)
+        table = Table(granularity.value, "posts", title=str(db.config.db_connection.db_path))
+        for bucket, count in sorted(histogram_counts(db, granularity.value, from_time, to_time).items()):
+            table.add_row(bucket.strftime(BUCKET_FORMAT[granularity.value]), str(count))
+        console.print(table)
+
+
+@app.command(short_help="Number of posts per label (metadata_content.labels) of a database, remove a label")
+def labels(db_path: Path,
+           remove: Annotated[Optional[str], typer.Option(help="remove this label from all posts")] = None,
+           rebuild: Annotated[bool, typer.Option(help="rebuild the label index from metadata_content")] = False):
+    from big5_databases.databases.db_mgmt import DatabaseManager
+    from src.post_labels import build_label_index, count_labels, remove_label
+    db = DatabaseManager.sqlite_db_from_path(db_path, False)
+    if rebuild:
+        print(f"{build_label_index(db)} post labels")
+    if remove:
+        print(f"removed {remove} from {remove_label(db, remove)} posts")
+    table = Table("label", "posts")
+    for label, count in sorted(count_labels(db).items()):
+        table.add_row(label, str(count))
+    console.print(table)
+
+
+@app.command(short_help="Label a stratified random sample of posts (per hour/day/month/year or content json path)")
+def sample(db_path: Path,
+           label: str,
+           size: Annotated[Optional[int], typer.Option(help="posts in total, split evenly over the buckets")] = None,
+           per_bucket: Annotated[Optional[int], typer.Option(help="posts of each bucket")] = None,
+           stratify: Annotated[str, typer.Option(
+               help="hour, day, month, year or a json path of the content, e.g. $.lang")] = "day",
+           platform: Annotated[Optional[str], typer.Option()] = None,
+           from_time: Annotated[Optional[datetime], typer.Option()] = None,
+           to_time: Annotated[Optional[datetime], typer.Option()] = None,
+           exclude_label: Annotated[Optional[str], typer.Option(help="skip posts with this label")] = None,
+           dry: Annotated[bool, typer.Option(help="only report the sample, nothing is written to the database")] = False):
+    from big5_databases.databases.db_mgmt import DatabaseManager
+    from src.sampling import sample_posts
+    db = DatabaseManager.sqlite_db_from_path(db_path, False)
+    result = sample_posts(db, label, size, per_bucket, None, stratify, platform, from_time, to_time,
+                          exclude_label, dry)
+    print(f"{result.sampled} posts from {result.buckets} buckets, {result.labelled} labelled '{label}' "
+          f"({result.seconds:.1f}s)")
+    for bucket, missing in sorted(result.short.items()):
+        print(f"{bucket}: {missing} posts missing")
+
+
+@app.command(short_help="Add the hot fields of the clients (indexed columns from the content) to the databases (RUN_CONFIG)")
+def hot_fields(platforms: Annotated[Optional[list[str]], typer.Option(help="only these platforms")] = None):
+    from src.hot_fields import ensure_hot_fields
+    from src.platform_orchestration import PlatformOrchestrator
+    table = Table("platform", "column", "path", "type", "added")
+    for platform, manager in PlatformOrchestrator().platform_managers.items():
+        if platforms and platform not in platforms:
+            continue
+        added = ensure_hot_fields(manager.platform_db.db_config.db_connection.db_path, manager.client.hot_fields)
+        for field in manager.client.hot_fields:
+            table.add_row(platform, field.column, field.path, field.type, str(field.column in added))
+    console.print(table)
+
+
+@app.command(short_help="Find time windows with few posts and create collection tasks to fill them")
+def gaps(from_time: Annotated[datetime, typer.Option()],
+         to_time: Annotated[datetime, typer.Option()],
+         platforms: Annotated[Optional[list[str]], typer.Option(help="select the platforms (RUN_CONFIG)")] = None,
+         db_path: Annotated[Optional[Path], typer.Option(help="use this database instead of RUN_CONFIG")] = None,
+         granularity: Annotated[Granularity, typer.Option()] = Granularity.HOUR,
+         threshold: Annotated[int, typer.Option(help="windows with less posts per bucket are gaps")] = 1,
+         task_interval: Annotated[Granularity, typer.Option(help="hour or day")] = Granularity.HOUR,
+         static_params: Annotated[str, typer.Option(help="json, static_params of the task groups")] = '{"limit": 100}',
+         write_tasks: Annotated[bool, typer.Option(help="write a task file per platform into the tasks folder")] = False,
+         submit: Annotated[bool, typer.Option(help="add the tasks directly")] = False):
+    from src.coverage import ensure_date_index, post_counts, find_gaps, gap_task_groups, write_task_file
+    from src.clients.task_parser import parse_task_data
+    from src.platform_orchestration import PlatformOrchestrator
+    if task_interval not in (Granularity.HOUR, Granularity.DAY):
+        print("task-interval must be hour or day")
+        raise typer.Exit(1)
+    if submit and db_path:
+        print("--submit adds the tasks to the databases of RUN_CONFIG, it cannot be used with --db-path")
+        raise typer.Exit(1)
+
+    if db_path:
+        from big5_databases.databases.db_mgmt import DatabaseManager
+        from big5_databases.databases.db_utils import check_platforms
+        db = DatabaseManager.sqlite_db_from_path(db_path, False)
+        databases = {platform: db for platform in (platforms or list(check_platforms(db)))}
+    else:
+        orchestrator = PlatformOrchestrator()
+        databases = {p: m.platform_db.db_mgmt for p, m in orchestrator.platform_managers.items()
+                     if not platforms or p in platforms}
+
+    table = Table("platform", "from", "to", granularity.value + "s", "posts")
+    for platform, db in databases.items():
+        ensure_date_index(db)
+        counts = post_counts(db, from_time, to_time, granularity.value, platform)
+        gap_windows = find_gaps(counts, granularity.value, threshold)
+        for gap in gap_windows:
+            table.add_row(platform, str(gap.start), str(gap.end), str(gap.buckets), str(gap.posts))
+        print(f"{platform}: {len(gap_windows)} gaps, "
+              f"{sum(g.buckets for g in gap_windows)}/{len(counts)} {granularity.value}s under {threshold}")
+        if not gap_windows or not (write_tasks or submit):
+            continue
+        prefix = f"gaps_{platform}_{datetime.now():%Y%m%d_%H%M}"
+        groups = gap_task_groups(platform, gap_windows, task_interval.value, json.loads(static_params), prefix)
+        if write_tasks:
+            print(f"tasks file: {write_task_file(groups, prefix)}")
+        if submit:
+            added, _ = PlatformOrchestrator().task.add_tasks(parse_task_data(groups))
+            print(f"{platform}: added {len(added)} tasks")
+    console.print(table)
+
+
+@app.command(short_help="Copy a database (sqlite backup) or a subset of its posts (platform, dates, task prefix)")
+def copy_db(src_db: Path,
+            target_db: Path,
+            platform: Annotated[Optional[str], typer.Option(help="subset: posts of this platform")] = None,
+            from_date: Annotated[Optional[datetime], typer.Option(help="subset: posts created from")] = None,
+            to_date: Annotated[Optional[datetime], typer.Option(help="subset: posts created before")] = None,
+            task_prefix: Annotated[Optional[str], typer.Option(help="subset: posts of tasks with this name prefix")] = None):
+    from src.scripts.duplicate_db import SubsetFilter, full_copy, subset_copy
+    subset = SubsetFilter(platform, from_date, to_date, task_prefix)
+    if subset == SubsetFilter():
+        if target_db.exists():
+            print(f"{target_db} exists. A full copy would overwrite it")
+            raise typer.Exit(1)
+        print(full_copy(src_db, target_db))
+    else:
+        print(subset_copy(src_db, target_db, subset))
+
+
+class BackfillMode(str, Enum):
+    COPY = "copy"
+    MERGE = "merge"
+
+
+@app.command(short_help="Copy or merge a column (metadata_content) into the posts of another database (same platform_id)")
+def backfill_column(src_db: Path,
+                    target_db: Path,
+                    column: Annotated[str, typer.Option(help="post column")] = "metadata_content",
+                    mode: Annotated[BackfillMode, typer.Option(
+                        help="copy: replace the value, merge: add the keys of the source json")] = BackfillMode.COPY,
+                    only_missing: Annotated[bool, typer.Option(
+                        help="only update posts without a value")] = False,
+                    batch_size: Annotated[int, typer.Option(help="source posts (ids) per transaction")] = 20000):
+    from rich.progress import Progress
+    from src.scripts import backfill_column as backfill
+
+    with Progress(console=console) as progress:
+        bar = progress.add_task(f"backfill {column}", total=None)
+
+        def update(result: backfill.BackfillResult):
+            progress.update(bar, total=result.total, completed=result.source_rows,
+                            description=f"backfill {column}: {result.updated} updated, "
+                                        f"{int(result.rows_per_second)} posts/s")
+
+        result = backfill.backfill_column(src_db, target_db, column, mode.value, only_missing, batch_size, update)
+    print(result)
+
+
 @app.command(short_help="Reset all tasks that are not DONE to INIT (platform dbs of RUN_CONFIG)")
 def reset_undone_tasks(platforms: Optional[
     Annotated[list[str], typer.Option(help="select the platforms, or reset for all")]] = None):
+    from big5_databases.databases.db_utils import reset_task_states
+    from big5_databases.databases.external import CollectionStatus
+    from src.platform_orchestration import PlatformOrchestrator
     orchestrator = PlatformOrchestrator()
     for platform, manager in orchestrator.platform_managers.items():
         if not platforms or platform in platforms:
@@ -128,12 +373,17 @@ def reset_undone_tasks(platforms: Optional[
 def merge_dbs(
         src_db: Path,
         target_db: Path):
+    from big5_databases.databases.c_db_merge import merge_database
     stats = merge_database(src_db, target_db)
     print(stats)
 
 
 @app.command(short_help="Metadatabase keeps status, post numbers and other stats of all databases")
 def init_meta_database():
+    from big5_databases.databases.db_mgmt import DatabaseManager
+    from big5_databases.databases.external import DBConfig, SQliteConnection
+    from big5_databases.databases.meta_database import add_db
+    from tools.env_root import root
     meta_db = DatabaseManager(config=DBConfig(
         db_connection=SQliteConnection(db_path=root() / "data/col_db/new_main.sqlite"),
         create=True,
@@ -150,20 +400,32 @@ def init_meta_database():
         print(db_file, "does not exist")
 
 
-async def _collect(run_forever: bool = False):
+async def _collect(run_forever: bool = False, metrics_port: Optional[int] = None):
+    from src.platform_orchestration import PlatformOrchestrator
+    from src.system_notify import send_notify
     orchestrator = PlatformOrchestrator()
-    if run_forever:
-        await orchestrator.run_collect_loop()
-    else:
-        await orchestrator.collect()
-        if BIG5_CONFIG.notify_collection_done:
-            send_notify("collection done")
+    lag_monitor: Optional[asyncio.Task] = None
+    if metrics_port:
+        from src.metrics import start_metrics_server, monitor_event_loop_lag
+        start_metrics_server(metrics_port)
+        lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    try:
+        if run_forever:
+            await orchestrator.run_collect_loop()
+        else:
+            await orchestrator.collect()
+            if BIG5_CONFIG.notify_collection_done:
+                send_notify("collection done")
+    finally:
+        if lag_monitor:
+            lag_monitor.cancel()
 
 @app.command(short_help="Read task files from the platform clients")
 def read_task_files(run_conf: Annotated[Optional[str], typer.Option()] = None,
                     only_evaluate: Annotated[Optional[bool], typer.Argument()] = None):
     if run_conf:
         BIG5_CONFIG.run_config_file_name = run_conf
+    from src.platform_orchestration import PlatformOrchestrator
     orchestrator = PlatformOrchestrator()
     if only_evaluate:
         files = orchestrator.task.get_task_files()
@@ -174,14 +436,108 @@ def read_task_files(run_conf: Annotated[Optional[str], typer.Option()] = None,
 
 @app.command(short_help="Run the main collection (better just run with python- cuz crashes look annoying)")
 def collect(run_conf: Annotated[Optional[str], typer.Option()] = None,
-            run_forever: bool = False):
+            run_forever: bool = False,
+            metrics_port: Annotated[Optional[int], typer.Option(help="expose Prometheus metrics on this port")] = None):
     if run_conf:
         BIG5_CONFIG.run_config_file_name = run_conf
-    asyncio.run(_collect(run_forever))
+    asyncio.run(_collect(run_forever, metrics_port))
+
+@app.command(short_help="p50/p95 of the task phases (collect, convert, insert, sleep, page) per platform from the task traces")
+def trace_summary(platforms: Annotated[Optional[list[str]], typer.Option(help="select the platforms")] = None):
+    from src.tracing import read_traces, summarize_traces
+    rows = summarize_traces(read_traces(platforms))
+    if not rows:
+        print("No traces found. Collect with TRACE_TASKS=true")
+        return
+    table = Table(*list(rows[0].keys()))
+    for r in rows:
+        table.add_row(*[str(v) for v in r.values()])
+    console.print(table)
+
+
+@app.command(short_help="Offline benchmark of the clients and the collection path with replayed api responses")
+def benchmark(platforms: Annotated[Optional[list[str]], typer.Option(help="select the platforms")] = None,
+              tasks: Annotated[int, typer.Option(help="tasks per platform")] = 20,
+              posts_per_task: Annotated[int, typer.Option(help="limit of each task")] = 200,
+              latency: Annotated[float, typer.Option(help="seconds per api request")] = 0.0,
+              page_size: Annotated[int, typer.Option(help="posts per response page")] = 50,
+              quota_error_at: Annotated[Optional[int], typer.Option(help="fail with a quota error from this request on")] = None,
+              orchestrator: Annotated[bool, typer.Option(help="also benchmark the orchestrator path (with db inserts)")] = True):
+    from src.benchmark.fake_apis import FIXTURE_FILES, ReplayConfig
+    from src.benchmark.run_benchmark import run_benchmarks
+    replay = ReplayConfig(latency=latency, page_size=page_size, quota_error_at=quota_error_at)
+    results = asyncio.run(run_benchmarks(platforms or list(FIXTURE_FILES), replay, tasks, posts_per_task, orchestrator))
+    table = Table(*list(results[0].__dict__.keys()))
+    for r in results:
+        table.add_row(*[str(v) for v in r.__dict__.values()])
+    console.print(table)
+
+
+@app.command(short_help="Import raw api dumps (JSON, JSONL, CSV) into a platform database")
+def import_raw(platform: str,
+               files: list[Path],
+               database: Annotated[Optional[Path], typer.Option(help="default: the platform database of RUN_CONFIG")] = None,
+               items_path: Annotated[Optional[str], typer.Option(help="JSON: dotted path to the list of records")] = None,
+               trusted: Annotated[bool, typer.Option(help="the dumps were collected by the client, skip validation")] = False,
+               workers: int = 4,
+               chunk_size: int = 2000):
+    from src.raw_import import import_raw as import_raw_files
+    if database:
+        from big5_databases.databases.db_mgmt import DatabaseManager
+        db = DatabaseManager.sqlite_db_from_path(database, create=True)
+    else:
+        from src.platform_orchestration import PlatformOrchestrator
+        db = PlatformOrchestrator().platform_managers[platform].platform_db.db_mgmt
+    summaries = import_raw_files(db, platform, files, items_path, trusted, workers, chunk_size)
+    table = Table("file", "task_id", "records", "added", "duplicates", "from", "to", "errors")
+    for s in summaries:
+        table.add_row(s.file, str(s.task_id), str(s.records), str(s.added), str(s.duplicates),
+                      str(s.min_date), str(s.max_date), str(len(s.errors)))
+    console.print(table)
+
+
+@app.command(short_help="Export the posts of the databases (RUN_CONFIG) to parquet files (platform/year/month)")
+def export(database: Annotated[Optional[list[Path]], typer.Option(
+               help="database files (instead of the RUN_CONFIG databases)")] = None,
+           dest: Annotated[Optional[Path], typer.Option(help="export folder, default: data/export")] = None,
+           full: Annotated[bool, typer.Option(help="export all posts, not only the new posts")] = False,
+           with_content: Annotated[bool, typer.Option(help="include the complete content (json)")] = False,
+           chunk_size: Annotated[int, typer.Option(help="posts per read and record batch")] = 50000):
+    from src.export import export_database, EXPORT_PATH
+    if database:
+        db_paths = database
+    else:
+        from src.status import run_config_databases
+        db_paths = [db_path for _, db_path in run_config_databases()]
+    table = Table("database", "post ids", "posts", "files", "seconds")
+    for db_path in db_paths:
+        result = export_database(db_path, dest or EXPORT_PATH, full, with_content, chunk_size)
+        table.add_row(str(db_path), f"{result.from_post_id + 1}-{result.to_post_id}", str(result.posts),
+                      str(len(result.files)), f"{result.seconds:.1f}")
+    console.print(table)
+
+
+@app.command(short_help="Scaling report (time, memory) of the task pipeline and databases with synthetic tasks and posts")
+def synthetic_load(platforms: Annotated[Optional[list[str]], typer.Option(help="select the platforms")] = None,
+                   sizes: Annotated[Optional[list[int]], typer.Option(help="number of tasks per platform")] = None,
+                   posts_per_task: Annotated[int, typer.Option(help="fake posts (test_data) per task")] = 10,
+                   tasks_per_file: int = 1000,
+                   keep_files: bool = False):
+    from src.benchmark.fake_apis import FIXTURE_FILES
+    from src.benchmark.load_generator import run_scaling
+    rows = asyncio.run(run_scaling(platforms or list(FIXTURE_FILES), sizes or [100, 1000, 10000],
+                                   posts_per_task, tasks_per_file, keep_files))
+    table = Table(*list(rows[0].__dict__.keys()))
+    for r in rows:
+        table.add_row(*[str(v) for v in r.__dict__.values()])
+    console.print(table)
+
 
 @app.command(short_help="Run the main collection (better just run with python- cuz crashes look annoying)")
 def pause_all(db_name: Annotated[Optional[str], typer.Option()] = None):
     from big5_databases import commands as db_commands
+    from big5_databases.databases.db_models import DBCollectionTask
+    from big5_databases.databases.external import CollectionStatus
     db = db_commands.get_db(db_name)
     print(db.reset_collection_task_states())
     with db.get_session() as session:
@@ -203,6 +559,7 @@ def copy2server(db_name: Annotated[Optional[str], typer.Option()] = None):
 def copy2server(db_name: Annotated[Optional[str], typer.Option()] = None):
     pass
 
+
 if __name__ == '__main__':
     try:
         #status()
@@ -0,0 +1,208 @@
+"""
+Stand-ins for the platform APIs, that replay the recorded responses in data/examples.
+Each returned post gets a new id, latency and quota errors can be configured.
+The YouTube and TikTok SDKs are blocking, so their latency blocks the event loop (as the real clients do).
+"""
+import asyncio
+import copy
+import itertools
+import json
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Any, AsyncGenerator
+
+from src.clients.abstract_client import AbstractClient
+from src.const import BASE_DATA_PATH
+
+EXAMPLES_PATH = BASE_DATA_PATH / "examples"
+
+FIXTURE_FILES = {
+    "youtube": EXAMPLES_PATH / "video_list_response.json",
+    "twitter": EXAMPLES_PATH / "twitter_search_response.json",
+    "tiktok": EXAMPLES_PATH / "tiktok_query_videos_response.json",
+}
+
+
+@dataclass
+class ReplayConfig:
+    latency: float = 0.0  # seconds per request
+    page_size: int = 50
+    # raise a quota error with this request (counted over the whole run)
+    quota_error_at: Optional[int] = None
+    # prefix of the generated ids, so repeated runs do not create duplicates
+    id_offset: int = 0
+
+
+def load_fixture(platform: str) -> list[dict]:
+    data = json.loads(FIXTURE_FILES[platform].read_text(encoding="utf-8"))
+    return data if isinstance(data, list) else [data]
+
+
+def synthetic_raw_post(platform: str, template: dict, num: int) -> dict:
+    """
+    raw post data (as collected by the client, but json serializable) with a unique id.
+    can be used as test_data of tasks (raw_post_data_conversion)
+    """
+    post = copy.deepcopy(template)
+    match platform:
+        case "youtube":
+            post["id"] = {"kind": "youtube#video", "videoId": f"bm{num:09d}"}
+        case "twitter":
+            post["id"] = num
+            post["id_str"] = str(num)
+        case _:
+            post["id"] = num
+    return post
+
+
+class _Replay:
+
+    def __init__(self, platform: str, replay: ReplayConfig):
+        self.platform = platform
+        self.replay = replay
+        self.templates = load_fixture(platform)
+        self.requests = 0
+        self._ids = itertools.count(replay.id_offset)
+
+    def next_item(self) -> tuple[int, dict]:
+        num = next(self._ids)
+        return num, synthetic_raw_post(self.platform, self.templates[num % len(self.templates)], num)
+
+    def request(self) -> bool:
+        """
+        counts the request. returns True, when it should fail with a quota error
+        """
+        self.requests += 1
+        return self.replay.quota_error_at is not None and self.requests >= self.replay.quota_error_at
+
+
+class _Executable:
+    def __init__(self, result_fn):
+        self._result_fn = result_fn
+
+    def execute(self):
+        return self._result_fn()
+
+
+class FakeYoutubeResource(_Replay):
+
+    def __init__(self, replay: ReplayConfig):
+        super().__init__("youtube", replay)
+        self._details: dict[str, dict] = {}
+
+    def _quota_error(self):
+        import httplib2
+        from googleapiclient.errors import HttpError
+        return HttpError(httplib2.Response({"status": 403}), b'{"error": {"errors": [{"reason": "quotaExceeded"}]}}')
+
+    def search(self):
+        return self
+
+    def videos(self):
+        return _FakeVideos(self)
+
+    def list(self, maxResults: int = 50, pageToken: Optional[str] = None, **_kwargs) -> _Executable:
+        def page():
+            time.sleep(self.replay.latency)
+            if self.request():
+                raise self._quota_error()
+            items = []
+            for _ in range(min(maxResults, self.replay.page_size)):
+                _, video = self.next_item()
+                video_id = video["id"]["videoId"]
+                self._details[video_id] = {k: v for k, v in video.items() if k not in ("id", "snippet")}
+                items.append({"kind": "youtube#searchResult",
+                              "id": {"kind": "youtube#video", "videoId": video_id},
+                              "snippet": video["snippet"]})
+            # there are always more pages, the client stops at the limit
+            return {"items": items, "nextPageToken": f"page{self.requests}"}
+
+        return _Executable(page)
+
+
+class _FakeVideos:
+
+    def __init__(self, resource: FakeYoutubeResource):
+        self.resource = resource
+
+    def list(self, part: str, id: str) -> _Executable:
+        def details():
+            time.sleep(self.resource.replay.latency)
+            if self.resource.request():
+                raise self.resource._quota_error()
+            return {"items": [{"id": video_id} | self.resource._details.pop(video_id, {})
+                              for video_id in id.split(",")]}
+
+        return _Executable(details)
+
+
+class _FakeTweet:
+
+    def __init__(self, data: dict):
+        self._data = data
+
+    def dict(self) -> dict:
+        return self._data
+
+
+class FakeTwitterAPI(_Replay):
+
+    def __init__(self, replay: ReplayConfig):
+        super().__init__("twitter", replay)
+
+    async def search(self, query: str) -> AsyncGenerator[_FakeTweet, None]:
+        while True:
+            await asyncio.sleep(self.replay.latency)
+            if self.request():
+                raise Exception("Rate limit reached (replay)")
+            for _ in range(self.replay.page_size):
+                _, tweet = self.next_item()
+                tweet["date"] = datetime.fromisoformat(tweet["date"])
+                yield _FakeTweet(tweet)
+
+
+class FakeTikTokAPI(_Replay):
+
+    def __init__(self, replay: ReplayConfig):
+        super().__init__("tiktok", replay)
+
+    def query_videos(self, request: Any, fetch_all_pages: bool = False) -> tuple:
+        videos = []
+        limit = request.max_total or self.replay.page_size
+        while len(videos) < limit:
+            time.sleep(self.replay.latency)
+            if self.request():
+                raise Exception("Rate limit reached")
+            for _ in range(min(self.replay.page_size, 100)):
+                _, video = self.next_item()
+                videos.append(video)
+            if not fetch_all_pages:
+                break
+        return videos, "search-id", len(videos), False, request.start_date, request.end_date, None
+
+
+def install_fake_api(client: AbstractClient, replay: ReplayConfig) -> _Replay:
+    """
+    replace the api of a client (no setup or authentication needed anymore)
+    """
+    match client.platform_name:
+        case "youtube":
+            from src.clients.instances.youtube_client import GoogleAPIKeySetting
+            client.settings = GoogleAPIKeySetting(GOOGLE_API_KEYS="replay")
+            client.client = FakeYoutubeResource(replay)
+            return client.client
+        case "twitter":
+            client.api = FakeTwitterAPI(replay)
+            client._accounts_initialized = True
+            # the client side rate limit would sleep
+            client.rate_limit_requests = sys.maxsize
+            return client.api
+        case "tiktok":
+            from src.clients.instances.tiktok_client import TikTokPISetting
+            client.settings = TikTokPISetting(TIKTOK_CLIENT_KEY="replay", TIKTOK_CLIENT_SECRET="replay")
+            client.client = FakeTikTokAPI(replay)
+            return client.client
+        case _:
+            raise ValueError(f"No replay api for platform: {client.platform_name}")
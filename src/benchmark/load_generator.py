@@ -0,0 +1,187 @@
+"""
+Synthetic load for the task pipeline and the platform databases.
+Writes ClientTaskGroupConfig files, whose tasks carry fake posts as test_data, and drives them through the
+orchestrator (TEST_MODE): reading the files, add_tasks, get_pending_tasks and processing (insert_posts).
+The time and memory of each phase are reported per size (number of tasks), each size uses new databases.
+"""
+import itertools
+import json
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Generator, Iterator
+
+from src.benchmark.fake_apis import ReplayConfig, install_fake_api, load_fixture, synthetic_raw_post
+from src.benchmark.run_benchmark import BENCHMARKS_PATH, current_rss_mb, peak_rss_mb
+from src.clients.clients_models import RunConfig
+from src.const import BASE_DATA_PATH, BIG5_CONFIG
+from src.metrics import DB_INSERT_DURATION
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+SYNTHETIC_PATH = BASE_DATA_PATH / "synthetic"
+
+
+@dataclass
+class ScalingRow:
+    platform: str
+    tasks: int
+    posts: int
+    phase: str
+    seconds: float
+    items_per_sec: float
+    rss_mb: float
+    peak_rss_mb: float
+
+
+def synthetic_task_groups(platform: str,
+                          num_tasks: int,
+                          posts_per_task: int,
+                          ids: Iterator[int],
+                          prefix: str,
+                          start: datetime = datetime(2023, 1, 1)) -> Generator[dict, None, None]:
+    """
+    one group (with one hourly task) per task, since all tasks of a group share the test_data
+    """
+    templates = load_fixture(platform)
+    for task_no in range(num_tasks):
+        ts = (start + timedelta(hours=task_no)).isoformat()
+        yield {
+            "platform": platform,
+            "group_prefix": f"{prefix}_{task_no}",
+            "time_config": {"start": ts, "end": ts, "interval": {"hours": 1}},
+            "static_params": {"limit": posts_per_task},
+            "test_data": [synthetic_raw_post(platform, templates[num % len(templates)], num)
+                          for num in itertools.islice(ids, posts_per_task)]
+        }
+
+
+def write_task_files(platform: str,
+                     num_tasks: int,
+                     posts_per_task: int,
+                     dest_dir: Path,
+                     ids: Iterator[int],
+                     prefix: str,
+                     tasks_per_file: int = 1000) -> list[Path]:
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    groups = synthetic_task_groups(platform, num_tasks, posts_per_task, ids, prefix)
+    files = []
+    for file_no in itertools.count():
+        chunk = list(itertools.islice(groups, tasks_per_file))
+        if not chunk:
+            break
+        file = dest_dir / f"{prefix}_{platform}_{file_no}.json"
+        file.write_text(json.dumps(chunk), encoding="utf-8")
+        files.append(file)
+    return files
+
+
+def synthetic_run_config(platforms: list[str], db_dir: str) -> RunConfig:
+    return RunConfig.model_validate({"clients": {
+        platform: {
+            "progress": True,
+            "request_delay": 0,
+            "delay_randomize": 0,
+            "db_config": {
+                "create": True,
+                "require_existing_parent_dir": False,
+                "db_connection": {"db_path": f"{db_dir}/{platform}.sqlite"}
+            }
+        } for platform in platforms}})
+
+
+class _PhaseTimer:
+
+    def __init__(self, platform: str, tasks: int, posts: int):
+        self.platform = platform
+        self.tasks = tasks
+        self.posts = posts
+        self.rows: list[ScalingRow] = []
+
+    def add(self, phase: str, seconds: float, items: int):
+        self.rows.append(ScalingRow(self.platform, self.tasks, self.posts, phase, round(seconds, 3),
+                                    round(items / seconds, 1) if seconds else 0, current_rss_mb(), peak_rss_mb()))
+        logger.info(asdict(self.rows[-1]))
+
+    @contextmanager
+    def phase(self, name: str, items: int) -> Generator[None, None, None]:
+        start = time.perf_counter()
+        yield
+        self.add(name, time.perf_counter() - start, items)
+
+
+async def run_scaling(platforms: list[str],
+                      sizes: list[int],
+                      posts_per_task: int = 10,
+                      tasks_per_file: int = 1000,
+                      keep_files: bool = False,
+                      store: bool = True) -> list[ScalingRow]:
+    """
+    :param sizes: number of tasks per platform
+    :param keep_files: keep the generated task files (data/synthetic/<run_id>)
+    """
+    from src.misc.platform_quotas import use_quota_file
+    from src.platform_orchestration import PlatformOrchestrator
+
+    BIG5_CONFIG.test_mode = True
+    BIG5_CONFIG.send_posts = False
+    use_quota_file(Path(tempfile.mkdtemp()) / "platform_quotas.json")
+
+    run_id = f"{datetime.now():%Y%m%d_%H%M%S}"
+    orchestrator = PlatformOrchestrator()
+    ids = itertools.count(int(time.time()) * 10 ** 7)
+    rows: list[ScalingRow] = []
+
+    for size in sizes:
+        # only the synthetic managers, the ones of RUN_CONFIG are not created and nothing is added to the main db
+        managers = orchestrator.initialize_platform_managers(
+            synthetic_run_config(platforms, f"synthetic/{run_id}/{size}"), register_dbs=False)
+        for platform in platforms:
+            manager = managers[platform]
+            # tasks with test_data never call the api, but the client should not need credentials either
+            install_fake_api(manager.client, ReplayConfig())
+            manager._client_setup = True
+            timer = _PhaseTimer(platform, size, size * posts_per_task)
+            files_dir = SYNTHETIC_PATH / run_id / str(size)
+            prefix = f"synthetic_{run_id}_{size}"
+
+            with timer.phase("write_files", size):
+                files = write_task_files(platform, size, posts_per_task, files_dir, ids, prefix, tasks_per_file)
+            # files are added one by one (as check_new_client_tasks), so not all tasks are in memory
+            parse_time = add_time = 0.0
+            for file in files:
+                start = time.perf_counter()
+                tasks = orchestrator.task.load_tasks_file(file)
+                parse_time += time.perf_counter() - start
+                start = time.perf_counter()
+                orchestrator.task.add_tasks(tasks)
+                add_time += time.perf_counter() - start
+            timer.add("parse", parse_time, size)
+            timer.add("add_tasks", add_time, size)
+
+            with timer.phase("get_pending_tasks", size):
+                pending = manager.platform_db.get_pending_tasks(BIG5_CONFIG.continue_paused_tasks)
+            del pending
+
+            insert_before = DB_INSERT_DURATION.total(platform=platform)
+            with timer.phase("process", size * posts_per_task):
+                await manager.process_all_tasks()
+            timer.add("insert_posts", DB_INSERT_DURATION.total(platform=platform) - insert_before,
+                      size * posts_per_task)
+            rows.extend(timer.rows)
+
+            if not keep_files:
+                shutil.rmtree(files_dir, ignore_errors=True)
+
+    if store:
+        BENCHMARKS_PATH.mkdir(exist_ok=True)
+        dest = BENCHMARKS_PATH / f"scaling-{run_id}.json"
+        json.dump({"sizes": sizes, "posts_per_task": posts_per_task, "rows": [asdict(r) for r in rows]},
+                  dest.open("w", encoding="utf-8"), indent=2)
+        logger.info(f"Scaling report stored in {dest}")
+    return rows
@@ -0,0 +1,203 @@
+"""
+Offline benchmark of the clients and of the orchestrator collection path, with replayed api responses
+(see fake_apis). Reports posts/sec, peak RSS and event-loop lag, results are stored in data/benchmarks
+so regressions can be tracked.
+"""
+import asyncio
+import json
+import resource
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+from big5_databases.databases.db_models import CollectionResult
+from big5_databases.databases.external import ClientConfig, ClientTaskConfig
+from src.benchmark.fake_apis import ReplayConfig, install_fake_api
+from src.clients.abstract_client import QuotaExceeded
+from src.clients.task_parser import parse_task_data
+from src.const import BASE_DATA_PATH, BIG5_CONFIG
+from tools.files import read_data
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+BENCHMARKS_PATH = BASE_DATA_PATH / "benchmarks"
+BENCHMARK_RUN_CONFIG = "benchmark.yaml"
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    platform: str
+    tasks: int
+    posts: int
+    quota_exceeded: int
+    requests: int
+    duration_s: float
+    posts_per_sec: float
+    peak_rss_mb: float
+    loop_lag_p50_ms: float
+    loop_lag_max_ms: float
+
+
+class LoopLagSampler:
+    """
+    measures how late the event loop wakes up a sleeping task
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: list[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - start - self.interval))
+
+    async def __aenter__(self) -> "LoopLagSampler":
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+
+    def p50_ms(self) -> float:
+        return round(statistics.median(self.lags) * 1000, 2) if self.lags else 0
+
+    def max_ms(self) -> float:
+        return round(max(self.lags) * 1000, 2) if self.lags else 0
+
+
+def peak_rss_mb() -> float:
+    # linux: kilobytes
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def current_rss_mb() -> float:
+    statm = Path("/proc/self/statm")
+    if not statm.exists():
+        return peak_rss_mb()
+    pages = int(statm.read_text().split()[1])
+    return round(pages * resource.getpagesize() / 1024 ** 2, 1)
+
+
+def benchmark_tasks(platform: str, run_id: int, num_tasks: int, posts_per_task: int) -> list[ClientTaskConfig]:
+    return parse_task_data({
+        "platform": platform,
+        "group_prefix": f"benchmark_{run_id}",
+        "time_config": {
+            "start": "2023-01-01T00:00:00",
+            "end": "2023-01-01T00:00:00",
+            "interval": {"hours": 1}
+        },
+        "static_params": {"limit": posts_per_task},
+        "repeat": num_tasks
+    })
+
+
+def _result(name: str, platform: str, tasks: int, posts: int, quota_exceeded: int, requests: int,
+            duration: float, lag: LoopLagSampler) -> BenchmarkResult:
+    return BenchmarkResult(name=name, platform=platform, tasks=tasks, posts=posts, quota_exceeded=quota_exceeded,
+                           requests=requests, duration_s=round(duration, 3),
+                           posts_per_sec=round(posts / duration, 1) if duration else 0,
+                           peak_rss_mb=peak_rss_mb(), loop_lag_p50_ms=lag.p50_ms(), loop_lag_max_ms=lag.max_ms())
+
+
+async def benchmark_client(platform: str, replay: ReplayConfig, num_tasks: int,
+                           posts_per_task: int) -> BenchmarkResult:
+    """
+    client.execute_task for each task (api, pagination, conversion). No database
+    """
+    from src.platform_orchestration import get_client_class
+    client_class = get_client_class(platform)
+    client = client_class(ClientConfig(), SimpleNamespace(platform_name=platform))
+    fake_api = install_fake_api(client, replay)
+    tasks = benchmark_tasks(platform, replay.id_offset, num_tasks, posts_per_task)
+
+    posts = quota_exceeded = 0
+    async with LoopLagSampler() as lag:
+        start = time.perf_counter()
+        for task in tasks:
+            result = await client.execute_task(task)
+            if isinstance(result, CollectionResult):
+                posts += len(result.posts)
+            elif isinstance(result, QuotaExceeded):
+                quota_exceeded += 1
+        duration = time.perf_counter() - start
+    return _result("client", platform, len(tasks), posts, quota_exceeded, fake_api.requests, duration, lag)
+
+
+async def benchmark_orchestrator(platforms: list[str], replay: ReplayConfig, num_tasks: int,
+                                 posts_per_task: int) -> list[BenchmarkResult]:
+    """
+    the collection path of PlatformOrchestrator.collect (without reading the task folder):
+    adding tasks, processing them and inserting the posts, in the databases of the benchmark RUN_CONFIG (TEST_MODE).
+    The managers are created from the benchmark config (not from RUN_CONFIG, even if the orchestrator exists already)
+    and their databases are not added to the main db
+    """
+    from src.clients.clients_models import RunConfig
+    from src.misc.platform_quotas import use_quota_file
+    from src.platform_orchestration import PlatformOrchestrator
+
+    BIG5_CONFIG.test_mode = True
+    BIG5_CONFIG.send_posts = False
+    # quota halts of the replay should not halt the real collection
+    use_quota_file(Path(tempfile.mkdtemp()) / "platform_quotas.json")
+
+    orchestrator = PlatformOrchestrator()
+    config = RunConfig.model_validate(read_data(BASE_DATA_PATH / "_RUN_CONFIG" / BENCHMARK_RUN_CONFIG))
+    managers = orchestrator.initialize_platform_managers(config, set(platforms), register_dbs=False)
+    fake_apis = {}
+    for platform, manager in managers.items():
+        manager.active = True
+        manager._client_setup = True
+        fake_apis[platform] = install_fake_api(manager.client, replay)
+
+    tasks = [t for platform in platforms for t in benchmark_tasks(platform, replay.id_offset, num_tasks, posts_per_task)]
+    orchestrator.task.add_tasks(tasks)
+    for manager in managers.values():
+        manager.reset_running_tasks()
+
+    async with LoopLagSampler() as lag:
+        start = time.perf_counter()
+        res = await orchestrator.progress_tasks(managers)
+        duration = time.perf_counter() - start
+
+    results = []
+    for platform in platforms:
+        platform_res = res.get(platform, {"task_names": [], "num_posts_added": 0})
+        results.append(_result("orchestrator", platform, len(platform_res["task_names"]),
+                               platform_res["num_posts_added"], 0, fake_apis[platform].requests, duration, lag))
+    return results
+
+
+async def run_benchmarks(platforms: list[str],
+                         replay: ReplayConfig,
+                         num_tasks: int = 20,
+                         posts_per_task: int = 200,
+                         orchestrator: bool = True,
+                         store: bool = True) -> list[BenchmarkResult]:
+    replay.id_offset = replay.id_offset or int(time.time()) * 1_000_000
+    results = []
+    for platform in platforms:
+        results.append(await benchmark_client(platform, replay, num_tasks, posts_per_task))
+        logger.info(asdict(results[-1]))
+    if orchestrator:
+        # new ids, the client run did not insert anything, but keep them apart anyway
+        replay.id_offset += 500_000
+        results.extend(await benchmark_orchestrator(platforms, replay, num_tasks, posts_per_task))
+    if store:
+        BENCHMARKS_PATH.mkdir(exist_ok=True)
+        dest = BENCHMARKS_PATH / f"benchmark-{datetime.now():%Y%m%d_%H%M%S}.json"
+        json.dump({"replay": asdict(replay), "num_tasks": num_tasks, "posts_per_task": posts_per_task,
+                   "results": [asdict(r) for r in results]}, dest.open("w", encoding="utf-8"), indent=2)
+        logger.info(f"Benchmark results stored in {dest}")
+    return results
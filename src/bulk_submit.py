@@ -0,0 +1,121 @@
+"""
+bulk submission of collection tasks as NDJSON (one task, group or list of them per line).
+Lines are validated and expanded into tasks in a process pool, the tasks are added in batches (in the event loop thread).
+"""
+import asyncio
+from collections import defaultdict
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, AsyncGenerator, Optional, TYPE_CHECKING
+
+import orjson
+from pydantic import ValidationError
+
+from big5_databases.databases.external import ClientTaskConfig
+from src.clients.task_parser import parse_task_data
+from tools.project_logging import get_logger
+
+if TYPE_CHECKING:
+    from src.platform_orchestration import PlatformOrchestrator
+
+logger = get_logger(__file__)
+
+
+@dataclass
+class BulkSubmitSummary:
+    lines: int = 0
+    tasks: int = 0
+    added: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    not_added: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    rejected: list[dict[str, int | str]] = field(default_factory=list)
+
+    def model_dump(self) -> dict:
+        return {"lines": self.lines, "tasks": self.tasks, "added": dict(self.added),
+                "not_added": dict(self.not_added), "rejected": self.rejected}
+
+
+def expand_task_line(line: bytes) -> tuple[list[ClientTaskConfig], Optional[str]]:
+    """
+    runs in the worker processes. errors are returned as strings, since ValidationErrors cannot be pickled
+    """
+    try:
+        return parse_task_data(orjson.loads(line)), None
+    except orjson.JSONDecodeError as err:
+        return [], f"invalid json: {err}"
+    except ValidationError as err:
+        return [], f"invalid task: {err}"
+    except Exception as err:
+        # well-formed, but cannot be expanded (e.g. an unknown interval unit, a bad timestamp, not an object)
+        return [], f"invalid task: {type(err).__name__}: {err}"
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncGenerator[bytes, None]:
+    rest = b""
+    async for chunk in chunks:
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line
+    yield rest
+
+
+async def submit_ndjson(orchestrator: "PlatformOrchestrator",
+                        chunks: AsyncIterator[bytes],
+                        executor: Executor,
+                        summary: BulkSubmitSummary,
+                        batch_size: int = 1000,
+                        window: int = 16) -> AsyncGenerator[list[str], None]:
+    """
+    Validate, expand and add the tasks of a NDJSON stream.
+    :param summary: is filled while going through the stream
+    :param window: max number of lines, that are expanded concurrently
+    :return: yields the names of the added tasks of each batch
+    """
+    loop = asyncio.get_running_loop()
+    pending: list[tuple[int, asyncio.Future]] = []
+    batch: list[ClientTaskConfig] = []
+
+    def add_batch() -> list[str]:
+        # runs in the loop thread, like the collection and the job manager, that use the same managers and databases
+        names: list[str] = []
+        grouped: dict[str, list[ClientTaskConfig]] = defaultdict(list)
+        for task in batch:
+            grouped[task.platform].append(task)
+        for platform, tasks in grouped.items():
+            if not orchestrator.platform_manager(platform):
+                summary.rejected.append({"platform": platform, "reason": f"no manager for platform ({len(tasks)} tasks)"})
+                continue
+            added, _ = orchestrator.task.add_tasks(tasks)
+            summary.added[platform] += len(added)
+            summary.not_added[platform] += len(tasks) - len(added)
+            names.extend(added)
+        batch.clear()
+        return names
+
+    async def collect_done(wait_all: bool) -> AsyncGenerator[list[str], None]:
+        while pending and (wait_all or len(pending) >= window):
+            line_no, future = pending.pop(0)
+            tasks, error = await future
+            if error:
+                summary.rejected.append({"line": line_no, "reason": error})
+                continue
+            summary.tasks += len(tasks)
+            batch.extend(tasks)
+            if len(batch) >= batch_size:
+                yield add_batch()
+
+    line_no = 0
+    async for line in ndjson_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        summary.lines += 1
+        pending.append((line_no, loop.run_in_executor(executor, expand_task_line, line)))
+        async for names in collect_done(False):
+            yield names
+
+    async for names in collect_done(True):
+        yield names
+    if batch:
+        yield add_batch()
+    logger.info(f"bulk submit: {summary.model_dump()}")
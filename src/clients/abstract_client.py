@@ -1,11 +1,14 @@
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
-from typing import TypeVar, Optional, TYPE_CHECKING
+from typing import TypeVar, Optional, TYPE_CHECKING, Any
 
 from pydantic import BaseModel
 
 from big5_databases.databases.db_models import CollectionResult, DBPost, DBUser
 from big5_databases.databases.external import ClientTaskConfig, CollectConfig, ClientConfig
+from src.hot_fields import HotField
+from src.metrics import EXECUTE_TASK_DURATION, POSTS_COLLECTED, REQUESTS, PAGES, API_LATENCY
+from src.tracing import trace_phase, record_page
 from tools.project_logging import get_logger
 
 if TYPE_CHECKING:
@@ -27,11 +30,15 @@ class CollectionException(Exception):
 
 class QuotaExceeded(CollectionException):
 
-    def __init__(self, orig_exception: Exception, hours: int = 24) -> None:
+    def __init__(self, orig_exception: Exception, hours: int = 24, credential: Optional[str] = None) -> None:
         super().__init__(orig_exception)
         self.blocked_until = datetime.now() + timedelta(hours=hours)
+        # only this credential is blocked (see AbstractClient.credential_id)
+        self.credential = credential
 
 class AbstractClient[TClientConfig, PostEntry, UserEntry](ABC):
+    # typed values of the post content, that become indexed columns of the post table (see hot_fields)
+    hot_fields: list[HotField] = []
 
     def __init__(self, config: ClientConfig, manager: "PlatformManager"):
         self.config = config
@@ -71,16 +78,19 @@ class AbstractClient[TClientConfig, PostEntry, UserEntry](ABC):
         start_time = datetime.now()
         try:
             self.logger.info(f"Executing task: {task.task_name} [{self.platform_name}]")
-            collected_items = await self.collect(
-                task.collection_config
-            )
+            with EXECUTE_TASK_DURATION.time(platform=self.platform_name), trace_phase("collect"):
+                collected_items = await self.collect(
+                    task.collection_config
+                )
+            POSTS_COLLECTED.inc(len(collected_items), platform=self.platform_name)
             self.logger.info(f"Collected {len(collected_items)} items for task: {task.task_name} [{self.platform_name}]")
             posts: list[DBPost] = []
             users: set[DBUser] = set()
             # Process results
-            for item in collected_items:
-                posts.append(self.create_post_entry(item, task))
-                users.add(self.create_user_entry(item))
+            with trace_phase("convert"):
+                for item in collected_items:
+                    posts.append(self.create_post_entry(item, task))
+                    users.add(self.create_user_entry(item))
 
             return CollectionResult(
                 posts=posts,
@@ -98,6 +108,19 @@ class AbstractClient[TClientConfig, PostEntry, UserEntry](ABC):
             return e
 
 
+    def record_request(self, latency: float, response: Any, result_page: bool = True) -> None:
+        """
+        metrics and task-trace of an api request
+        :param latency: seconds
+        :param response: parsed response, its json size is traced
+        :param result_page: False for requests, that do not fetch a page of results (e.g. details)
+        """
+        REQUESTS.inc(platform=self.platform_name)
+        API_LATENCY.observe(latency, platform=self.platform_name)
+        if result_page:
+            PAGES.inc(platform=self.platform_name)
+        record_page(latency, response)
+
     @abstractmethod
     async def collect(self, collection_config: CollectConfig) -> list[PostEntry]:
         """
@@ -136,9 +159,24 @@ class AbstractClient[TClientConfig, PostEntry, UserEntry](ABC):
     def platform_name(self) -> str:
         return self.manager.platform_name
 
+    @property
+    def credential_id(self) -> Optional[str]:
+        """
+        identifier of the credential (api-key, account) the client uses. Quota halts are stored per credential.
+        None, when quota halts apply to the whole platform
+        """
+        return None
+
 
     def raw_post_data_conversion(self, data: dict) -> PostEntry:
         raise NotImplementedError("This method should be implemented in the client")
 
+    def raw_post_data_conversion_batch(self, data: list[dict], trusted: bool = False) -> list[PostEntry]:
+        """
+        convert many raw posts at once. Clients with validation should override it
+        :param trusted: the data was collected by this client, validation can be skipped
+        """
+        return [self.raw_post_data_conversion(d) for d in data]
+
 
 ConcreteClientClass = TypeVar('ConcreteClientClass', bound=AbstractClient)
@@ -8,11 +8,12 @@ Tiktok does some random pagination, that's why the actual results might exceed t
 
 
 """
+import time
 from datetime import datetime, timezone
 from json import JSONDecodeError
 from typing import Optional, Literal, Any, TypedDict, TYPE_CHECKING
 
-from pydantic import SecretStr, Field, BaseModel, model_validator, ValidationError
+from pydantic import SecretStr, Field, BaseModel, model_validator, ValidationError, TypeAdapter
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from tiktok_research_api_python import TikTokResearchAPI, Criteria, QueryVideoRequest, Query
 
@@ -20,6 +21,8 @@ from big5_databases.databases.db_models import DBUser, DBPost
 from big5_databases.databases.external import ClientConfig, ClientTaskConfig, CollectConfig
 from src.clients.abstract_client import AbstractClient, CollectionException, QuotaExceeded
 from src.const import ENV_FILE_PATH
+from src.hot_fields import HotField
+from src.misc.platform_quotas import credential_key
 from src.platform_manager import PlatformManager
 from tools.project_logging import get_logger
 
@@ -168,6 +171,9 @@ class QueryVideoResult(BaseModel):
         return f"https://www.tiktok.com/@{self.username}/video/{self.id}"
 
 
+QUERY_VIDEO_RESULTS = TypeAdapter(list[QueryVideoResult])
+
+
 class UserProfile(BaseModel):
     username: str
     is_verified: bool
@@ -181,10 +187,14 @@ class UserProfile(BaseModel):
 
 
 class TikTokClient(AbstractClient[QueryVideoRequestModel, QueryVideoResult, UserProfile]):
+    hot_fields = [HotField("region", "$.region_code", "text"),
+                  HotField("views", "$.view_count", "int"),
+                  HotField("likes", "$.like_count", "int")]
 
     def __init__(self, config: ClientConfig, manager: PlatformManager):
         super().__init__(config, manager)
         self.client: Optional[TikTokResearchAPI] = None
+        self.settings: Optional[TikTokPISetting] = None
 
     def setup(self):
         self.settings = TikTokPISetting()
@@ -193,6 +203,13 @@ class TikTokClient(AbstractClient[QueryVideoRequestModel, QueryVideoResult, User
                                         self.settings.RATE_LIMIT,
                                         retry_sleep_time=7)
 
+    @property
+    def credential_id(self) -> Optional[str]:
+        # quota is per research client-key
+        if not self.settings:
+            self.settings = TikTokPISetting()
+        return credential_key(self.settings.TIKTOK_CLIENT_KEY)
+
     @staticmethod
     def base_config_transform(abstract_config: CollectConfig) -> AbstractQueryConstrain:
         # base validation
@@ -245,8 +262,11 @@ class TikTokClient(AbstractClient[QueryVideoRequestModel, QueryVideoResult, User
             f"{(collection_config.from_time, collection_config.to_time)} ->{(config.start_date, config.end_date)}")
         all_videos = []
         try:
-            videos, search_id, cursor, has_more, start_date, end_date, error = self.client.query_videos(config,
-                                                                                                        fetch_all_pages=True)
+            # the sdk fetches all pages in one call
+            request_start = time.perf_counter()
+            videos, search_id, cursor, has_more, start_date, end_date, error = self.client.query_videos(
+                config, fetch_all_pages=True)
+            self.record_request(time.perf_counter() - request_start, videos)
         except KeyboardInterrupt as exc:
             print("print tiktok client.collect, keyinterrupt")
         except JSONDecodeError as exc:
@@ -281,3 +301,8 @@ class TikTokClient(AbstractClient[QueryVideoRequestModel, QueryVideoResult, User
 
     def raw_post_data_conversion(self, post_data: dict) -> QueryVideoResult:
         return QueryVideoResult.model_validate(post_data)
+
+    def raw_post_data_conversion_batch(self, data: list[dict], trusted: bool = False) -> list[QueryVideoResult]:
+        if trusted:
+            return [QueryVideoResult.model_construct(**post_data) for post_data in data]
+        return QUERY_VIDEO_RESULTS.validate_python(data)
@@ -1,5 +1,6 @@
 import logging
 import time
+from datetime import datetime
 from contextlib import aclosing
 from typing import Optional, Protocol
 
@@ -13,6 +14,7 @@ from big5_databases.databases.db_models import DBPost, DBUser
 from big5_databases.databases.external import PostType, CollectConfig, ClientTaskConfig, ClientConfig
 from src.clients.abstract_client import AbstractClient
 from src.const import ENV_FILE_PATH
+from src.hot_fields import HotField
 from src.platform_manager import PlatformManager
 from tools.pydantic_annotated_types import SerializableDatetimeAlways
 
@@ -62,6 +64,9 @@ class TwitterClient(AbstractClient[TwitterSearchParameters, dict, dict]):
     """
     Twitter client implementation using twscrape library with integrated management
     """
+    hot_fields = [HotField("username", "$.user.username", "text"),
+                  HotField("likes", "$.likeCount", "int"),
+                  HotField("views", "$.viewCount", "int")]
 
     def __init__(self, config: ClientConfig, manager: PlatformManager):
         super().__init__(config, manager)
@@ -156,11 +161,14 @@ class TwitterClient(AbstractClient[TwitterSearchParameters, dict, dict]):
         query = config.build_query()
 
         try:
+            # twscrape paginates internally, the latency covers the whole search
+            request_start = time.perf_counter()
             async with aclosing(self.api.search(query)) as gen:
                 async for tweet in gen:
                     tweets.append(tweet.dict())
                     if len(tweets) >= config.limit:
                         break
+            self.record_request(time.perf_counter() - request_start, tweets)
 
             self.logger.info(f"Collected {len(tweets)} tweets for query: {query}")
             return tweets
@@ -181,6 +189,12 @@ class TwitterClient(AbstractClient[TwitterSearchParameters, dict, dict]):
             collection_task_id=task.id
         )
 
+    def raw_post_data_conversion(self, data: dict) -> dict:
+        # collected tweets (tweet.dict()) have a datetime, test_data comes from json
+        if isinstance(data.get("date"), str):
+            return data | {"date": datetime.fromisoformat(data["date"])}
+        return data
+
     def create_user_entry(self, user: dict) -> DBUser:
         """Create a database user entry from a Twitter user"""
         return DBUser(
@@ -1,4 +1,5 @@
 import asyncio
+import time
 from datetime import datetime
 from typing import Optional, Literal, Sequence, Union, Protocol, TypeAlias
 
@@ -6,7 +7,6 @@ import itertools
 import more_itertools
 import pyrfc3339
 # import yt_dlp
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from pydantic import SecretStr, BaseModel, Field, field_validator, field_serializer, ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -14,7 +14,12 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from big5_databases.databases.db_models import DBPost, DBUser
 from big5_databases.databases.external import CollectConfig, ClientTaskConfig, ClientConfig
 from src.clients.abstract_client import AbstractClient, UserEntry, QuotaExceeded, CollectionException
-from src.const import ENV_FILE_PATH
+from src.clients.instances.youtube_discovery import build_youtube
+from src.clients.instances.youtube_video_cache import VideoDetailsCache, VIDEO_CACHE_PATH, requests_for
+from src.const import ENV_FILE_PATH, BIG5_CONFIG
+from src.hot_fields import HotField
+from src.metrics import DETAILS_CACHE_HITS, DETAILS_CACHE_MISSES, QUOTA_UNITS_SAVED
+from src.misc.platform_quotas import credential_key
 from src.platform_manager import PlatformManager
 from tools.project_logging import get_logger
 
@@ -251,6 +256,9 @@ class YoutubeResource(Protocol):
 
 
 class YoutubeClient(AbstractClient[TVYoutubeSearchParameters, PostDict, UserDict]):
+    hot_fields = [HotField("channel_id", "$.snippet.channelId", "text"),
+                  HotField("views", "$.statistics.viewCount", "int"),
+                  HotField("likes", "$.statistics.likeCount", "int")]
     ALL_PUBLIC_PART_OPTIONS = ["contentDetails", "liveStreamingDetails",
                                "paidProductPlacementDetails", "player", "status", "statistics", "topicDetails",
                                "localizations"]
@@ -265,11 +273,25 @@ class YoutubeClient(AbstractClient[TVYoutubeSearchParameters, PostDict, UserDict
     def __init__(self, config: ClientConfig, manager: PlatformManager):
         super().__init__(config, manager)
         self.client: YoutubeResource = None
+        self.settings: Optional[GoogleAPIKeySetting] = None
+        self.video_cache: Optional[VideoDetailsCache] = None
+        if BIG5_CONFIG.youtube_video_cache_size:
+            self.video_cache = VideoDetailsCache(
+                BIG5_CONFIG.youtube_video_cache_size, BIG5_CONFIG.youtube_video_cache_ttl,
+                VIDEO_CACHE_PATH if BIG5_CONFIG.youtube_video_cache_persist else None)
 
     def setup(self):
         # just use the settings/config
         self.settings = GoogleAPIKeySetting()
-        self.client = build('youtube', 'v3', developerKey=self.settings.GOOGLE_API_KEYS.get_secret_value())
+        # from the cached discovery document, with the shared http transport
+        self.client = build_youtube(self.settings.GOOGLE_API_KEYS.get_secret_value())
+
+    @property
+    def credential_id(self) -> Optional[str]:
+        # quota is per api-key. it is also called before the setup (initial quota check)
+        if not self.settings:
+            self.settings = GoogleAPIKeySetting()
+        return credential_key(self.settings.GOOGLE_API_KEYS.get_secret_value())
 
     @staticmethod
     def transform_config(abstract_config: CollectConfig) -> YoutubeSearchParameters:
@@ -309,7 +331,9 @@ class YoutubeClient(AbstractClient[TVYoutubeSearchParameters, PostDict, UserDict
                 # region-code is automatically set to user locatin (e.g. ES)
                 config.maxResults = min(50, generic_config.limit - len(search_result_items))  # remaining
                 logger.debug(config.model_dump_json(exclude_none=True))
+                request_start = time.perf_counter()
                 search_response = self.client.search().list(**config.model_dump(exclude_none=True)).execute()
+                self.record_request(time.perf_counter() - request_start, search_response)
                 pages += 1
                 search_result_items.extend(search_response.get('items', []))
                 if nextPageToken := search_response.get("nextPageToken"):
@@ -330,13 +354,25 @@ class YoutubeClient(AbstractClient[TVYoutubeSearchParameters, PostDict, UserDict
         logger.info(f"# unique response items: {len(search_result_items)}; num pages: {pages}")
         video_ids = [_["id"]["videoId"] for _ in search_result_items]
 
-        all_videos_results = []
-        for batch in itertools.batched(video_ids, 50):
+        # details of videos found by earlier (overlapping) searches
+        details = self.video_cache.get_many(video_ids, part) if self.video_cache else {}
+        missing_ids = [video_id for video_id in video_ids if video_id not in details]
+        if self.video_cache and video_ids:
+            saved = requests_for(len(video_ids)) - requests_for(len(missing_ids))
+            DETAILS_CACHE_HITS.inc(len(details), platform=self.platform_name)
+            DETAILS_CACHE_MISSES.inc(len(missing_ids), platform=self.platform_name)
+            QUOTA_UNITS_SAVED.inc(saved, platform=self.platform_name)
+            logger.info(f"video details: {len(details)}/{len(video_ids)} cached, {saved} quota units saved "
+                        f"(cache: {self.video_cache.stats()})")
+
+        for batch in itertools.batched(missing_ids, 50):
             try:
+                request_start = time.perf_counter()
                 videos_response = self.client.videos().list(
                     part=part,
                     id=','.join(batch)
                 ).execute()
+                self.record_request(time.perf_counter() - request_start, videos_response, result_page=False)
             except HttpError as err:
                 if err.resp.status == 403:
                     logger.info("Quota exceeded.")
@@ -345,7 +381,13 @@ class YoutubeClient(AbstractClient[TVYoutubeSearchParameters, PostDict, UserDict
                     logger.error(f"An HTTP error {err.resp.status} occurred:\n{err.content.decode('utf-8')}")
                     raise CollectionException(orig_exception=err)
 
-            all_videos_results.extend(videos_response.get('items', []))
+            batch_items = videos_response.get('items', [])
+            if self.video_cache:
+                self.video_cache.put_many(batch_items, part)
+            details.update((item["id"], item) for item in batch_items)
+
+        # in the order of the search results
+        all_videos_results = [details[video_id] for video_id in video_ids if video_id in details]
 
         videos: list[dict] = []
 
@@ -389,6 +431,10 @@ class YoutubeClient(AbstractClient[TVYoutubeSearchParameters, PostDict, UserDict
     def create_user_entry(self, user: UserEntry) -> DBUser:
         pass
 
+    def raw_post_data_conversion(self, data: dict) -> dict:
+        # test_data has the shape of the collected videos (search item merged with the details)
+        return data
+
     # Function to download and convert a YouTube video to MP3 format using yt-dlp
     # def download_video_as_mp3(self, video_id) -> Path | None:
     #     warnings.warn("this is not really the concern of the client anymore. but of the pipeline")
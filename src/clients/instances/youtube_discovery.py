@@ -0,0 +1,102 @@
+"""
+the discovery document of the youtube api (its resources and methods, googleapiclient creates the client from it),
+cached on disk (data/clients/discovery). build() reads and parses the document on each client setup (or fetches it).
+The cached document is checked for a new revision after YOUTUBE_DISCOVERY_MAX_AGE seconds and only replaced when the
+revision changed. Without network access the cached document is used, or the one vendored with googleapiclient.
+The youtube clients of a process share the parsed document and one http transport.
+"""
+import json
+import os
+import time
+from typing import Optional, Any
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from src.const import BIG5_CONFIG, CLIENTS_DATA_PATH
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+SERVICE = "youtube"
+VERSION = "v3"
+DISCOVERY_URL = f"https://www.googleapis.com/discovery/v1/apis/{SERVICE}/{VERSION}/rest"
+DISCOVERY_PATH = CLIENTS_DATA_PATH / "discovery"
+HTTP_TIMEOUT = 60
+
+_document: Optional[dict] = None
+_http: Optional[httplib2.Http] = None
+
+
+def shared_http() -> httplib2.Http:
+    """
+    one transport (connection pool) for all youtube clients. The requests are executed in the event loop thread
+    """
+    global _http
+    if _http is None:
+        _http = httplib2.Http(timeout=HTTP_TIMEOUT)
+    return _http
+
+
+def _parse(document: str | bytes) -> Optional[dict]:
+    try:
+        parsed = json.loads(document)
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) and "resources" in parsed else None
+
+
+def _fetch() -> Optional[dict]:
+    try:
+        response, content = shared_http().request(DISCOVERY_URL)
+    except (httplib2.HttpLib2Error, OSError) as err:
+        logger.warning(f"Could not fetch the youtube discovery document: {err}")
+        return None
+    if response.status >= 400:
+        logger.warning(f"Could not fetch the youtube discovery document: http status {response.status}")
+        return None
+    return _parse(content)
+
+
+def load_discovery_document(refresh: bool = False) -> dict:
+    """
+    the cached document, checked for a new revision when it is older than YOUTUBE_DISCOVERY_MAX_AGE (or refresh)
+    """
+    cache_file = DISCOVERY_PATH / f"{SERVICE}.{VERSION}.json"
+    cached = _parse(cache_file.read_bytes()) if cache_file.exists() else None
+    max_age = BIG5_CONFIG.youtube_discovery_max_age
+    if cached and not refresh and (not max_age or time.time() - cache_file.stat().st_mtime < max_age):
+        return cached
+
+    if (refresh or max_age) and (fetched := _fetch()):
+        if cached and fetched.get("revision") == cached.get("revision"):
+            # checked now
+            cache_file.touch()
+            return cached
+        logger.info(f"youtube discovery document revision: {fetched.get('revision')} "
+                    f"(cached: {cached.get('revision') if cached else None})")
+        DISCOVERY_PATH.mkdir(parents=True, exist_ok=True)
+        # other processes might read it
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_text(json.dumps(fetched), encoding="utf-8")
+        tmp_file.replace(cache_file)
+        return fetched
+
+    if cached:
+        return cached
+    if vendored := get_static_doc(SERVICE, VERSION):
+        logger.info("using the youtube discovery document of googleapiclient")
+        return json.loads(vendored)
+    raise RuntimeError(f"No youtube discovery document. Could not fetch {DISCOVERY_URL}")
+
+
+def discovery_document() -> dict:
+    global _document
+    if _document is None:
+        _document = load_discovery_document()
+    return _document
+
+
+def build_youtube(developer_key: str) -> Any:
+    return build_from_document(discovery_document(), developerKey=developer_key, http=shared_http())
@@ -0,0 +1,123 @@
+"""
+cache of the video details (videos().list items) of the youtube client, keyed by video id and part.
+Overlapping search windows and repeated task groups find the same videos, their details are only requested again
+after YOUTUBE_VIDEO_CACHE_TTL seconds. In memory it is a LRU of YOUTUBE_VIDEO_CACHE_SIZE entries, optionally
+also stored in a sqlite file (YOUTUBE_VIDEO_CACHE_PERSIST), that is shared by the runs and processes.
+"""
+import json
+import math
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Iterable
+
+from src.const import CLIENTS_DATA_PATH
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+VIDEO_CACHE_PATH = CLIENTS_DATA_PATH / "youtube_video_cache.sqlite"
+# videos().list: ids per request, each request costs 1 quota unit
+IDS_PER_REQUEST = 50
+REQUEST_QUOTA_UNITS = 1
+
+_TABLE = "video_details"
+
+
+def normalize_part(part: str) -> str:
+    return ",".join(sorted(p.strip() for p in part.split(",") if p.strip()))
+
+
+def requests_for(num_ids: int) -> int:
+    return math.ceil(num_ids / IDS_PER_REQUEST)
+
+
+class VideoDetailsCache:
+
+    def __init__(self, max_entries: int = 10000, ttl: int = 21600, db_path: Optional[Path] = None):
+        """
+        :param ttl: seconds
+        :param db_path: also store the details in this sqlite file
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        # (video_id, part) -> (fetched at, item), least recently used first
+        self._entries: OrderedDict[tuple[str, str], tuple[float, dict]] = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.quota_units_saved = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {_TABLE} (video_id TEXT NOT NULL, part TEXT NOT NULL, "
+                               f"fetched_at REAL NOT NULL, item TEXT NOT NULL, PRIMARY KEY (video_id, part)) "
+                               f"WITHOUT ROWID")
+            self._conn.execute(f"DELETE FROM {_TABLE} WHERE fetched_at < ?", (time.time() - self.ttl,))
+        return self._conn
+
+    def _remember(self, key: tuple[str, str], fetched_at: float, item: dict) -> None:
+        self._entries[key] = (fetched_at, item)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, video_ids: list[str], part: str) -> dict[str, dict]:
+        """
+        the cached (not expired) details of the videos. counts the hits and misses and the saved quota
+        """
+        part = normalize_part(part)
+        oldest = time.time() - self.ttl
+        found: dict[str, dict] = {}
+        for video_id in video_ids:
+            key = (video_id, part)
+            if entry := self._entries.get(key):
+                if entry[0] >= oldest:
+                    self._entries.move_to_end(key)
+                    found[video_id] = entry[1]
+                else:
+                    del self._entries[key]
+        if self.db_path and (missing := [v for v in video_ids if v not in found]):
+            rows = self._db().execute(
+                f"SELECT video_id, fetched_at, item FROM {_TABLE} WHERE part = ? AND fetched_at >= ? "
+                f"AND video_id IN (SELECT value FROM json_each(?))", (part, oldest, json.dumps(missing)))
+            for video_id, fetched_at, item in rows:
+                found[video_id] = json.loads(item)
+                self._remember((video_id, part), fetched_at, found[video_id])
+        self.hits += len(found)
+        self.misses += len(video_ids) - len(found)
+        self.quota_units_saved += (requests_for(len(video_ids)) -
+                                   requests_for(len(video_ids) - len(found))) * REQUEST_QUOTA_UNITS
+        return found
+
+    def put_many(self, items: Iterable[dict], part: str) -> None:
+        part = normalize_part(part)
+        now = time.time()
+        rows = []
+        for item in items:
+            if not (video_id := item.get("id")):
+                continue
+            self._remember((video_id, part), now, item)
+            rows.append((video_id, part, now, json.dumps(item)))
+        if self.db_path and rows:
+            self._db().executemany(f"INSERT OR REPLACE INTO {_TABLE} (video_id, part, fetched_at, item) "
+                                   f"VALUES (?, ?, ?, ?)", rows)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, int | float]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hit_rate, 3), "quota_units_saved": self.quota_units_saved}
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
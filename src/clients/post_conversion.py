@@ -0,0 +1,70 @@
+"""
+conversion of the test_data of tasks (replays, imports of archived posts) into db posts.
+Items are converted in batches (raw_post_data_conversion_batch), large tasks in a process pool (TEST_DATA_WORKERS).
+"""
+import asyncio
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from typing import Optional, Any
+
+from sqlalchemy import inspect
+
+from big5_databases.databases.db_models import DBPost
+from big5_databases.databases.external import ClientTaskConfig, ClientConfig
+from src.clients.abstract_client import AbstractClient
+from src.const import BIG5_CONFIG
+
+# items per worker call
+CHUNK_SIZE = 2000
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+# clients of the worker processes (conversion only, they are never set up)
+_worker_clients: dict[str, AbstractClient] = {}
+
+
+def convert_items(client: AbstractClient, items: list[dict], task: ClientTaskConfig,
+                  trusted: bool = False) -> list[DBPost]:
+    return [client.create_post_entry(post, task) for post in client.raw_post_data_conversion_batch(items, trusted)]
+
+
+def _post_values(post: DBPost) -> dict[str, Any]:
+    # ORM objects are not sent between processes
+    return {attr.key: getattr(post, attr.key) for attr in inspect(DBPost).column_attrs
+            if getattr(post, attr.key) is not None}
+
+
+def convert_chunk(platform: str, items: list[dict], task: ClientTaskConfig, trusted: bool) -> list[dict]:
+    """
+    runs in a worker process. returns the column values of the posts
+    """
+    if not (client := _worker_clients.get(platform)):
+        from src.platform_orchestration import get_client_class
+        client = get_client_class(platform)(ClientConfig(), SimpleNamespace(platform_name=platform))
+        _worker_clients[platform] = client
+    return [_post_values(post) for post in convert_items(client, items, task, trusted)]
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if not _process_pool:
+        _process_pool = ProcessPoolExecutor(max_workers=BIG5_CONFIG.test_data_workers)
+    return _process_pool
+
+
+async def convert_test_data(client: AbstractClient, task: ClientTaskConfig) -> list[DBPost]:
+    """
+    convert the test_data of a task. Small tasks (or TEST_DATA_WORKERS < 2) are converted in this process
+    """
+    items = task.test_data
+    trusted = BIG5_CONFIG.test_data_trusted
+    if BIG5_CONFIG.test_data_workers < 2 or len(items) < 2 * CHUNK_SIZE:
+        return convert_items(client, items, task, trusted)
+
+    loop = asyncio.get_running_loop()
+    # the workers do not need the test_data of the task again
+    light_task = task.model_copy(update={"test_data": None})
+    futures = [loop.run_in_executor(get_process_pool(), convert_chunk,
+                                    client.platform_name, list(chunk), light_task, trusted)
+               for chunk in itertools.batched(items, CHUNK_SIZE)]
+    return [DBPost(**values) for chunk in await asyncio.gather(*futures) for values in chunk]
@@ -19,8 +19,13 @@ ENV_FILE_PATH = (PROJECT_PATH / ".env").absolute().as_posix()
 
 MAIN_DIRS = [BASE_DATA_PATH, CLIENTS_TASKS_PATH, PROCESSED_TASKS_PATH, MISC_PATH]
 
-for dir in MAIN_DIRS:
-    dir.mkdir(exist_ok=True)
+
+def ensure_main_dirs() -> None:
+    """
+    create the data folders. called by the orchestrator (not at import, commands that only read do not need them)
+    """
+    for dir in MAIN_DIRS:
+        dir.mkdir(exist_ok=True)
 
 
 class Big5Config(BaseSettings):
@@ -39,6 +44,22 @@ class Big5Config(BaseSettings):
     db_type: Literal["sqlite"] = Field(alias="DB_TYPE", default="sqlite")
     reset_db: bool = Field(alias="RESET_DB", default=False)
     test_mode : bool = Field(alias="TEST_MODE", default=False)
+    # seconds, the server recomputes the database status (post counts, task states)
+    db_status_ttl: int = Field(alias="DB_STATUS_TTL", default=300)
+    # seconds, the server sets the post counters to the exact counts. 0: never
+    post_count_reconcile: int = Field(alias="POST_COUNT_RECONCILE", default=3600)
+    # write per-task traces (phases, pages) to data/traces
+    trace_tasks: bool = Field(alias="TRACE_TASKS", default=False)
+    # test_data of tasks (replay, imports) is our own collected data: no validation
+    test_data_trusted: bool = Field(alias="TEST_DATA_TRUSTED", default=False)
+    # worker processes for converting large test_data. 0: convert in the collection process
+    test_data_workers: int = Field(alias="TEST_DATA_WORKERS", default=0)
+    # seconds, the youtube discovery document on disk is checked for a new revision. 0: never
+    youtube_discovery_max_age: int = Field(alias="YOUTUBE_DISCOVERY_MAX_AGE", default=7 * 24 * 3600)
+    # cache of the youtube video details: entries in memory (0: no cache), seconds, also on disk
+    youtube_video_cache_size: int = Field(alias="YOUTUBE_VIDEO_CACHE_SIZE", default=10000)
+    youtube_video_cache_ttl: int = Field(alias="YOUTUBE_VIDEO_CACHE_TTL", default=6 * 3600)
+    youtube_video_cache_persist: bool = Field(alias="YOUTUBE_VIDEO_CACHE_PERSIST", default=False)
 
 
 BIG5_CONFIG = Big5Config()
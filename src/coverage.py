@@ -0,0 +1,153 @@
+"""
+coverage of the platform databases: number of posts per hour/day/month/year in a time range,
+windows (consecutive buckets) under a threshold and collection tasks (ClientTaskGroupConfig) to fill them.
+Counts come from the post histogram (post_histogram) or one grouped range scan on the (indexed) date_created column.
+"""
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Literal, Optional, Any
+
+from sqlalchemy import select, func, text
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from big5_databases.databases.db_models import DBPost
+from src.const import CLIENTS_TASKS_PATH
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+Granularity = Literal["hour", "day", "month", "year"]
+
+# prefix of the stored datetime ("YYYY-MM-DD HH:MM:SS.ffffff") for each granularity
+BUCKET_PREFIX_LEN: dict[str, int] = {"hour": 13, "day": 10, "month": 7, "year": 4}
+BUCKET_FORMAT: dict[str, str] = {"hour": "%Y-%m-%d %H", "day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+
+
+@dataclass
+class GapWindow:
+    start: datetime
+    end: datetime  # exclusive
+    buckets: int
+    posts: int
+
+
+def bucket_start(ts: datetime, granularity: Granularity) -> datetime:
+    match granularity:
+        case "hour":
+            return ts.replace(minute=0, second=0, microsecond=0)
+        case "day":
+            return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+        case "month":
+            return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        case "year":
+            return ts.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def next_bucket(ts: datetime, granularity: Granularity) -> datetime:
+    match granularity:
+        case "hour":
+            return ts + timedelta(hours=1)
+        case "day":
+            return ts + timedelta(days=1)
+        case "month":
+            return ts.replace(year=ts.year + ts.month // 12, month=ts.month % 12 + 1)
+        case "year":
+            return ts.replace(year=ts.year + 1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def buckets(from_time: datetime, to_time: datetime, granularity: Granularity) -> list[datetime]:
+    result = []
+    current = bucket_start(from_time, granularity)
+    while current < to_time:
+        result.append(current)
+        current = next_bucket(current, granularity)
+    return result
+
+
+def ensure_date_index(db: DatabaseManager) -> None:
+    table = DBPost.__tablename__
+    with db.get_session() as session:
+        indexed = any(
+            "date_created" in [col[2] for col in session.execute(text(f"PRAGMA index_info('{idx[1]}')"))]
+            for idx in session.execute(text(f"PRAGMA index_list('{table}')")).all())
+        if not indexed:
+            logger.info(f"creating index on {table}.date_created")
+            session.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_date_created ON {table} (date_created)"))
+            session.commit()
+
+
+def post_counts(db: DatabaseManager,
+                from_time: datetime,
+                to_time: datetime,
+                granularity: Granularity,
+                platform: Optional[str] = None) -> dict[datetime, int]:
+    """
+    posts per bucket in [from_time, to_time). Buckets without posts are 0.
+    Uses the post histogram of the database, if it has one (first updated with the posts of any writer).
+    The first and last bucket are counted completely
+    """
+    from src.post_histogram import histogram_counts, update_histogram
+    from_time = bucket_start(from_time, granularity)
+    if bucket_start(to_time, granularity) != to_time:
+        to_time = next_bucket(bucket_start(to_time, granularity), granularity)
+    if update_histogram(db, build=False):
+        counts = histogram_counts(db, granularity, from_time, to_time, platform)
+        return {b: counts.get(b, 0) for b in buckets(from_time, to_time, granularity)}
+
+    bucket = func.substr(DBPost.date_created, 1, BUCKET_PREFIX_LEN[granularity])
+    query = select(bucket, func.count()).where(
+        DBPost.date_created >= from_time, DBPost.date_created < to_time).group_by(bucket)
+    if platform:
+        query = query.where(DBPost.platform == platform)
+    with db.get_session() as session:
+        counts = {datetime.strptime(b, BUCKET_FORMAT[granularity]): c for b, c in session.execute(query)}
+    return {b: counts.get(b, 0) for b in buckets(from_time, to_time, granularity)}
+
+
+def find_gaps(counts: dict[datetime, int], granularity: Granularity, threshold: int) -> list[GapWindow]:
+    """
+    merge consecutive buckets with less than threshold posts
+    """
+    gaps: list[GapWindow] = []
+    for b, count in sorted(counts.items()):
+        if count >= threshold:
+            continue
+        if gaps and gaps[-1].end == b:
+            gaps[-1].end = next_bucket(b, granularity)
+            gaps[-1].buckets += 1
+            gaps[-1].posts += count
+        else:
+            gaps.append(GapWindow(b, next_bucket(b, granularity), 1, count))
+    return gaps
+
+
+def gap_task_groups(platform: str,
+                    gaps: list[GapWindow],
+                    task_interval: Literal["hour", "day"],
+                    static_params: dict[str, Any],
+                    group_prefix: str) -> list[dict]:
+    """
+    one ClientTaskGroupConfig (one task per interval) for each gap window
+    """
+    return [{
+        "platform": platform,
+        "group_prefix": f"{group_prefix}_{idx}",
+        "time_config": {
+            "start": gap.start.isoformat(),
+            "end": gap.end.isoformat(),
+            "interval": {f"{task_interval}s": 1},
+            "truncate_overflow": True
+        },
+        "static_params": static_params
+    } for idx, gap in enumerate(gaps)]
+
+
+def write_task_file(groups: list[dict], name: str, task_dir: Path = CLIENTS_TASKS_PATH) -> Path:
+    task_dir.mkdir(parents=True, exist_ok=True)
+    dest = task_dir / f"{name}.json"
+    json.dump(groups, dest.open("w", encoding="utf-8"), indent=2)
+    return dest
@@ -0,0 +1,218 @@
+"""
+export of platform databases to parquet, partitioned by platform/year/month
+(hive style: <dest>/platform=youtube/year=2024/month=01/part-<db>-<run>.parquet).
+Posts are read with a read-only sqlite cursor in chunks, the selected json paths of content
+(views, likes, hashtags, channel, ...) are extracted in SQL and each chunk is written as arrow record batches,
+so memory does not grow with the database.
+The rows of each partition are buffered up to chunk_size rows, each buffer is one row group. After each chunk,
+the largest buffers are written until at most chunk_size rows are buffered over all partitions
+(posts spread over many months are not buffered per month).
+The highest exported post id is stored in <dest>/_export_state.json, later exports only add the newer posts
+(as new part files). Updates and deletions of exported posts are not exported.
+A failed export removes its part files, so the next export does not duplicate their posts.
+"""
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple, Literal, Optional, Any
+
+import orjson
+
+from big5_databases.databases.db_models import DBPost
+from src.const import BASE_DATA_PATH
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+EXPORT_PATH = BASE_DATA_PATH / "export"
+STATE_FILE = "_export_state.json"
+
+POST_TABLE = DBPost.__tablename__
+
+
+class ExportField(NamedTuple):
+    name: str
+    # json path in content
+    path: str
+    kind: Literal["int", "str", "list"]
+
+
+# flattened fields of the content of each platform
+EXPORT_FIELDS: dict[str, list[ExportField]] = {
+    "youtube": [
+        ExportField("channel_id", "$.snippet.channelId", "str"),
+        ExportField("title", "$.snippet.title", "str"),
+        ExportField("views", "$.statistics.viewCount", "int"),
+        ExportField("likes", "$.statistics.likeCount", "int"),
+        ExportField("comments", "$.statistics.commentCount", "int"),
+        ExportField("tags", "$.snippet.tags", "list"),
+    ],
+    "twitter": [
+        ExportField("user_id", "$.user.id_str", "str"),
+        ExportField("lang", "$.lang", "str"),
+        ExportField("views", "$.viewCount", "int"),
+        ExportField("likes", "$.likeCount", "int"),
+        ExportField("retweets", "$.retweetCount", "int"),
+        ExportField("replies", "$.replyCount", "int"),
+        ExportField("hashtags", "$.hashtags", "list"),
+    ],
+    "tiktok": [
+        ExportField("username", "$.username", "str"),
+        ExportField("region", "$.region_code", "str"),
+        ExportField("views", "$.view_count", "int"),
+        ExportField("likes", "$.like_count", "int"),
+        ExportField("shares", "$.share_count", "int"),
+        ExportField("comments", "$.comment_count", "int"),
+        ExportField("hashtags", "$.hashtag_names", "list"),
+    ],
+}
+
+BASE_COLUMNS = ["id", "platform", "platform_id", "post_url", "date_created", "post_type", "collection_task_id"]
+
+
+@dataclass
+class ExportResult:
+    db_path: str
+    from_post_id: int
+    to_post_id: int
+    posts: int = 0
+    files: list[str] = field(default_factory=list)
+    seconds: float = 0
+
+
+def _schema(fields: list[ExportField], with_content: bool) -> Any:
+    import pyarrow as pa
+    kinds = {"int": pa.int64(), "str": pa.string(), "list": pa.list_(pa.string())}
+    columns = [("id", pa.int64()), ("platform", pa.string()), ("platform_id", pa.string()),
+               ("post_url", pa.string()), ("date_created", pa.timestamp("us")), ("post_type", pa.string()),
+               ("collection_task_id", pa.int64()), ("labels", pa.list_(pa.string()))]
+    columns += [(f.name, kinds[f.kind]) for f in fields]
+    if with_content:
+        columns.append(("content", pa.string()))
+    return pa.schema(columns)
+
+
+def _select(fields: list[ExportField], with_content: bool) -> str:
+    columns = [f"p.{c}" for c in BASE_COLUMNS] + ["json_extract(p.metadata_content, '$.labels')"]
+    for f in fields:
+        value = f"json_extract(p.content, '{f.path}')"
+        columns.append(f"CAST({value} AS INTEGER)" if f.kind == "int" else value)
+    if with_content:
+        columns.append("p.content")
+    # partition keys
+    columns += ["coalesce(substr(p.date_created, 1, 4), 'unknown')",
+                "coalesce(substr(p.date_created, 6, 2), 'unknown')"]
+    return (f"SELECT {', '.join(columns)} FROM {POST_TABLE} p "
+            f"WHERE p.platform = ? AND p.id > ? AND p.id <= ? ORDER BY p.id")
+
+
+def _convert(value: Any, kind: str) -> Any:
+    if value is None:
+        return None
+    if kind == "list":
+        values = orjson.loads(value) if isinstance(value, str) else value
+        return [str(v) for v in values] if isinstance(values, list) else None
+    if kind == "timestamp":
+        return datetime.fromisoformat(value)
+    if kind == "str":
+        return str(value)
+    return value
+
+
+def load_state(dest: Path) -> dict[str, int]:
+    """
+    database path -> highest exported post id
+    """
+    if (state_file := dest / STATE_FILE).exists():
+        return json.loads(state_file.read_text(encoding="utf-8"))
+    return {}
+
+
+def export_database(db_path: Path,
+                    dest: Path = EXPORT_PATH,
+                    full: bool = False,
+                    with_content: bool = False,
+                    chunk_size: int = 50000) -> ExportResult:
+    """
+    :param full: export all posts, not only the posts after the last export
+    :param with_content: also export the complete content (json string)
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ModuleNotFoundError as err:
+        logger.error(f"{err}. You might want to run `uv sync --extra export'")
+        raise
+
+    start = datetime.now()
+    state = load_state(dest)
+    state_key = str(Path(db_path).absolute())
+    last_id = 0 if full else state.get(state_key, 0)
+    if full and state_key in state:
+        logger.warning(f"{db_path} was exported before, the full export adds its posts again")
+    # unique per run, also for runs in the same second
+    run = f"{start:%Y%m%d_%H%M%S_%f}"
+
+    conn = sqlite3.connect(f"file:{Path(db_path).absolute()}?mode=ro", uri=True)
+    # partition directory -> open writer
+    writers: dict[Path, pq.ParquetWriter] = {}
+    result = ExportResult(str(db_path), last_id, last_id)
+    try:
+        max_id = result.to_post_id = conn.execute(f"SELECT coalesce(max(id), 0) FROM {POST_TABLE}").fetchone()[0]
+        platforms = [r[0] for r in conn.execute(f"SELECT DISTINCT platform FROM {POST_TABLE} WHERE id > ?",
+                                                (last_id,))]
+        for platform in platforms:
+            fields = EXPORT_FIELDS.get(platform, [])
+            schema = _schema(fields, with_content)
+            kinds = ["int", "str", "str", "str", "timestamp", "str", "int", "list"] + [f.kind for f in fields] + (
+                ["str"] if with_content else [])
+            # partition directory -> rows, that are not written yet
+            buffers: dict[Path, list[tuple]] = {}
+
+            def write(part_dir: Path) -> None:
+                columns = list(zip(*buffers.pop(part_dir)))
+                batch = pa.RecordBatch.from_arrays(
+                    [pa.array([_convert(v, kind) for v in col], type=schema.field(idx).type)
+                     for idx, (col, kind) in enumerate(zip(columns, kinds))], schema=schema)
+                if part_dir not in writers:
+                    part_dir.mkdir(parents=True, exist_ok=True)
+                    part_file = part_dir / f"part-{Path(db_path).stem}-{run}.parquet"
+                    result.files.append(str(part_file))
+                    writers[part_dir] = pq.ParquetWriter(part_file, schema)
+                writers[part_dir].write_batch(batch)
+
+            cursor = conn.execute(_select(fields, with_content), (platform, last_id, max_id))
+            while rows := cursor.fetchmany(chunk_size):
+                for row in rows:
+                    year, month = row[-2:]
+                    part_dir = dest / f"platform={platform}" / f"year={year}" / f"month={month}"
+                    buffers.setdefault(part_dir, []).append(row[:-2])
+                    if len(buffers[part_dir]) >= chunk_size:
+                        write(part_dir)
+                # cap the rows buffered over all partitions
+                while sum(len(buffer) for buffer in buffers.values()) > chunk_size:
+                    write(max(buffers, key=lambda d: len(buffers[d])))
+                result.posts += len(rows)
+                logger.debug(f"exported {result.posts} posts of {Path(db_path).name}")
+            for part_dir in list(buffers):
+                write(part_dir)
+    except BaseException:
+        for writer in writers.values():
+            writer.close()
+        writers.clear()
+        # the state is not advanced, the next export writes these posts again
+        for part_file in result.files:
+            Path(part_file).unlink(missing_ok=True)
+        raise
+    finally:
+        for writer in writers.values():
+            writer.close()
+        conn.close()
+
+    state[state_key] = max_id
+    dest.mkdir(parents=True, exist_ok=True)
+    (dest / STATE_FILE).write_text(json.dumps(state, indent=2), encoding="utf-8")
+    result.seconds = (datetime.now() - start).total_seconds()
+    return result
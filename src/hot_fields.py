@@ -0,0 +1,80 @@
+"""
+hot fields: a few typed values of the post content (views, channel, region, ...) that analysis filters and
+aggregates on. The clients declare them (AbstractClient.hot_fields), they become indexed virtual generated columns
+of the post table (hot_<name>), computed by sqlite from the content of each inserted post.
+Queries on hot_<name> use the index instead of parsing the json of each post.
+Adding the columns is instant, creating the indices (the backfill of the existing posts) scans the table once,
+so they are added by the command hot-fields, not when the platform managers start.
+"""
+import sqlite3
+from pathlib import Path
+from typing import NamedTuple, Literal
+
+from big5_databases.databases.db_models import DBPost
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+POST_TABLE = DBPost.__tablename__
+
+_SQL_TYPES = {"int": "INTEGER", "real": "REAL", "text": "TEXT"}
+
+
+class HotField(NamedTuple):
+    name: str
+    # json path in content
+    path: str
+    type: Literal["int", "real", "text"]
+
+    @property
+    def column(self) -> str:
+        return f"hot_{self.name}"
+
+    @property
+    def expression(self) -> str:
+        # invalid json would fail every read of the column
+        return (f"CASE WHEN json_valid(content) THEN "
+                f"CAST(json_extract(content, '{self.path}') AS {_SQL_TYPES[self.type]}) END")
+
+
+def hot_columns(conn: sqlite3.Connection) -> set[str]:
+    """
+    the generated hot field columns of the post table (table_info does not list generated columns)
+    """
+    return {row[1] for row in conn.execute(f"PRAGMA table_xinfo({POST_TABLE})")
+            if row[1].startswith("hot_") and row[6] in (2, 3)}
+
+
+def ensure_hot_fields(db_path: Path, fields: list[HotField]) -> list[str]:
+    """
+    add the missing hot field columns and their indices. returns the added columns
+    """
+    if not fields:
+        return []
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        existing = hot_columns(conn)
+        added = []
+        for field in fields:
+            if field.column in existing:
+                continue
+            logger.info(f"adding hot field {field.column} ({field.path}) to {Path(db_path).name}")
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f"ALTER TABLE {POST_TABLE} ADD COLUMN {field.column} {_SQL_TYPES[field.type]} "
+                         f"GENERATED ALWAYS AS ({field.expression}) VIRTUAL")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{POST_TABLE}_{field.column} "
+                         f"ON {POST_TABLE} ({field.column})")
+            conn.execute("COMMIT")
+            added.append(field.column)
+        return added
+    finally:
+        conn.close()
+
+
+def drop_hot_field(db_path: Path, name: str) -> None:
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute(f"DROP INDEX IF EXISTS ix_{POST_TABLE}_hot_{name}")
+        conn.execute(f"ALTER TABLE {POST_TABLE} DROP COLUMN hot_{name}")
+    finally:
+        conn.close()
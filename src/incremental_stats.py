@@ -0,0 +1,59 @@
+"""
+post counts per day/month/year of a database, the sums of its post histogram (post_histogram).
+The histogram is updated with the posts above its watermark (the highest counted post id) before,
+so a refresh only counts the new posts. The stats are stored in data/stats/<db>-<path hash>-<period>.json.
+"""
+import hashlib
+from datetime import datetime
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from src.const import BASE_DATA_PATH
+from src.coverage import BUCKET_FORMAT
+from src.post_histogram import update_histogram, rebuild_histogram, histogram_counts, histogram_watermark
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+STATS_PATH = BASE_DATA_PATH / "stats"
+
+
+class DatabaseStats(BaseModel):
+    db_path: str
+    period: str
+    created: datetime
+    # highest counted post id
+    max_post_id: int = 0
+    # posts with date_created
+    total_posts: int = 0
+    # bucket ("2024-01-31", "2024-01", "2024") -> posts
+    counts: dict[str, int] = {}
+
+
+def stats_path(db_path: Path, period: str) -> Path:
+    # databases with the same name in different folders
+    path_hash = hashlib.sha1(str(Path(db_path).absolute()).encode("utf-8")).hexdigest()[:10]
+    return STATS_PATH / f"{Path(db_path).stem}-{path_hash}-{period}.json"
+
+
+def update_stats(db: DatabaseManager, period: str, full: bool = False, store: bool = True) -> DatabaseStats:
+    """
+    Writes to the database: the histogram is built on the first call (its tables and delete trigger, all posts
+    are counted), also for databases that are not collected into anymore (backups, archives)
+    :param full: rebuild the histogram (count all posts)
+    """
+    db_path = Path(db.config.db_connection.db_path).absolute()
+    if full:
+        rebuild_histogram(db)
+    else:
+        update_histogram(db)
+    counts = histogram_counts(db, period)
+    stats = DatabaseStats(db_path=str(db_path), period=period, created=datetime.now(),
+                          max_post_id=histogram_watermark(db) or 0, total_posts=sum(counts.values()),
+                          counts={b.strftime(BUCKET_FORMAT[period]): c for b, c in sorted(counts.items())})
+    if store:
+        STATS_PATH.mkdir(parents=True, exist_ok=True)
+        stats_path(db_path, period).write_text(stats.model_dump_json(indent=2), encoding="utf-8")
+    return stats
@@ -0,0 +1,201 @@
+"""
+collection jobs, that are started through the server.
+A job runs the pending tasks of some platforms as asyncio tasks in the loop of the server
+"""
+import asyncio
+import enum
+import json
+import time
+import uuid
+from asyncio import Task, CancelledError
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional, AsyncGenerator
+
+from big5_databases.databases.db_models import CollectionResult
+from src.clients.abstract_client import CollectionException, QuotaExceeded
+from tools.project_logging import get_logger
+
+if TYPE_CHECKING:
+    from src.platform_orchestration import PlatformOrchestrator
+
+logger = get_logger(__file__)
+
+
+class JobStatus(str, enum.Enum):
+    running = "running"
+    done = "done"
+    cancelled = "cancelled"
+    failed = "failed"
+
+
+class UnknownJob(KeyError):
+    pass
+
+
+@dataclass
+class PlatformProgress:
+    tasks_done: int = 0
+    # the task raised an error (the platform stops, the job fails)
+    tasks_failed: int = 0
+    # the task is set back to INIT and the platform stops until the quota is reset
+    quota_halts: int = 0
+    posts_added: int = 0
+
+
+@dataclass
+class CollectionJob:
+    platforms: list[str]
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = JobStatus.running
+    started: datetime = field(default_factory=datetime.now)
+    finished: Optional[datetime] = None
+    error: Optional[str] = None
+    progress: dict[str, PlatformProgress] = field(default_factory=dict)
+    task: Optional[Task] = None
+    _start_perf: float = field(default_factory=time.perf_counter)
+
+    def __post_init__(self):
+        self.progress = {p: PlatformProgress() for p in self.platforms}
+
+    @property
+    def done(self) -> bool:
+        return self.status != JobStatus.running
+
+    def add_result(self, platform: str, result: CollectionResult | CollectionException) -> None:
+        progress = self.progress[platform]
+        if isinstance(result, CollectionResult):
+            progress.tasks_done += 1
+            progress.posts_added += len(result.added_posts)
+        elif isinstance(result, QuotaExceeded):
+            progress.quota_halts += 1
+        else:
+            progress.tasks_failed += 1
+
+    def state(self, orchestrator: "PlatformOrchestrator") -> dict:
+        elapsed = time.perf_counter() - self._start_perf
+        posts_added = sum(p.posts_added for p in self.progress.values())
+        return {
+            "id": self.id,
+            "status": self.status.value,
+            "started": self.started.isoformat(timespec="seconds"),
+            "finished": self.finished.isoformat(timespec="seconds") if self.finished else None,
+            "error": self.error,
+            "elapsed_s": round(elapsed, 1),
+            "posts_added": posts_added,
+            "posts_per_sec": round(posts_added / elapsed, 2) if elapsed else 0,
+            "platforms": {
+                platform: {
+                    "tasks_done": progress.tasks_done,
+                    "tasks_failed": progress.tasks_failed,
+                    "quota_halts": progress.quota_halts,
+                    "tasks_total": orchestrator.platform_managers[platform].queue_size,
+                    "posts_added": progress.posts_added
+                } for platform, progress in self.progress.items()
+            }
+        }
+
+
+class JobManager:
+    """
+    Starts, tracks and cancels collection jobs. A platform is only part of one running job at a time.
+    Finished jobs are kept for finished_ttl seconds, at most max_finished of them
+    """
+
+    def __init__(self, orchestrator: "PlatformOrchestrator", finished_ttl: int = 3600, max_finished: int = 100):
+        self.orchestrator = orchestrator
+        self.jobs: dict[str, CollectionJob] = {}
+        self.finished_ttl = finished_ttl
+        self.max_finished = max_finished
+
+    def get(self, job_id: str) -> CollectionJob:
+        if job := self.jobs.get(job_id):
+            return job
+        raise UnknownJob(f"Unknown job: {job_id}")
+
+    def prune(self) -> None:
+        """
+        remove the finished jobs, that are older than finished_ttl and the oldest ones above max_finished
+        """
+        now = datetime.now()
+        finished = sorted((job for job in self.jobs.values() if job.done and job.finished),
+                          key=lambda job: job.finished, reverse=True)
+        for idx, job in enumerate(finished):
+            if idx >= self.max_finished or (now - job.finished).total_seconds() > self.finished_ttl:
+                del self.jobs[job.id]
+
+    def running_job_of(self, platform: str) -> Optional[CollectionJob]:
+        for job in self.jobs.values():
+            if not job.done and platform in job.platforms:
+                return job
+        return None
+
+    def start(self, platforms: Optional[list[str]] = None) -> list[CollectionJob]:
+        """
+        Start a job for the given platforms (default all active platforms).
+        Platforms which are already part of a running job are not started again, the running job is returned instead
+        :return: all jobs that cover the platforms
+        """
+        if not platforms:
+            platforms = [p for p, manager in self.orchestrator.platform_managers.items() if manager.active]
+        for platform in platforms:
+            if platform not in self.orchestrator.platform_managers:
+                raise KeyError(platform)
+
+        self.prune()
+        jobs: list[CollectionJob] = []
+        new_platforms = []
+        for platform in platforms:
+            if running_job := self.running_job_of(platform):
+                if running_job not in jobs:
+                    jobs.append(running_job)
+            else:
+                new_platforms.append(platform)
+
+        if new_platforms:
+            job = CollectionJob(new_platforms)
+            job.task = asyncio.create_task(self._run(job))
+            self.jobs[job.id] = job
+            jobs.append(job)
+            logger.info(f"Started collection job {job.id}: {new_platforms}")
+        return jobs
+
+    async def _run(self, job: CollectionJob) -> None:
+        def callback_for(platform: str):
+            return lambda result: job.add_result(platform, result)
+
+        try:
+            await asyncio.gather(*[
+                self.orchestrator.platform_managers[platform].process_all_tasks(callback_for(platform))
+                for platform in job.platforms])
+            if job.status == JobStatus.running:
+                job.status = JobStatus.done
+        except CancelledError:
+            job.status = JobStatus.cancelled
+            raise
+        except Exception as err:
+            logger.error(f"Collection job {job.id} failed: {err}")
+            job.status = JobStatus.failed
+            job.error = str(err)
+        finally:
+            job.finished = datetime.now()
+
+    def cancel(self, job_id: str) -> CollectionJob:
+        job = self.get(job_id)
+        if not job.done and job.task:
+            # process_all_tasks might swallow the cancellation while sleeping between tasks
+            job.status = JobStatus.cancelled
+            job.task.cancel()
+        return job
+
+    async def progress_events(self, job_id: str, interval: float = 1.0) -> AsyncGenerator[str, None]:
+        """
+        Server-Sent Events of the job state, until the job is finished
+        """
+        job = self.get(job_id)
+        while True:
+            done = job.done
+            yield f"data: {json.dumps(job.state(self.orchestrator))}\n\n"
+            if done:
+                return
+            await asyncio.sleep(interval)
@@ -0,0 +1,208 @@
+"""
+Metrics of the collection (orchestrator, platform managers, clients) in the Prometheus text format.
+They are exposed by the server (/metrics) or, for the cli collection, by a small standalone http server.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Generator, Optional, TypeVar
+
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "platform_clients"
+
+LabelValues = tuple[str, ...]
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: Optional[tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type_name: str = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = f"{PREFIX}_{name}"
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} requires the labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label values: counts per bucket (+Inf last), sum
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Generator[None, None, None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        counts, _ = self._values.get(self._label_values(labels), ([], [0.0]))
+        return sum(counts)
+
+    def total(self, **labels: str) -> float:
+        _, total = self._values.get(self._label_values(labels), ([], [0.0]))
+        return total[0]
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: M) -> M:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.register(Counter("requests", "API requests sent by the clients", ("platform",)))
+PAGES = REGISTRY.register(Counter("pages", "Result pages fetched by the clients", ("platform",)))
+POSTS_COLLECTED = REGISTRY.register(Counter("posts_collected", "Posts returned by the APIs", ("platform",)))
+POSTS_INSERTED = REGISTRY.register(Counter("posts_inserted", "Posts added to the platform databases", ("platform",)))
+DUPLICATES_SKIPPED = REGISTRY.register(
+    Counter("duplicates_skipped", "Collected posts that were already in the database", ("platform",)))
+QUOTA_HALTS = REGISTRY.register(Counter("quota_halts", "Quota exceeded responses", ("platform",)))
+DETAILS_CACHE_HITS = REGISTRY.register(
+    Counter("details_cache_hits", "Post details taken from the client cache instead of the API", ("platform",)))
+DETAILS_CACHE_MISSES = REGISTRY.register(
+    Counter("details_cache_misses", "Post details requested from the API", ("platform",)))
+QUOTA_UNITS_SAVED = REGISTRY.register(
+    Counter("quota_units_saved", "API quota units not spent because of cached responses", ("platform",)))
+ERRORS = REGISTRY.register(Counter("errors", "Failed tasks by exception type", ("platform", "exception")))
+
+API_LATENCY = REGISTRY.register(Histogram("api_latency_seconds", "Latency of API requests", ("platform",)))
+EXECUTE_TASK_DURATION = REGISTRY.register(
+    Histogram("execute_task_duration_seconds", "Duration of the collection of a task", ("platform",)))
+DB_INSERT_DURATION = REGISTRY.register(
+    Histogram("db_insert_duration_seconds", "Duration of inserting the posts of a task", ("platform",)))
+EVENT_LOOP_LAG = REGISTRY.register(
+    Histogram("event_loop_lag_seconds", "Delay of the event loop to wake up a sleeping task",
+              buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)))
+
+
+def record_error(platform: str, exc: BaseException) -> None:
+    ERRORS.inc(platform=platform, exception=type(exc).__name__)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """
+    runs forever in the loop, that should be monitored
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    standalone exporter (daemon thread), for the collection without the server
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    logger.info(f"Metrics exposed on http://{host}:{port}/metrics")
+    return server
@@ -1,19 +1,17 @@
 from csv import DictReader
-from datetime import datetime, date
-from operator import itemgetter
+from datetime import datetime
 from pathlib import Path
-from random import choice, choices
 from typing import Generator
 
-from sqlalchemy import func, text
-from sqlalchemy.orm.attributes import flag_modified
 from tqdm.auto import tqdm
 
 from big5_databases.databases.db_mgmt import DatabaseManager
 from big5_databases.databases.db_models import DBCollectionTask, DBPost
 from big5_databases.databases.external import PostType
 from big5_databases.databases.model_conversion import PostModel
+from src import post_labels
 from src.const import BIG5_CONFIG
+from src.sampling import sample_posts
 
 
 def import_meta_files(database: Path, files: list[Path], query: str, platform: str = "instagram", language: str = "en"):
@@ -72,60 +70,25 @@ def import_meta_files(database: Path, files: list[Path], query: str, platform: s
         session.commit()
 
 
-def sample_from_data(database: Path, label: str, sample_size: int = 1750):
+def sample_from_data(database: Path, label: str, sample_size: int = 1750) -> list[str]:
+    """
+    the same number of posts of each day, labelled with label. returns their platform_ids
+    """
     db = DatabaseManager.sqlite_db_from_path(database)
-    from big5_databases.commands import posts_per_period
-    day_counts = posts_per_period("instagram-1", "day", False)
-    posts_per_day = sample_size // len(day_counts)
-    print(f"{posts_per_day=}, {posts_per_day * len(day_counts)=}")
-    extra = sample_size - (posts_per_day * len(day_counts))
-    print(f"{extra=}")
-    selected_posts_ids = []
-    for day,num_posts in tqdm(day_counts):
-        # print(selection_indices)
-        with db.get_session() as session:
-            posts = session.query(DBPost).where(func.date(DBPost.date_created) == date.fromisoformat(day)).all()
-            selection_indices = sorted(choices(range(len(posts)), k=posts_per_day))
-            # print(f"{len(posts)=},{len(posts) == num_posts} {selection_indices[-1]=}")
-
-            selected_posts = itemgetter(*selection_indices)(posts)
-            # print(len(selected_posts))
-            if len(selected_posts) != len(selection_indices):
-                print(f"missing posts for {day}. {len(selection_indices) - len(selected_posts)}")
-            for post in selected_posts:
-                pm = post.model()
-                labels = pm.metadata_content.labels or []
-                if label not in labels:
-                    labels.append(label)
-                    pm.metadata_content.labels = labels
-                    post.metadata_content = pm.metadata_content.model_dump(exclude_none=True)
-                    flag_modified(post, "metadata_content")
-                    session.add(post)
-                    selected_posts_ids.append(post.platform_id)
-            session.commit()
-    return selected_posts_ids
-
-
-# todo somewhere meta
-def remove_label(database: Path, label: str):
+    result = sample_posts(db, label, sample_size, stratify="day")
+    print(f"{result.sampled=}, {result.buckets=}, {result.short=}")
+    return result.platform_ids
+
+
+def remove_label(database: Path, label: str) -> int:
     db = DatabaseManager.sqlite_db_from_path(database)
-    with db.get_session() as session:
-        ll = session.query(DBPost).filter(text(f"'{label}' IN (SELECT value FROM json_each(json_extract(metadata_content, '$.labels')))"))
-        for post in tqdm(ll.all()):
-            labels = post.metadata_content["labels"] or []
-            if labels:
-                if label in labels:
-                    labels.remove(label)
-                    post.metadata_content["labels"] = labels
-                    flag_modified(post, "metadata_content")
+    return post_labels.remove_label(db, label)
 
 
 def get_posts_with_label(database: Path, label: str) -> Generator[PostModel, None, None]:
     db = DatabaseManager.sqlite_db_from_path(database)
-    with db.get_session() as session:
-        q = session.query(DBPost).filter(text(f"'{label}' IN (SELECT value FROM json_each(json_extract(metadata_content, '$.labels')))"))
-        for post in q:
-            yield post.model()
+    yield from post_labels.posts_with_label(db, label)
+
 
 if __name__ == "__main__":
     db = Path(BIG5_CONFIG.global_data_folder) / "databases/instagram.sqlite"
@@ -1,38 +1,186 @@
 """
 a json file in data: platform_quotas.json
-which has <platform_name>:<quota_halt_ts> pairs
+which has <platform_name>:<quota_halt_ts> pairs.
+Halts of a specific credential (api-key, account) are stored as <platform_name>:<credential>
+
+The file is only read when the registry is (re)loaded and only written when a halt is set or cleared.
+Writes happen under an exclusive file lock, merge with the current content of the file and
+replace it atomically, so several processes (collect loop, server, workers) can share it.
 """
+import hashlib
 import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from typing import Optional, Generator
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
 
 from src.const import BASE_DATA_PATH
 
+CREDENTIAL_SEP = ":"
+
 
 def fp() -> Path:
     return BASE_DATA_PATH / "platform_quotas.json"
 
-def store(current : dict[str, datetime]) -> None:
-    dump_format = {p: t.isoformat(timespec='minutes') for p, t in current.items()}
-    fp().write_text(json.dumps(dump_format))
+
+def credential_key(credential: str) -> str:
+    """
+    short, non-reversible identifier for a secret (api-key), so it can be stored in the quota file
+    """
+    return hashlib.sha1(credential.encode("utf-8")).hexdigest()[:10]
+
+
+def _key(platform: str, credential: Optional[str] = None) -> str:
+    return f"{platform}{CREDENTIAL_SEP}{credential}" if credential else platform
+
+
+class QuotaRegistry:
+    """
+    In memory cache of the quota halts, persisted in a json file.
+    Lookups (halted_until) never touch the disk.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or fp()
+        self._halts: dict[str, datetime] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self.reload(force=True)
+
+    @property
+    def _lock_path(self) -> Path:
+        return self.path.with_suffix(self.path.suffix + ".lock")
+
+    @contextmanager
+    def _file_lock(self) -> Generator[None, None, None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, self._lock_path.open("a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read(self) -> dict[str, datetime]:
+        try:
+            json_data = json.loads(self.path.read_text(encoding="utf-8") or "{}")
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            # a broken file should not stop the collection
+            return {}
+        return {k: datetime.fromisoformat(t) for k, t in json_data.items()}
+
+    def _write(self, halts: dict[str, datetime]) -> None:
+        dump_format = {k: t.isoformat(timespec='minutes') for k, t in halts.items()}
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                json.dump(dump_format, tmp_file)
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def reload(self, force: bool = False) -> None:
+        """
+        re-read the file, if it was changed (by another process) since the last read
+        """
+        mtime = self._file_mtime()
+        if not force and mtime == self._mtime:
+            return
+        halts = self._read()
+        with self._lock:
+            self._halts = halts
+            self._mtime = mtime
+
+    def _update(self, key: str, until: Optional[datetime]) -> None:
+        """
+        read-modify-write under the file lock. Changes of other processes are kept
+        """
+        with self._file_lock():
+            now = datetime.now()
+            halts = {k: t for k, t in self._read().items() if t > now}
+            if until:
+                halts[key] = until
+            else:
+                halts.pop(key, None)
+            self._write(halts)
+            self._halts = halts
+            self._mtime = self._file_mtime()
+
+    def halted_until(self, platform: str, credential: Optional[str] = None) -> Optional[datetime]:
+        """
+        @returns: the end of the halt of the platform or the credential (the later one), or None
+        """
+        now = datetime.now()
+        halts = [self._halts.get(_key(platform))]
+        if credential:
+            halts.append(self._halts.get(_key(platform, credential)))
+        active = [t for t in halts if t and t > now]
+        return max(active) if active else None
+
+    def set_halt(self, platform: str, until: datetime, credential: Optional[str] = None) -> None:
+        self._update(_key(platform, credential), until)
+
+    def clear_halt(self, platform: str, credential: Optional[str] = None) -> None:
+        if _key(platform, credential) not in self._halts:
+            return
+        self._update(_key(platform, credential), None)
+
+    def all(self) -> dict[str, datetime]:
+        return dict(self._halts)
+
+
+_registry: Optional[QuotaRegistry] = None
+
+
+def get_quota_registry() -> QuotaRegistry:
+    """
+    registry of this process. it is created on the first call
+    """
+    global _registry
+    if not _registry:
+        _registry = QuotaRegistry()
+    return _registry
+
+
+def use_quota_file(path: Path) -> QuotaRegistry:
+    """
+    replace the registry of this process with one on another file (e.g. for benchmarks and tests)
+    """
+    global _registry
+    _registry = QuotaRegistry(path)
+    return _registry
+
 
 def load_quotas() -> dict[str, datetime]:
-    if fp().exists():
-        json_data = json.load(fp().open())
-        json_data = {k: datetime.fromisoformat(t) for k, t in json_data.items()}
-        return json_data
-    else:
-        return {}
+    registry = get_quota_registry()
+    registry.reload()
+    return registry.all()
 
 
-def store_quota(platform: str, time: datetime) -> None:
-    current = load_quotas()
-    current[platform] = time
-    store(current)
+def store_quota(platform: str, time: datetime, credential: Optional[str] = None) -> None:
+    get_quota_registry().set_halt(platform, time, credential)
 
 
-def remove_quota(platform: str) -> None:
-    current = load_quotas()
-    if platform in current:
-        del current[platform]
-    store(current)
+def remove_quota(platform: str, credential: Optional[str] = None) -> None:
+    get_quota_registry().clear_halt(platform, credential)
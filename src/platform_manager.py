@@ -1,20 +1,24 @@
 import enum
 from abc import abstractmethod
-from asyncio import sleep, CancelledError
+from asyncio import sleep, CancelledError, Lock
 from datetime import datetime
 from pydantic import ValidationError
 from random import randint
-from typing import TypeVar, Optional
+from typing import TypeVar, Optional, Callable
 
 import httpx
 
 from big5_databases.databases.db_models import CollectionResult
 from big5_databases.databases.external import CollectionStatus, ClientTaskConfig, ClientConfig
 from big5_databases.databases.platform_db_mgmt import PlatformDB
-from src.clients.abstract_client import AbstractClient, PostEntry, CollectionException, \
+from src.clients.abstract_client import AbstractClient, CollectionException, \
     QuotaExceeded
+from src.clients.post_conversion import convert_test_data
 from src.const import BIG5_CONFIG
-from src.misc.platform_quotas import store_quota, remove_quota, load_quotas
+from src.post_histogram import on_posts_inserted as update_post_histogram
+from src.metrics import DB_INSERT_DURATION, POSTS_INSERTED, DUPLICATES_SKIPPED, QUOTA_HALTS, record_error
+from src.misc.platform_quotas import get_quota_registry
+from src.tracing import trace_task, trace_phase
 from tools.project_logging import get_logger
 
 T_Client = TypeVar('T_Client', bound=AbstractClient)
@@ -49,6 +53,12 @@ class PlatformManager:
         self.logger = get_logger(__name__)
         self.current_quota_halt: Optional[datetime] = None
         self.status: PlatformStatus = PlatformStatus.idle
+        # number of tasks in the current run of process_all_tasks
+        self.queue_size: int = 0
+        self._process_lock = Lock()
+        # called after the posts of a task are inserted (e.g. cached stats)
+        self.post_insert_callbacks: list[Callable[["PlatformManager", CollectionResult], None]] = [
+            update_post_histogram]
 
     @abstractmethod
     def _create_client(self, config: ClientConfig) -> T_Client:
@@ -86,6 +96,7 @@ class PlatformManager:
 
     def has_quota_halt(self) -> Optional[datetime]:
         """
+        Only checks the in memory halt. expired halts are pruned from the quota file, with the next write
         @returns: datetime if there is a halt, else None
         """
         if self.current_quota_halt:
@@ -93,7 +104,6 @@ class PlatformManager:
                 return self.current_quota_halt
             else:  # remove quota halt
                 self.current_quota_halt = None
-                remove_quota(self.platform_name)
         return None
 
     async def send_result(self, result: CollectionResult):
@@ -111,7 +121,10 @@ class PlatformManager:
         Returns: True if halt
 
         """
-        self.current_quota_halt = load_quotas().get(self.platform_name)
+        quota_registry = get_quota_registry()
+        # pick up halts, stored by other processes
+        quota_registry.reload()
+        self.current_quota_halt = quota_registry.halted_until(self.platform_name, self.client.credential_id)
         if self.client.config.ignore_initial_quota_halt:
             self.current_quota_halt = None
         if halt_until := self.has_quota_halt():
@@ -120,14 +133,31 @@ class PlatformManager:
             return True
         return False
 
-    async def process_all_tasks(self) -> list[CollectionResult]:
-        """Process all pending tasks"""
+    async def process_all_tasks(self,
+                                result_callback: Optional[Callable[[CollectionResult | CollectionException], None]] = None
+                                ) -> list[CollectionResult]:
+        """
+        Process all pending tasks.
+        Concurrent calls (collect-loop, server jobs) are processed one after another.
+        :param result_callback: called with the result of each processed task (progress reporting)
+        """
+        async with self._process_lock:
+            try:
+                return await self._process_all_tasks(result_callback)
+            finally:
+                self.status = PlatformStatus.idle
+                self.queue_size = 0
+
+    async def _process_all_tasks(self,
+                                 result_callback: Optional[Callable[[CollectionResult | CollectionException], None]]
+                                 ) -> list[CollectionResult]:
         if self.check_initial_quota_halt():
             return []
         self._setup_client()
         self.status = PlatformStatus.running
 
         tasks = self.platform_db.get_pending_tasks(BIG5_CONFIG.continue_paused_tasks)
+        self.queue_size = len(tasks)
         self.logger.info(f"Continue task queue [{self.platform_name}]: {len(tasks)}")
         if not tasks:
             return []
@@ -135,26 +165,39 @@ class PlatformManager:
         processed_tasks: list[CollectionResult] = []
         for idx, task in enumerate(tasks):
             self.logger.debug(f"Processing task- platform:{task.platform}, id:{task.id}, {idx + 1}/{len(tasks)}")
-            collection_result = await self.process_task(task)
-
-            if isinstance(collection_result, CollectionResult):
-                processed_tasks.append(collection_result)
-                if BIG5_CONFIG.send_posts:
-                    await self.send_result(collection_result)
-            #  else, CollectionException are not returned
-
-            if halt_until := self.has_quota_halt():
-                self.logger.info(f"quota halt. not continuing tasks {halt_until:%Y.%m.%d - %H:%M}")
-                return processed_tasks
-
-            if idx != len(tasks) - 1:
-                sleep_time = self.client.config.request_delay + randint(0, self.client.config.delay_randomize)
+            with trace_task(task) as trace:
                 try:
-                    await sleep(sleep_time)
-                except (KeyboardInterrupt, CancelledError):
-                    print("closing...")
+                    collection_result = await self.process_task(task)
+                except Exception as err:
+                    # the failed task is reported, the remaining tasks are not processed
+                    if result_callback:
+                        result_callback(err if isinstance(err, CollectionException) else CollectionException(err))
+                    raise
+                if trace:
+                    trace.status = type(collection_result).__name__
+                    if isinstance(collection_result, CollectionResult):
+                        trace.items = collection_result.collected_items
+
+                if isinstance(collection_result, CollectionResult):
+                    processed_tasks.append(collection_result)
+                    if BIG5_CONFIG.send_posts:
+                        await self.send_result(collection_result)
+                #  else, CollectionException are not returned
+                if result_callback:
+                    result_callback(collection_result)
+
+                if halt_until := self.has_quota_halt():
+                    self.logger.info(f"quota halt. not continuing tasks {halt_until:%Y.%m.%d - %H:%M}")
                     return processed_tasks
-        self.status = PlatformStatus.idle
+
+                if idx != len(tasks) - 1:
+                    sleep_time = self.client.config.request_delay + randint(0, self.client.config.delay_randomize)
+                    try:
+                        with trace_phase("sleep"):
+                            await sleep(sleep_time)
+                    except (KeyboardInterrupt, CancelledError):
+                        print("closing...")
+                        return processed_tasks
         return processed_tasks
 
     async def process_task(self, task: ClientTaskConfig) -> CollectionResult | CollectionException:
@@ -164,11 +207,8 @@ class PlatformManager:
             execution_ts = datetime.now()
             # todo...
             if task.test_data:
-                db_posts = []
-                for post_data in task.test_data:
-                    platform_post_entry: PostEntry = self.client.raw_post_data_conversion(post_data)
-                    db_post = self.client.create_post_entry(platform_post_entry, task)
-                    db_posts.append(db_post)
+                with trace_phase("convert"):
+                    db_posts = await convert_test_data(self.client, task)
                 collection = CollectionResult(
                     posts=db_posts,
                     users=[],
@@ -183,17 +223,27 @@ class PlatformManager:
 
             if isinstance(collection, CollectionResult):
                 # could also be an exception...
-                self.platform_db.insert_posts(collection)
+                with DB_INSERT_DURATION.time(platform=self.platform_name), trace_phase("insert"):
+                    self.platform_db.insert_posts(collection)
+                POSTS_INSERTED.inc(len(collection.added_posts), platform=self.platform_name)
+                DUPLICATES_SKIPPED.inc(len(collection.posts) - len(collection.added_posts), platform=self.platform_name)
+                for callback in self.post_insert_callbacks:
+                    callback(self, collection)
             elif isinstance(collection, QuotaExceeded):
                     self.logger.info(f"Quota exceeded [{self.platform_name}]")
+                    QUOTA_HALTS.inc(platform=self.platform_name)
                     self.current_quota_halt = collection.blocked_until
                     self.platform_db.update_task_status(task.id, CollectionStatus.INIT)
-                    store_quota(self.platform_name, self.current_quota_halt)
+                    get_quota_registry().set_halt(self.platform_name, self.current_quota_halt,
+                                                  collection.credential or self.client.credential_id)
             else:
-                raise ValueError(f"Unknown result from task execution: {collection}")
+                cause = collection.orig_exception if isinstance(collection, CollectionException) else None
+                raise ValueError(f"Unknown result from task execution: {collection}") from cause
             return collection
 
         except Exception as e:
+            # count the error of the client, not the ValueError
+            record_error(self.platform_name, e.__cause__ or e)
             self.platform_db.update_task_status(task.id, CollectionStatus.ABORTED)
             raise e
 
@@ -10,7 +10,7 @@ from big5_databases.databases.external import DBConfig, ClientConfig
 from big5_databases.databases.meta_database import MetaDatabase
 from src.clients.abstract_client import ConcreteClientClass
 from src.clients.clients_models import RunConfig
-from src.const import BIG5_CONFIG, read_run_config
+from src.const import BIG5_CONFIG, read_run_config, ensure_main_dirs
 from src.platform_manager import PlatformManager
 from src.task_manager import TaskManager
 from tools.project_logging import get_logger
@@ -35,31 +35,67 @@ class PlatformOrchestrator:
     def __init__(self, meta_db_path: Optional[Path | str] = None):
         # self.logger = get_logger(__file__)
         if not self.__instance:
-            self.platform_managers: dict[str, PlatformManager] = {}
+            ensure_main_dirs()
+            # created on first use (clients import their sdk, managers open their database)
+            self._platform_managers: dict[str, PlatformManager] = {}
+            self._all_platform_managers = False
+            self._main_db: Optional[MetaDatabase] = None
             self.run_config = RunConfig.model_validate(read_run_config())
+            self.logger = get_logger(__name__)
+            PlatformOrchestrator.__instance = self
+            self.current_tasks: list[tuple[str, Task]] = []  # platform_name, python async-task
+            self.task = TaskManager(self)
+
+    @property
+    def main_db(self) -> MetaDatabase:
+        if self._main_db is None:
             try:
-                self.main_db = MetaDatabase() # DatabaseManager.sqlite_db_from_path(BASE_DATA_PATH / "dbs/main.sqlite")
+                self._main_db = MetaDatabase() # DatabaseManager.sqlite_db_from_path(BASE_DATA_PATH / "dbs/main.sqlite")
             except ValueError as e:
                 logger.error(e)
                 logger.error("Run command 'init' (typer src/main.py run init)")
                 exit(1)
-            self.logger = get_logger(__name__)
-            self.initialize_platform_managers()
-            self.__instance = self
-            self.current_tasks: list[tuple[str, Task]] = []  # platform_name, python async-task
-            self.task = TaskManager(self)
+        return self._main_db
 
+    @property
+    def platform_managers(self) -> dict[str, PlatformManager]:
+        if not self._all_platform_managers:
+            self.initialize_platform_managers()
+            self._all_platform_managers = True
+        return self._platform_managers
 
-    def initialize_platform_managers(self, config: Optional[RunConfig] = None):
-        """Initialize managers for specified platforms or all registered platforms"""
+    def platform_manager(self, platform: str) -> Optional[PlatformManager]:
+        """
+        the manager of a platform, without creating the managers of the other platforms
+        """
+        if platform not in self._platform_managers and not self._all_platform_managers:
+            self.initialize_platform_managers(platforms={platform})
+        return self._platform_managers.get(platform)
+
+    def initialize_platform_managers(self,
+                                     config: Optional[RunConfig] = None,
+                                     platforms: Optional[set[str]] = None,
+                                     register_dbs: bool = True) -> dict[str, PlatformManager]:
+        """
+        Initialize managers for specified platforms or all platforms of the config.
+        Without a config, the managers that already exist are kept.
+        The managers are only added to platform_managers, when all of them are initialized
+        :param register_dbs: add the databases to the main db (False for the synthetic and benchmark databases)
+        """
+        keep_existing = not config
         if not config:
             config = self.run_config
 
-        registered_platforms = self.main_db.get_dbs()
+        registered_platforms = [p.platform for p in self.main_db.get_dbs()] if register_dbs else []
+        managers: dict[str, PlatformManager] = {}
 
         for platform in config.clients:
+            if platforms is not None and platform not in platforms:
+                continue
+            if keep_existing and platform in self._platform_managers:
+                continue
             # todo, dbs should have a name in the yaml
-            if platform not in [p.platform for p in registered_platforms]:
+            if register_dbs and platform not in registered_platforms:
                 self.add_platform_db(platform, config.clients[platform].db_config)
 
             client_config = config.clients[platform]
@@ -78,24 +114,29 @@ class PlatformOrchestrator:
             platform_manager = get_platform_manager(platform, client_config)
 
             if platform_manager:
-                self.platform_managers[platform] = platform_manager
-                platform_manager.active = self.run_config.clients[platform].progress
+                managers[platform] = platform_manager
+                platform_manager.active = config.clients[platform].progress
             else:
                 logger.info(f"Cannot initialize platform {platform}")
                 continue
             logger.debug(f"Initialized manager for platform: {platform}; active: {platform_manager.active}")
 
+        self._platform_managers.update(managers)
+        return managers
+
     def add_platform_db(self, platform: str, db_config: DBConfig):
         self.main_db.add_db(platform, db_config)
 
 
-    async def progress_tasks(self) -> dict[str, platform_results]:
+    async def progress_tasks(self,
+                             managers: Optional[dict[str, PlatformManager]] = None) -> dict[str, platform_results]:
         """
         Progress tasks for specified platforms or all platforms
+        :param managers: default: platform_managers
         returns {<platform_name>: [<task_name>, ...], ...}
         """
         # Create tasks for each platform
-        for platform, manager in self.platform_managers.items():
+        for platform, manager in (managers if managers is not None else self.platform_managers).items():
             if not manager.active:
                 logger.debug(f"Progress for platform: '{platform}' deactivated")
                 continue
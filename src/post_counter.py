@@ -0,0 +1,105 @@
+"""
+number of posts of a platform database, kept in a single row (table post_count).
+sqlite triggers on the post table update it in the same transaction as every insert and delete (any writer),
+so reading it does not depend on the size of the table. reconcile sets it to the exact count(*):
+the posts are counted in a read transaction (writers are not blocked, in WAL mode), only the difference
+to the counter of the same snapshot is written. The counter is installed by reconcile (command reconcile-counts).
+"""
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from big5_databases.databases.db_models import DBPost
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+POST_TABLE = DBPost.__tablename__
+COUNTER_TABLE = "post_count"
+# seconds, reconcile waits for the write transactions of the collection (sqlite busy timeout)
+BUSY_TIMEOUT = 30
+
+_COUNTER_SCHEMA = [
+    f"CREATE TABLE IF NOT EXISTS {COUNTER_TABLE} ("
+    "id INTEGER PRIMARY KEY CHECK (id = 0), count INTEGER NOT NULL, reconciled TEXT)",
+    f"CREATE TRIGGER IF NOT EXISTS {COUNTER_TABLE}_insert AFTER INSERT ON {POST_TABLE} "
+    f"BEGIN UPDATE {COUNTER_TABLE} SET count = count + 1 WHERE id = 0; END",
+    f"CREATE TRIGGER IF NOT EXISTS {COUNTER_TABLE}_delete AFTER DELETE ON {POST_TABLE} "
+    f"BEGIN UPDATE {COUNTER_TABLE} SET count = count - 1 WHERE id = 0; END",
+]
+
+
+def counter_exists(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                        (f"{COUNTER_TABLE}_insert",)).fetchone() is not None
+
+
+def read_post_counter(conn: sqlite3.Connection) -> Optional[int]:
+    """
+    None, when the database has no counter
+    """
+    try:
+        row = conn.execute(f"SELECT count FROM {COUNTER_TABLE} WHERE id = 0").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def _write(conn: sqlite3.Connection, statements: list[tuple[str, tuple]]) -> None:
+    # short write transaction
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for stmt, params in statements:
+            conn.execute(stmt, params)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _install(conn: sqlite3.Connection) -> None:
+    """
+    table and triggers, the counter starts at 0 (reconcile adds the posts that existed before)
+    """
+    _write(conn, [(stmt, ()) for stmt in _COUNTER_SCHEMA] +
+           [(f"INSERT OR IGNORE INTO {COUNTER_TABLE} (id, count) VALUES (0, 0)", ())])
+
+
+def _reconcile(conn: sqlite3.Connection) -> tuple[int, int]:
+    """
+    :return: the exact count and the drift of the counter
+    """
+    if not counter_exists(conn):
+        _install(conn)
+    # the count and the counter of the same snapshot. Inserts after it are counted by the triggers
+    conn.execute("BEGIN")
+    try:
+        counter = read_post_counter(conn) or 0
+        count = conn.execute(f"SELECT count(*) FROM {POST_TABLE}").fetchone()[0]
+    finally:
+        conn.execute("COMMIT")
+    drift = count - counter
+    _write(conn, [(f"UPDATE {COUNTER_TABLE} SET count = count + ?, reconciled = ? WHERE id = 0",
+                   (drift, datetime.now().isoformat(timespec="seconds")))])
+    return count, drift
+
+
+def reconcile_post_counter(db_path: Path, busy_timeout: float = BUSY_TIMEOUT) -> tuple[Optional[int], int]:
+    """
+    install the counter (if missing) and set it to the exact number of posts.
+    The writes are short, but wait for the running write transaction (e.g. the inserts of the collection)
+    :param busy_timeout: seconds to wait for the write lock, before sqlite3.OperationalError (database is locked)
+    :return: the counter before (None: not installed) and the exact count
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=busy_timeout)
+    try:
+        before = read_post_counter(conn)
+        if before is None:
+            logger.info(f"installing the post counter of {Path(db_path).name}")
+        count, drift = _reconcile(conn)
+    finally:
+        conn.close()
+    if before is not None and drift:
+        logger.warning(f"post counter of {Path(db_path).name} was off by {-drift}")
+    return before, count
@@ -0,0 +1,169 @@
+"""
+materialized number of posts per (platform, hour) in each platform database (table post_hour_counts).
+It is updated after the inserts of the platform managers (posts with an id above the stored watermark)
+and can be rebuilt completely. A delete trigger subtracts deleted posts and lowers the watermark to the highest
+remaining id, since sqlite reuses the ids above it. Day, month and year counts are sums of the hours.
+"""
+from datetime import datetime
+from typing import Optional, TYPE_CHECKING
+
+from sqlalchemy import Table, Column, MetaData, String, Integer, select, func, delete, inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from big5_databases.databases.db_models import CollectionResult, DBPost
+from src.coverage import BUCKET_PREFIX_LEN, BUCKET_FORMAT, Granularity
+from tools.project_logging import get_logger
+
+if TYPE_CHECKING:
+    from src.platform_manager import PlatformManager
+
+logger = get_logger(__file__)
+
+metadata = MetaData()
+
+HOUR_COUNTS = Table("post_hour_counts", metadata,
+                    Column("platform", String, primary_key=True),
+                    # "YYYY-MM-DD HH"
+                    Column("bucket_hour", String, primary_key=True),
+                    Column("count", Integer, nullable=False))
+
+# single row: the highest post id, that is counted
+HOUR_COUNTS_STATE = Table("post_hour_counts_state", metadata,
+                          Column("id", Integer, primary_key=True),
+                          Column("last_post_id", Integer, nullable=False))
+
+_hour_bucket = func.substr(DBPost.date_created, 1, BUCKET_PREFIX_LEN["hour"])
+
+_POST = DBPost.__tablename__
+DELETE_TRIGGER = f"{HOUR_COUNTS.name}_delete"
+_DELETE_TRIGGER_SQL = f"""
+    CREATE TRIGGER IF NOT EXISTS {DELETE_TRIGGER} AFTER DELETE ON {_POST}
+    WHEN OLD.id <= (SELECT last_post_id FROM {HOUR_COUNTS_STATE.name} WHERE id = 0)
+    BEGIN
+        UPDATE {HOUR_COUNTS.name} SET count = count - 1
+        WHERE platform IS OLD.platform AND bucket_hour = substr(OLD.date_created, 1, {BUCKET_PREFIX_LEN["hour"]});
+        DELETE FROM {HOUR_COUNTS.name}
+        WHERE platform IS OLD.platform AND bucket_hour = substr(OLD.date_created, 1, {BUCKET_PREFIX_LEN["hour"]})
+          AND count <= 0;
+        UPDATE {HOUR_COUNTS_STATE.name} SET last_post_id = coalesce((SELECT max(id) FROM {_POST}), 0)
+        WHERE id = 0 AND last_post_id > coalesce((SELECT max(id) FROM {_POST}), 0);
+    END"""
+
+
+def histogram_exists(db: DatabaseManager) -> bool:
+    with db.get_session() as session:
+        return inspect(session.connection()).has_table(HOUR_COUNTS.name)
+
+
+def _last_post_id(session: Session) -> Optional[int]:
+    return session.scalar(select(HOUR_COUNTS_STATE.c.last_post_id).where(HOUR_COUNTS_STATE.c.id == 0))
+
+
+def histogram_watermark(db: DatabaseManager) -> Optional[int]:
+    """
+    the highest counted post id, None without histogram
+    """
+    with db.get_session() as session:
+        if not inspect(session.connection()).has_table(HOUR_COUNTS_STATE.name):
+            return None
+        return _last_post_id(session)
+
+
+def _delete_trigger_exists(session: Session) -> bool:
+    return session.scalar(text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+                          {"name": DELETE_TRIGGER}) is not None
+
+
+def _count_posts_after(session: Session, last_post_id: int) -> int:
+    """
+    add the posts with a higher id to the histogram, returns the new watermark
+    """
+    max_id = session.scalar(select(func.max(DBPost.id)))
+    if max_id is None or max_id <= last_post_id:
+        return last_post_id
+    new_counts = select(DBPost.platform, _hour_bucket, func.count()).where(
+        DBPost.id > last_post_id, DBPost.id <= max_id, DBPost.date_created.is_not(None)
+    ).group_by(DBPost.platform, _hour_bucket)
+    stmt = sqlite_insert(HOUR_COUNTS).from_select(["platform", "bucket_hour", "count"], new_counts)
+    session.execute(stmt.on_conflict_do_update(index_elements=["platform", "bucket_hour"],
+                                               set_={"count": HOUR_COUNTS.c["count"] + stmt.excluded["count"]}))
+    session.execute(sqlite_insert(HOUR_COUNTS_STATE).values(id=0, last_post_id=max_id)
+                    .on_conflict_do_update(index_elements=["id"], set_={"last_post_id": max_id}))
+    return max_id
+
+
+def rebuild_histogram(db: DatabaseManager) -> int:
+    """
+    recount all posts. returns the number of hour buckets
+    """
+    with db.get_session() as session:
+        metadata.create_all(session.connection())
+        session.execute(text(_DELETE_TRIGGER_SQL))
+        session.execute(delete(HOUR_COUNTS))
+        session.execute(delete(HOUR_COUNTS_STATE))
+        _count_posts_after(session, 0)
+        session.commit()
+        return session.scalar(select(func.count()).select_from(HOUR_COUNTS))
+
+
+def update_histogram(db: DatabaseManager, build: bool = True) -> bool:
+    """
+    count the posts inserted since the last update (any writer, the posts above the watermark).
+    :param build: the first call builds the histogram (scans all posts). Otherwise, nothing is done without histogram
+    :return: if the database has a histogram
+    """
+    with db.get_session() as session:
+        last_post_id = _last_post_id(session) if inspect(session.connection()).has_table(HOUR_COUNTS_STATE.name) \
+            else None
+        trigger_exists = last_post_id is not None and _delete_trigger_exists(session)
+    if last_post_id is None:
+        if not build:
+            return False
+        logger.info("building the post histogram")
+        rebuild_histogram(db)
+        return True
+    if not trigger_exists:
+        # a histogram of an older version, deleted posts are still counted
+        logger.info("rebuilding the post histogram (adding its delete trigger)")
+        rebuild_histogram(db)
+        return True
+    with db.get_session() as session:
+        _count_posts_after(session, last_post_id)
+        session.commit()
+    return True
+
+
+def on_posts_inserted(manager: "PlatformManager", collection: CollectionResult) -> None:
+    """
+    post_insert_callback of the platform managers. Databases without histogram are skipped,
+    building it would block the collection (histogram --rebuild)
+    """
+    if not collection.added_posts:
+        return
+    try:
+        update_histogram(manager.platform_db.db_mgmt, build=False)
+    except Exception as err:
+        # the histogram can be rebuilt, the collection should go on
+        logger.error(f"Could not update the post histogram of {manager.platform_name}: {err}")
+
+
+def histogram_counts(db: DatabaseManager,
+                     granularity: Granularity,
+                     from_time: Optional[datetime] = None,
+                     to_time: Optional[datetime] = None,
+                     platform: Optional[str] = None) -> dict[datetime, int]:
+    """
+    posts per bucket from the histogram (only buckets with posts)
+    """
+    bucket = func.substr(HOUR_COUNTS.c.bucket_hour, 1, BUCKET_PREFIX_LEN[granularity])
+    query = select(bucket, func.sum(HOUR_COUNTS.c["count"])).group_by(bucket)
+    if from_time:
+        query = query.where(HOUR_COUNTS.c.bucket_hour >= f"{from_time:%Y-%m-%d %H}")
+    if to_time:
+        query = query.where(HOUR_COUNTS.c.bucket_hour < f"{to_time:%Y-%m-%d %H}")
+    if platform:
+        query = query.where(HOUR_COUNTS.c.platform == platform)
+    with db.get_session() as session:
+        return {datetime.strptime(b, BUCKET_FORMAT[granularity]): c for b, c in session.execute(query)}
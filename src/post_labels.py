@@ -0,0 +1,155 @@
+"""
+labels of the posts (metadata_content.labels) in a side table post_labels (post_id, label),
+indexed by post and by label. sqlite triggers keep it in sync with metadata_content (any writer).
+Adding and removing labels are single UPDATE statements on metadata_content, the posts are found by index.
+"""
+import json
+from typing import Iterable, Optional, Generator
+
+from sqlalchemy import Table, Column, MetaData, String, Integer, PrimaryKeyConstraint, Index, select, func, text, \
+    update, case, type_coerce, bindparam, Select
+from sqlalchemy.orm import Session
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from big5_databases.databases.db_models import DBPost
+from big5_databases.databases.model_conversion import PostModel
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+metadata = MetaData()
+
+POST_LABELS = Table("post_labels", metadata,
+                    Column("post_id", Integer, nullable=False),
+                    Column("label", String, nullable=False),
+                    PrimaryKeyConstraint("post_id", "label"),
+                    Index("ix_post_labels_label", "label", "post_id"),
+                    sqlite_with_rowid=False)
+
+_POST = DBPost.__tablename__
+_LABELS = POST_LABELS.name
+
+_LABEL_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {_LABELS}_insert AFTER INSERT ON {_POST}
+        WHEN json_type(NEW.metadata_content, '$.labels') = 'array'
+        BEGIN
+            INSERT OR IGNORE INTO {_LABELS} (post_id, label)
+            SELECT NEW.id, value FROM json_each(NEW.metadata_content, '$.labels');
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {_LABELS}_update AFTER UPDATE OF metadata_content ON {_POST}
+        BEGIN
+            DELETE FROM {_LABELS} WHERE post_id = OLD.id;
+            INSERT OR IGNORE INTO {_LABELS} (post_id, label)
+            SELECT NEW.id, value FROM json_each(NEW.metadata_content, '$.labels')
+            WHERE json_type(NEW.metadata_content, '$.labels') = 'array';
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {_LABELS}_delete AFTER DELETE ON {_POST}
+        BEGIN
+            DELETE FROM {_LABELS} WHERE post_id = OLD.id;
+        END"""
+]
+
+_TRIGGERS = [f"{_LABELS}_insert", f"{_LABELS}_update", f"{_LABELS}_delete"]
+
+_REMOVE_LABEL = f"""
+    UPDATE {_POST} SET metadata_content = json_set(metadata_content, '$.labels',
+        (SELECT json_group_array(value) FROM json_each({_POST}.metadata_content, '$.labels') WHERE value != :label))
+    WHERE id IN (SELECT post_id FROM {_LABELS} WHERE label = :label {{id_filter}})"""
+
+
+def label_index_exists(db: DatabaseManager) -> bool:
+    """
+    the table and its triggers (without them the table would not follow the changes of the posts)
+    """
+    with db.get_session() as session:
+        names = set(session.scalars(text("SELECT name FROM sqlite_master WHERE name IN :names").bindparams(
+            bindparam("names", expanding=True)), {"names": [_LABELS] + _TRIGGERS}))
+    return names == {_LABELS, *_TRIGGERS}
+
+
+def build_label_index(db: DatabaseManager) -> int:
+    """
+    create the table and triggers and fill it from metadata_content (scans all posts once).
+    returns the number of (post, label) rows
+    """
+    with db.get_session() as session:
+        metadata.create_all(session.connection())
+        for trigger in _LABEL_TRIGGERS:
+            session.execute(text(trigger))
+        session.execute(POST_LABELS.delete())
+        session.execute(text(f"""
+            INSERT OR IGNORE INTO {_LABELS} (post_id, label)
+            SELECT p.id, l.value FROM {_POST} p, json_each(p.metadata_content, '$.labels') l
+            WHERE json_type(p.metadata_content, '$.labels') = 'array'"""))
+        session.commit()
+        return session.scalar(select(func.count()).select_from(POST_LABELS))
+
+
+def ensure_label_index(db: DatabaseManager) -> None:
+    """
+    build the index, when the table or one of the triggers is missing
+    """
+    if not label_index_exists(db):
+        logger.info("building the post label index")
+        build_label_index(db)
+
+
+def add_label_to_selection(session: Session, label: str, selection: Select) -> int:
+    """
+    add the label to the posts of the selection (select of post ids), that do not have it yet.
+    returns the number of labelled posts
+    """
+    posts = DBPost.__table__
+    # the json text, not the python value
+    metadata_content = type_coerce(posts.c.metadata_content, String)
+    labels = case((func.json_type(metadata_content, "$.labels") == "array",
+                   func.json_extract(metadata_content, "$.labels")), else_="[]")
+    labelled = update(posts).where(
+        posts.c.id.in_(selection),
+        posts.c.id.not_in(select(POST_LABELS.c.post_id).where(POST_LABELS.c.label == label))
+    ).values(metadata_content=func.json_set(func.coalesce(func.nullif(metadata_content, "null"), "{}"), "$.labels",
+                                            func.json_insert(labels, "$[#]", label)))
+    return session.execute(labelled).rowcount
+
+
+def add_label(db: DatabaseManager, label: str, post_ids: Iterable[int]) -> int:
+    """
+    add the label to the posts (that do not have it yet). returns the number of labelled posts
+    """
+    ensure_label_index(db)
+    with db.get_session() as session:
+        ids = func.json_each(json.dumps(list(post_ids))).table_valued("value")
+        labelled = add_label_to_selection(session, label, select(ids.c.value))
+        session.commit()
+    return labelled
+
+
+def remove_label(db: DatabaseManager, label: str, post_ids: Optional[list[int]] = None) -> int:
+    """
+    remove the label from all posts (or the given ones). returns the number of changed posts
+    """
+    ensure_label_index(db)
+    with db.get_session() as session:
+        if post_ids is None:
+            result = session.execute(text(_REMOVE_LABEL.format(id_filter="")), {"label": label})
+        else:
+            result = session.execute(text(_REMOVE_LABEL.format(
+                id_filter="AND post_id IN (SELECT value FROM json_each(:post_ids))")),
+                {"label": label, "post_ids": json.dumps(post_ids)})
+        session.commit()
+    return result.rowcount
+
+
+def count_labels(db: DatabaseManager) -> dict[str, int]:
+    ensure_label_index(db)
+    with db.get_session() as session:
+        return dict(session.execute(select(POST_LABELS.c.label, func.count()).group_by(POST_LABELS.c.label)).all())
+
+
+def posts_with_label(db: DatabaseManager, label: str) -> Generator[PostModel, None, None]:
+    ensure_label_index(db)
+    with db.get_session() as session:
+        query = select(DBPost).join(POST_LABELS, POST_LABELS.c.post_id == DBPost.id).where(
+            POST_LABELS.c.label == label).order_by(DBPost.id)
+        for post in session.execute(query).scalars():
+            yield post.model()
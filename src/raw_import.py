@@ -0,0 +1,218 @@
+"""
+import of raw api dumps (backups) into a platform database.
+Records are streamed from JSON, JSONL or CSV files, converted in worker processes (raw_post_data_conversion,
+create_post_entry) and bulk inserted, skipping posts that are already in the database.
+The posts of each file belong to a synthetic collection task "import_<file name>".
+Only a few chunks are in flight at a time, so memory stays flat for large dumps.
+Records that cannot be converted are skipped and reported with their index in the file.
+"""
+import csv
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Generator, Iterator, Optional, Any
+
+import orjson
+from sqlalchemy import insert, select
+from tqdm.auto import tqdm
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from big5_databases.databases.db_models import DBCollectionTask, DBPost
+from big5_databases.databases.external import ClientTaskConfig, CollectionStatus
+from src.clients.post_conversion import convert_chunk
+from src.post_histogram import update_histogram
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+RAW_FORMATS = ["json", "jsonl", "csv"]
+
+
+@dataclass
+class ImportSummary:
+    file: str
+    task_id: int
+    records: int = 0
+    added: int = 0
+    duplicates: int = 0
+    min_date: Optional[datetime] = None
+    max_date: Optional[datetime] = None
+    errors: list[str] = field(default_factory=list)
+
+
+def _unflatten(row: dict[str, str]) -> dict[str, Any]:
+    # csv exports with dotted columns: "statistics.like_count" -> {"statistics": {"like_count": ...}}
+    record: dict[str, Any] = {}
+    for key, value in row.items():
+        parts = key.split(".")
+        target = record
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return record
+
+
+def iter_raw_records(file: Path, items_path: Optional[str] = None) -> Generator[dict, None, None]:
+    """
+    stream the records of a dump.
+    :param items_path: for JSON: dotted path to the list of records (e.g. "data.videos"), default: top level list
+    """
+    suffix = file.suffix.lower().lstrip(".")
+    if suffix in ("jsonl", "ndjson"):
+        with file.open("rb") as fin:
+            for line in fin:
+                if line.strip():
+                    yield orjson.loads(line)
+    elif suffix == "csv":
+        with file.open(encoding="utf-8-sig", newline="") as fin:
+            for row in csv.DictReader(fin):
+                yield _unflatten(row)
+    elif suffix == "json":
+        try:
+            import ijson
+        except ModuleNotFoundError as err:
+            logger.error(f"{err}. JSON dumps are streamed with ijson. You might want to run `uv sync --extra import'")
+            raise
+        with file.open("rb") as fin:
+            yield from ijson.items(fin, f"{items_path}.item" if items_path else "item", use_float=True)
+    else:
+        raise ValueError(f"Unknown dump format: {file.suffix}. Use one of {RAW_FORMATS}")
+
+
+def convert_records(platform: str, items: list[dict], task: ClientTaskConfig, trusted: bool,
+                    first_index: int) -> tuple[list[dict], list[str]]:
+    """
+    runs in a worker process. A chunk that fails is converted record by record, the failing records are skipped
+    :param first_index: index of the first item in the file
+    :return: the column values of the posts and the errors
+    """
+    try:
+        return convert_chunk(platform, items, task, trusted), []
+    except Exception:
+        pass
+    values, errors = [], []
+    for idx, item in enumerate(items, start=first_index):
+        try:
+            values.extend(convert_chunk(platform, [item], task, trusted))
+        except Exception as err:
+            errors.append(f"record {idx}: {type(err).__name__}: {err}")
+    return values, errors
+
+
+def create_import_task(db: DatabaseManager, platform: str, file: Path) -> tuple[int, ClientTaskConfig]:
+    """
+    synthetic (done) collection task for the posts of a file. An existing import task of the file is reused
+    """
+    task_name = f"import_{file.stem}"
+    with db.get_session() as session:
+        task = session.query(DBCollectionTask).where(DBCollectionTask.task_name == task_name).one_or_none()
+        if not task:
+            task = DBCollectionTask(task_name=task_name,
+                                    platform=platform,
+                                    # from/to_time: dates of the imported posts
+                                    collection_config={"query": "",
+                                                       "from_time": datetime.now().isoformat(),
+                                                       "to_time": datetime.now().isoformat()},
+                                    status=CollectionStatus.DONE,
+                                    execution_ts=datetime.now())
+            session.add(task)
+            session.commit()
+        task_config = ClientTaskConfig.model_validate({"id": task.id,
+                                                       "task_name": task_name,
+                                                       "platform": platform,
+                                                       "collection_config": task.collection_config})
+        return task.id, task_config
+
+
+def insert_new_posts(db: DatabaseManager, values: list[dict[str, Any]], summary: ImportSummary) -> None:
+    """
+    bulk insert of the posts, that are not in the database (platform_id) or earlier in the chunk
+    """
+    with db.get_session() as session:
+        ids = [v["platform_id"] for v in values]
+        existing = set()
+        for batch in itertools.batched(ids, 900):
+            existing.update(session.scalars(select(DBPost.platform_id).where(DBPost.platform_id.in_(batch))))
+        new_values = []
+        for v in values:
+            if v["platform_id"] in existing:
+                continue
+            existing.add(v["platform_id"])
+            new_values.append(v)
+        if new_values:
+            session.execute(insert(DBPost), new_values)
+            session.commit()
+    summary.added += len(new_values)
+    summary.duplicates += len(values) - len(new_values)
+    dates = [v["date_created"] for v in new_values if v.get("date_created")]
+    if dates:
+        summary.min_date = min(summary.min_date or min(dates), *dates)
+        summary.max_date = max(summary.max_date or max(dates), *dates)
+
+
+def import_raw_file(db: DatabaseManager,
+                    platform: str,
+                    file: Path,
+                    executor: ProcessPoolExecutor,
+                    items_path: Optional[str] = None,
+                    trusted: bool = False,
+                    chunk_size: int = 2000,
+                    window: int = 8) -> ImportSummary:
+    """
+    :param window: max number of chunks that are converted or waiting to be inserted
+    """
+    task_id, task = create_import_task(db, platform, file)
+    summary = ImportSummary(file=str(file), task_id=task_id)
+    pending: deque[Future] = deque()
+
+    def insert_done(wait_all: bool):
+        while pending and (wait_all or len(pending) >= window):
+            try:
+                values, errors = pending.popleft().result()
+                for error in errors:
+                    logger.warning(f"{file.name}: {error}")
+                summary.errors.extend(errors)
+                insert_new_posts(db, values, summary)
+            except Exception as err:
+                logger.error(f"{file.name}: chunk failed: {err}")
+                summary.errors.append(str(err))
+
+    records: Iterator[dict] = iter_raw_records(file, items_path)
+    with tqdm(desc=file.name, unit="posts") as progress:
+        for chunk in itertools.batched(records, chunk_size):
+            pending.append(executor.submit(convert_records, platform, list(chunk), task, trusted, summary.records))
+            summary.records += len(chunk)
+            insert_done(False)
+            progress.update(len(chunk))
+        insert_done(True)
+
+    if summary.min_date:
+        with db.get_session() as session:
+            db_task = session.get(DBCollectionTask, task_id)
+            db_task.collection_config = db_task.collection_config | {
+                "from_time": summary.min_date.isoformat(), "to_time": summary.max_date.isoformat()}
+            session.commit()
+    logger.info(f"import {file.name}: {summary.records} records, {summary.added} added, "
+                f"{summary.duplicates} duplicates")
+    return summary
+
+
+def import_raw(db: DatabaseManager,
+               platform: str,
+               files: list[Path],
+               items_path: Optional[str] = None,
+               trusted: bool = False,
+               workers: int = 4,
+               chunk_size: int = 2000) -> list[ImportSummary]:
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        summaries = [import_raw_file(db, platform, file, executor, items_path, trusted, chunk_size, 2 * workers)
+                     for file in files]
+    try:
+        # the inserts bypass the post_insert_callbacks of the platform managers
+        update_histogram(db, build=False)
+    except Exception as err:
+        logger.error(f"Could not update the post histogram: {err}")
+    return summaries
@@ -0,0 +1,199 @@
+"""
+stratified samples of posts (e.g. annotation sets): quotas per bucket (hour/day/month/year of date_created or
+the value of a json path of content, like language or region), sampled in SQL without replacement
+and labelled in one UPDATE (post_labels).
+One scan keeps each post with a probability of a bit more than quota/bucket size, and
+ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY random()) picks the quota from these candidates,
+so only a few rows per bucket are sorted. Buckets that still miss posts are filled with a second query.
+"""
+import math
+import random
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text, table, column, select
+from sqlalchemy.orm import Session
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from big5_databases.databases.db_models import DBPost
+from src.coverage import BUCKET_PREFIX_LEN
+from src.post_labels import ensure_label_index, label_index_exists, add_label_to_selection, POST_LABELS
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+_POST = DBPost.__tablename__
+
+
+@dataclass
+class SampleResult:
+    label: str
+    stratify: str
+    buckets: int = 0
+    sampled: int = 0
+    labelled: int = 0
+    # bucket -> posts missing to fill its quota
+    short: dict[str, int] = field(default_factory=dict)
+    platform_ids: list[str] = field(default_factory=list)
+    seconds: float = 0
+
+
+def bucket_expression(stratify: str) -> str:
+    """
+    :param stratify: hour, day, month, year or a json path of content ("$.lang")
+    """
+    if stratify in BUCKET_PREFIX_LEN:
+        return f"substr(date_created, 1, {BUCKET_PREFIX_LEN[stratify]})"
+    if stratify.startswith("$"):
+        return "CAST(json_extract(content, :bucket_path) AS TEXT)"
+    raise ValueError(f"Unknown stratification: {stratify}")
+
+
+def _filters(platform: Optional[str], from_time: Optional[datetime], to_time: Optional[datetime],
+             exclude_label: Optional[str], label_index: bool = True) -> tuple[str, dict]:
+    """
+    :param label_index: exclude the label with post_labels, otherwise with the labels of metadata_content
+    """
+    conditions, params = ["1"], {}
+    if platform:
+        conditions.append("platform = :platform")
+        params["platform"] = platform
+    if from_time:
+        conditions.append("date_created >= :from_time")
+        params["from_time"] = f"{from_time:%Y-%m-%d %H:%M:%S}"
+    if to_time:
+        conditions.append("date_created < :to_time")
+        params["to_time"] = f"{to_time:%Y-%m-%d %H:%M:%S}"
+    if exclude_label and label_index:
+        conditions.append(f"id NOT IN (SELECT post_id FROM {POST_LABELS.name} WHERE label = :exclude_label)")
+        params["exclude_label"] = exclude_label
+    elif exclude_label:
+        conditions.append("NOT EXISTS (SELECT 1 FROM json_each(metadata_content, '$.labels') "
+                          "WHERE json_type(metadata_content, '$.labels') = 'array' AND value = :exclude_label)")
+        params["exclude_label"] = exclude_label
+    return " AND ".join(conditions), params
+
+
+def split_quotas(bucket_counts: dict[str, int], sample_size: int) -> dict[str, int]:
+    """
+    the same quota for each bucket, the rest of the division goes to random buckets
+    """
+    if not bucket_counts:
+        return {}
+    per_bucket, extra = divmod(sample_size, len(bucket_counts))
+    quotas = {b: per_bucket for b in bucket_counts}
+    for b in random.sample(list(bucket_counts), extra):
+        quotas[b] += 1
+    return quotas
+
+
+# random() is a 64 bit integer, the lower 32 bits are compared with the threshold of the bucket
+_RANDOM_RANGE = 1 << 32
+
+
+def candidate_threshold(quota: int, bucket_size: int) -> int:
+    """
+    threshold for keeping a post as candidate: quota + 4 standard deviations (and some) are expected
+    """
+    if not bucket_size:
+        return 0
+    return int(min(1.0, (quota + 4 * math.sqrt(quota) + 10) / bucket_size) * _RANDOM_RANGE)
+
+
+def _bucket_counts(session: Session, bucket: str, where: str, params: dict) -> dict[str, int]:
+    return dict(session.execute(text(
+        f"SELECT {bucket} AS bucket, count(*) FROM {_POST} WHERE {where} AND {bucket} IS NOT NULL GROUP BY 1"),
+        params).all())
+
+
+def _sample(session: Session, bucket: str, where: str, params: dict, prefilter: bool) -> None:
+    """
+    add the posts of the buckets in temp.sample_quotas to temp.sampled_posts, up to the quota of each bucket
+    """
+    candidate_filter = "AND (random() & 4294967295) < q.threshold" if prefilter else \
+        "AND p.id NOT IN (SELECT id FROM temp.sampled_posts)"
+    session.execute(text(f"""
+        INSERT INTO temp.sampled_posts (id, platform_id, bucket)
+        WITH candidates AS (
+            SELECT p.id, p.platform_id, {bucket} AS bucket
+            FROM {_POST} p JOIN temp.sample_quotas q ON q.bucket = {bucket}
+            WHERE {where} {candidate_filter}),
+        ranked AS (
+            SELECT id, platform_id, bucket, ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY random()) AS rn
+            FROM candidates)
+        SELECT r.id, r.platform_id, r.bucket FROM ranked r JOIN temp.sample_quotas q ON q.bucket = r.bucket
+        WHERE r.rn <= q.quota"""), params)
+
+
+def sample_posts(db: DatabaseManager,
+                 label: str,
+                 sample_size: Optional[int] = None,
+                 per_bucket: Optional[int] = None,
+                 quotas: Optional[dict[str, int]] = None,
+                 stratify: str = "day",
+                 platform: Optional[str] = None,
+                 from_time: Optional[datetime] = None,
+                 to_time: Optional[datetime] = None,
+                 exclude_label: Optional[str] = None,
+                 dry: bool = False) -> SampleResult:
+    """
+    sample posts and add the label to them. One of sample_size (split evenly over the buckets),
+    per_bucket or quotas (bucket -> number of posts) is required
+    :param exclude_label: do not sample posts with this label (e.g. the label itself for extending a sample)
+    :param dry: do not label the posts and do not change the database (the label index is not built)
+    """
+    start = datetime.now()
+    if not dry:
+        ensure_label_index(db)
+    result = SampleResult(label, stratify)
+    bucket = bucket_expression(stratify)
+    where, params = _filters(platform, from_time, to_time, exclude_label, not dry or label_index_exists(db))
+    if stratify.startswith("$"):
+        params["bucket_path"] = stratify
+
+    with db.get_session() as session:
+        bucket_counts = _bucket_counts(session, bucket, where, params)
+        if quotas is None:
+            if per_bucket is not None:
+                quotas = {b: per_bucket for b in bucket_counts}
+            elif sample_size is not None:
+                quotas = split_quotas(bucket_counts, sample_size)
+            else:
+                raise ValueError("sample_size, per_bucket or quotas is required")
+        result.buckets = len(quotas)
+        result.short = {b: q - bucket_counts.get(b, 0) for b, q in quotas.items() if bucket_counts.get(b, 0) < q}
+
+        for temp_table in ("sample_quotas", "sampled_posts"):
+            session.execute(text(f"DROP TABLE IF EXISTS temp.{temp_table}"))
+        session.execute(text("CREATE TEMP TABLE sample_quotas "
+                             "(bucket TEXT PRIMARY KEY, quota INTEGER NOT NULL, threshold INTEGER NOT NULL)"))
+        session.execute(text("CREATE TEMP TABLE sampled_posts (id INTEGER PRIMARY KEY, platform_id TEXT, bucket TEXT)"))
+        session.execute(text("INSERT INTO temp.sample_quotas (bucket, quota, threshold) VALUES (:b, :q, :t)"),
+                        [{"b": b, "q": q, "t": candidate_threshold(q, bucket_counts.get(b, 0))}
+                         for b, q in quotas.items()])
+        _sample(session, bucket, where, params, prefilter=True)
+
+        # buckets with too few candidates (unlikely): the missing posts from all of their posts
+        sampled = dict(session.execute(text("SELECT bucket, count(*) FROM temp.sampled_posts GROUP BY bucket")).all())
+        missing = {b: min(q, bucket_counts.get(b, 0)) - sampled.get(b, 0) for b, q in quotas.items()}
+        missing = {b: m for b, m in missing.items() if m > 0}
+        if missing:
+            logger.debug(f"filling {len(missing)} buckets")
+            session.execute(text("DELETE FROM temp.sample_quotas"))
+            session.execute(text("INSERT INTO temp.sample_quotas (bucket, quota, threshold) VALUES (:b, :q, 0)"),
+                            [{"b": b, "q": m} for b, m in missing.items()])
+            _sample(session, bucket, where, params, prefilter=False)
+
+        result.platform_ids = list(session.scalars(text("SELECT platform_id FROM temp.sampled_posts")))
+        result.sampled = len(result.platform_ids)
+        if not dry:
+            sampled_posts = table("sampled_posts", column("id"), schema="temp")
+            result.labelled = add_label_to_selection(session, label, select(sampled_posts.c.id))
+            session.commit()
+        for temp_table in ("sample_quotas", "sampled_posts"):
+            session.execute(text(f"DROP TABLE temp.{temp_table}"))
+    result.seconds = (datetime.now() - start).total_seconds()
+    logger.info(f"sampled {result.sampled} posts in {result.buckets} buckets ({stratify}) in {result.seconds:.1f}s, "
+                f"labelled {result.labelled} with {label}")
+    return result
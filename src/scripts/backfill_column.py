@@ -0,0 +1,116 @@
+"""
+copy or merge a column (e.g. metadata_content) of the posts of a source database into the posts
+of a target database with the same platform_id.
+The source is attached to the target and updated in batches of source ids (UPDATE ... FROM),
+each batch in its own transaction. No rows are loaded into python.
+"""
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Literal, Optional, Callable
+
+from big5_databases.databases.db_models import DBPost
+from src.const import BASE_DATA_PATH
+from tools.env_root import root
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+POST_TABLE = DBPost.__tablename__
+
+BackfillMode = Literal["copy", "merge"]
+
+
+@dataclass
+class BackfillResult:
+    column: str
+    mode: str
+    # source posts with a value
+    total: int = 0
+    source_rows: int = 0
+    updated: int = 0
+    batches: int = 0
+    seconds: float = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.source_rows / self.seconds if self.seconds else 0
+
+
+def _columns(conn: sqlite3.Connection, schema: str) -> list[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({POST_TABLE})")]
+
+
+def ensure_platform_id_index(conn: sqlite3.Connection) -> None:
+    """
+    the target posts are looked up by platform_id
+    """
+    indexed = any(
+        [col[2] for col in conn.execute(f"PRAGMA main.index_info('{idx[1]}')")][:1] == ["platform_id"]
+        for idx in conn.execute(f"PRAGMA main.index_list('{POST_TABLE}')").fetchall())
+    if not indexed:
+        logger.info(f"creating index on {POST_TABLE}.platform_id")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS main.ix_{POST_TABLE}_platform_id ON {POST_TABLE} (platform_id)")
+
+
+def backfill_column(src: Path,
+                    target: Path,
+                    column: str = "metadata_content",
+                    mode: BackfillMode = "copy",
+                    only_missing: bool = False,
+                    batch_size: int = 20000,
+                    progress: Optional[Callable[[BackfillResult], None]] = None) -> BackfillResult:
+    """
+    :param mode: copy: replace the target value. merge: json_patch the source object into the target object
+    (the keys of the source win, a null in the source removes the key)
+    :param only_missing: only update target posts without a value (NULL, {}, null)
+    :param progress: called after each batch
+    """
+    start = datetime.now()
+    result = BackfillResult(column, mode)
+    conn = sqlite3.connect(target, isolation_level=None)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (str(src),))
+        for schema in ("main", "src"):
+            if column not in _columns(conn, schema):
+                raise ValueError(f"{POST_TABLE} of {schema} has no column: {column}")
+        ensure_platform_id_index(conn)
+
+        value = f"json_patch(coalesce(d.{column}, '{{}}'), s.{column})" if mode == "merge" else f"s.{column}"
+        missing = f"AND (d.{column} IS NULL OR d.{column} IN ('{{}}', 'null'))" if only_missing else ""
+        update = f"""
+            UPDATE main.{POST_TABLE} AS d SET {column} = {value}
+            FROM src.{POST_TABLE} AS s
+            WHERE s.id > ? AND s.id <= ? AND s.{column} IS NOT NULL
+              AND d.platform_id = s.platform_id {missing}"""
+
+        result.total, min_id, max_id = conn.execute(
+            f"SELECT count(*), min(id), max(id) FROM src.{POST_TABLE} WHERE {column} IS NOT NULL").fetchone()
+        logger.info(f"backfill {column} ({mode}) of {result.total} posts from {src.name} into {target.name}")
+        last_id = (min_id or 0) - 1
+        # id ranges, the last range ends at max_id (no remaining rows)
+        while max_id is not None and last_id < max_id:
+            batch_end = min(last_id + batch_size, max_id)
+            conn.execute("BEGIN")
+            conn.execute(update, (last_id, batch_end))
+            result.updated += conn.execute("SELECT changes()").fetchone()[0]
+            conn.execute("COMMIT")
+            result.source_rows += conn.execute(
+                f"SELECT count(*) FROM src.{POST_TABLE} WHERE id > ? AND id <= ? AND {column} IS NOT NULL",
+                (last_id, batch_end)).fetchone()[0]
+            result.batches += 1
+            result.seconds = (datetime.now() - start).total_seconds()
+            last_id = batch_end
+            if progress:
+                progress(result)
+        conn.execute("DETACH DATABASE src")
+    finally:
+        conn.close()
+    result.seconds = (datetime.now() - start).total_seconds()
+    return result
+
+
+if __name__ == "__main__":
+    root(".")
+    print(backfill_column(BASE_DATA_PATH / "twitter_20_01_2025_backup.sqlite", BASE_DATA_PATH / "twitter.sqlite"))
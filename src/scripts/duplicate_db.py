@@ -1,51 +1,158 @@
+"""
+copy a platform database, completely (sqlite online backup) or a subset of the posts (by platform,
+date range, task name prefix) with their collection tasks.
+The subset is copied in SQL (ATTACH + INSERT INTO ... SELECT), the tasks get new ids in the destination
+and the posts are linked to them through a temporary id map. No rows are loaded into python.
+The side tables of the posts (post counter, label index, histogram) and their triggers are not copied,
+they are rebuilt from the copied posts (reconcile-counts, labels, histogram).
+"""
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
-from big5_databases.databases.db_mgmt import DatabaseManager
 from big5_databases.databases.db_models import DBCollectionTask, DBPost
-from big5_databases.databases.external import DBConfig, SQliteConnection
 from src.const import BASE_DATA_PATH
-from sqlalchemy import select
-
+from src.post_counter import COUNTER_TABLE
 from tools.env_root import root
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+POST_TABLE = DBPost.__tablename__
+TASK_TABLE = DBCollectionTask.__tablename__
+
+# derived from the posts (post_counter, post_labels, post_histogram), empty copies would be taken as complete
+SIDE_TABLES = (COUNTER_TABLE, "post_labels", "post_hour_counts", "post_hour_counts_state")
+
+
+@dataclass
+class SubsetFilter:
+    platform: Optional[str] = None
+    from_date: Optional[datetime] = None
+    to_date: Optional[datetime] = None
+    task_prefix: Optional[str] = None
+
+    def where(self) -> tuple[str, list]:
+        """
+        conditions on the source posts "p" and tasks "t"
+        """
+        conditions, params = ["1"], []
+        if self.platform:
+            conditions.append("p.platform = ?")
+            params.append(self.platform)
+        # sqlalchemy stores datetimes as "YYYY-MM-DD HH:MM:SS.ffffff"
+        if self.from_date:
+            conditions.append("p.date_created >= ?")
+            params.append(f"{self.from_date:%Y-%m-%d %H:%M:%S}")
+        if self.to_date:
+            conditions.append("p.date_created < ?")
+            params.append(f"{self.to_date:%Y-%m-%d %H:%M:%S}")
+        if self.task_prefix:
+            conditions.append("t.task_name LIKE ? ESCAPE '\\'")
+            escaped = self.task_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"{escaped}%")
+        return " AND ".join(conditions), params
+
+
+@dataclass
+class CopyResult:
+    mode: str
+    tasks: int = 0
+    posts: int = 0
+    seconds: float = 0
+
+
+def full_copy(src: Path, dest: Path, pages: int = 4096) -> CopyResult:
+    """
+    page-wise copy with the sqlite online backup api (the source can be in use)
+    """
+    start = datetime.now()
+    src_conn, dest_conn = sqlite3.connect(src), sqlite3.connect(dest)
+    try:
+        src_conn.backup(dest_conn, pages=pages,
+                        progress=lambda _, remaining, total: logger.debug(f"backup: {total - remaining}/{total} pages"))
+        posts = dest_conn.execute(f"SELECT count(*) FROM {POST_TABLE}").fetchone()[0]
+        tasks = dest_conn.execute(f"SELECT count(*) FROM {TASK_TABLE}").fetchone()[0]
+    finally:
+        src_conn.close()
+        dest_conn.close()
+    return CopyResult("full", tasks, posts, (datetime.now() - start).total_seconds())
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> list[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
 
 
-def dupl(original, model):
-    return model(**{
-        k: v for k, v in original.__dict__.items()
-        if not k.startswith('_')  # Skip SQLAlchemy internal attrs
-           and k != 'id'  # Skip primary key
-    })
+def _create_schema(conn: sqlite3.Connection) -> list[str]:
+    """
+    create the missing tables of the attached source in main (without the side tables).
+    returns the index and trigger statements (for after the copy)
+    """
+    existing = {row[0] for row in conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+    after_copy = []
+    for obj_type, name, tbl_name, sql in conn.execute(
+            "SELECT type, name, tbl_name, sql FROM src.sqlite_master "
+            "WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'").fetchall():
+        if tbl_name in existing or tbl_name in SIDE_TABLES:
+            continue
+        if obj_type == "table":
+            conn.execute(sql)
+        elif obj_type == "index":
+            after_copy.append(sql)
+        elif obj_type == "trigger" and not any(side_table in sql for side_table in SIDE_TABLES):
+            after_copy.append(sql)
+    return after_copy
 
 
-def find_duplicates(db_config: DBConfig, new_db_config: DBConfig):
-    db = DatabaseManager(db_config)
-    new_db = DatabaseManager(new_db_config)
+def subset_copy(src: Path, dest: Path, subset: SubsetFilter) -> CopyResult:
+    """
+    copy the selected posts and their tasks into dest (created or extended).
+    Tasks that exist in dest (task_name) are reused, posts that exist in dest (platform_id) are skipped
+    """
+    start = datetime.now()
+    conn = sqlite3.connect(dest, isolation_level=None)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (str(src),))
+        after_copy = _create_schema(conn)
+        where, params = subset.where()
+        joined = f"FROM src.{POST_TABLE} p LEFT JOIN src.{TASK_TABLE} t ON t.id = p.collection_task_id"
+        selected = f"{joined} WHERE {where}"
 
-    with new_db.get_session() as new_session:
+        task_cols = [c for c in _columns(conn, "src", TASK_TABLE) if c != "id"]
+        post_cols = [c for c in _columns(conn, "src", POST_TABLE) if c not in ("id", "collection_task_id")]
 
-        with db.get_session() as session:
-            added_tasks: dict[str, DBCollectionTask] = {}
+        conn.execute("BEGIN")
+        conn.execute("CREATE TEMP TABLE task_map (old_id INTEGER PRIMARY KEY, new_id INTEGER)")
+        conn.execute(f"""
+            INSERT INTO main.{TASK_TABLE} ({", ".join(task_cols)})
+            SELECT {", ".join(f"st.{c}" for c in task_cols)} FROM src.{TASK_TABLE} st
+            WHERE st.id IN (SELECT DISTINCT p.collection_task_id {selected})
+              AND NOT EXISTS (SELECT 1 FROM main.{TASK_TABLE} mt WHERE mt.task_name = st.task_name)""", params)
+        tasks = conn.execute("SELECT changes()").fetchone()[0]
+        conn.execute(f"""
+            INSERT INTO temp.task_map (old_id, new_id)
+            SELECT st.id, mt.id FROM src.{TASK_TABLE} st JOIN main.{TASK_TABLE} mt ON mt.task_name = st.task_name
+            WHERE st.id IN (SELECT DISTINCT p.collection_task_id {selected})""", params)
+        conn.execute(f"""
+            INSERT INTO main.{POST_TABLE} ({", ".join(post_cols)}, collection_task_id)
+            SELECT {", ".join(f"p.{c}" for c in post_cols)}, tm.new_id
+            {joined} LEFT JOIN temp.task_map tm ON tm.old_id = p.collection_task_id
+            WHERE {where} AND NOT EXISTS (
+                SELECT 1 FROM main.{POST_TABLE} mp WHERE mp.platform_id = p.platform_id)""", params)
+        posts = conn.execute("SELECT changes()").fetchone()[0]
+        conn.execute("DROP TABLE temp.task_map")
+        conn.execute("COMMIT")
 
-            q = select(DBPost, DBCollectionTask).where(DBPost.collection_task_id == DBCollectionTask.id)
-            res = session.execute(q)
-            for idx, a in enumerate(res):
-                # print(idx)
-                new_post = dupl(a[0], DBPost)
-                new_session.add(new_post)
-                if a[1]:
-                    if a[1].task_name in added_tasks:
-                        new_post.collection_task = added_tasks[a[1].task_name]
-                    else:
-                        task = dupl(a[1], DBCollectionTask)
-                        new_session.add(task)
-                        added_tasks[task.task_name] = task
-                        new_post.collection_task = task
-                        print(f"adding {task.task_name}")
-        print("done")
+        for sql in after_copy:
+            conn.execute(sql)
+        conn.execute("DETACH DATABASE src")
+    finally:
+        conn.close()
+    return CopyResult("subset", tasks, posts, (datetime.now() - start).total_seconds())
 
 
 if __name__ == "__main__":
     root(".")
-    existing = DBConfig(db_connection=SQliteConnection(db_path=Path(BASE_DATA_PATH / "youtube.sqlite")))
-    new = DBConfig(db_connection=SQliteConnection(db_path=Path((BASE_DATA_PATH / "new.sqlite"))))
-    find_duplicates(existing, new)
+    print(full_copy(BASE_DATA_PATH / "youtube.sqlite", BASE_DATA_PATH / "new.sqlite"))
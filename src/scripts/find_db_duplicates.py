@@ -1,34 +1,106 @@
-from sqlalchemy import select
+"""
+find and delete duplicate rows (same value in a column, e.g. platform_id) in SQL.
+The copies to keep are ranked with a window function, the ids of the others are staged in a temp table
+and deleted in batches of ids (one transaction each).
+"""
+from dataclasses import dataclass, field
+from typing import Literal
+
+from sqlalchemy import select, func, delete, insert, text, table, column
 
 from big5_databases.databases.db_mgmt import DatabaseManager
 from big5_databases.databases.db_models import Base, DBPost
-from big5_databases.databases.external import DBConfig
 from src.const import BASE_DATA_PATH
 from tools.env_root import root
+from tools.project_logging import get_logger
+
+logger = get_logger(__file__)
+
+KeepStrategy = Literal["oldest", "newest", "richest"]
+
+_REMOVE_IDS = table("dedupe_remove_ids", column("id"), schema="temp")
+
+
+@dataclass
+class DuplicateReport:
+    column: str
+    keep: str
+    duplicate_groups: int = 0
+    rows_to_remove: int = 0
+    removed: int = 0
+    # value, number of rows
+    examples: list[tuple[str, int]] = field(default_factory=list)
 
 
-def find_duplicates(db_config: DBConfig, col: str, model: Base = DBPost, dry= False):
-    db = DatabaseManager(db_config)
+def _keep_order(model: Base, keep: KeepStrategy) -> list:
+    match keep:
+        case "oldest":
+            return [model.id.asc()]
+        case "newest":
+            return [model.id.desc()]
+        case "richest":
+            # the longest json content, the oldest of equally long ones
+            return [func.length(model.content).desc(), model.id.asc()]
+        case _:
+            raise ValueError(f"Unknown keep strategy: {keep}")
+
+
+def find_duplicates(db: DatabaseManager,
+                    col: str = "platform_id",
+                    model: Base = DBPost,
+                    dry: bool = False,
+                    keep: KeepStrategy = "oldest",
+                    batch_size: int = 5000,
+                    num_examples: int = 10) -> DuplicateReport:
+    """
+    :param keep: which row of each group stays: oldest/newest (row id) or richest (longest content)
+    :param batch_size: rows deleted per transaction
+    """
+    column = getattr(model, col)
+    report = DuplicateReport(column=col, keep=keep)
+    duplicate_values = select(column).group_by(column).having(func.count() > 1)
+
+    ranked = select(model.id,
+                    func.row_number().over(partition_by=column, order_by=_keep_order(model, keep)).label("rank")
+                    ).where(column.in_(duplicate_values)).subquery()
 
-    uniques = set()
-    to_remove = []
     with db.get_session() as session:
-        items = session.execute(select(model)).scalars()
-        for item in items:
-            val = getattr(item, col)
-            if val in uniques:
-                to_remove.append(item)
-                if not dry:
-                    session.delete(item)
-                to_remove.append(item)
-            else:
-                uniques.add(val)
+        report.duplicate_groups = session.scalar(select(func.count()).select_from(duplicate_values.subquery()))
+        report.examples = [tuple(r) for r in session.execute(
+            select(column, func.count()).group_by(column).having(func.count() > 1)
+            .order_by(func.count().desc()).limit(num_examples))]
+        engine = session.get_bind()
+
+    # one connection, the temp table only exists in it
+    with engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS temp.dedupe_remove_ids"))
+        conn.execute(text("CREATE TEMP TABLE dedupe_remove_ids (id INTEGER PRIMARY KEY)"))
+        conn.execute(insert(_REMOVE_IDS).from_select(["id"], select(ranked.c.id).where(ranked.c.rank > 1)))
+        conn.commit()
+        report.rows_to_remove = conn.scalar(select(func.count()).select_from(_REMOVE_IDS))
+
+        last_id = -1
+        while not dry:
+            batch = select(_REMOVE_IDS.c.id).where(_REMOVE_IDS.c.id > last_id).order_by(_REMOVE_IDS.c.id)
+            batch_end = conn.scalar(select(func.max(batch.limit(batch_size).subquery().c.id)))
+            if batch_end is None:
+                break
+            report.removed += conn.execute(
+                delete(model).where(model.id.in_(batch.where(_REMOVE_IDS.c.id <= batch_end)))).rowcount
+            conn.commit()
+            last_id = batch_end
+            logger.debug(f"removed {report.removed}/{report.rows_to_remove}")
+        conn.execute(text("DROP TABLE temp.dedupe_remove_ids"))
+        conn.commit()
 
     if dry:
-        print(f"Would remove {len(to_remove)}")
-    else:
-        print(f"Removed {len(to_remove)}")
+        logger.info(f"Would remove {report.rows_to_remove} rows ({report.duplicate_groups} duplicate values)")
+        return report
+    logger.info(f"Removed {report.removed} rows ({report.duplicate_groups} duplicate values)")
+    return report
+
 
 if __name__ == "__main__":
     root(".")
-    find_duplicates(DBConfig("sqlite", (BASE_DATA_PATH / "youtube.sqlite").as_posix()), "platform_id", dry=False)
\ No newline at end of file
+    print(find_duplicates(DatabaseManager.sqlite_db_from_path(BASE_DATA_PATH / "youtube.sqlite"), "platform_id",
+                          dry=True))
@@ -1,39 +1,55 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-from fastapi import FastAPI, BackgroundTasks
+import orjson
+from fastapi import FastAPI, BackgroundTasks, Query
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
-from starlette.responses import RedirectResponse
+from starlette.responses import RedirectResponse, StreamingResponse, Response
 
 from big5_databases.databases.db_settings import SqliteSettings
 from big5_databases.databases.external import ClientTaskConfig
+from src.bulk_submit import BulkSubmitSummary, submit_ndjson
 from src.clients.clients_models import ClientTaskGroupConfig, all_task_schemas
 from src.clients.task_parser import generate_configs, parse_task_data
+from src.const import BIG5_CONFIG
+from src.job_manager import JobManager, UnknownJob
+from src.metrics import REGISTRY, CONTENT_TYPE, monitor_event_loop_lag
 from src.platform_orchestration import PlatformOrchestrator
 from starlette.exceptions import HTTPException
 
-from src.status import general_databases_status
+from src.status import general_databases_status, DatabaseStatusCache
 from tools.project_logging import get_logger
 
 
 class PlatformClientState:
     def __init__(self):
         self.orchestrator = PlatformOrchestrator()
+        self.jobs = JobManager(self.orchestrator)
+        self.db_status = DatabaseStatusCache(self.orchestrator, BIG5_CONFIG.db_status_ttl,
+                                             BIG5_CONFIG.post_count_reconcile)
+        # validation and expansion of bulk submitted tasks
+        self.process_pool = ProcessPoolExecutor(max_workers=4)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state = PlatformClientState()
+    app.state.db_status.start()
     task = asyncio.create_task(app.state.orchestrator.run_collect_loop())
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
     yield
     task.cancel()
+    lag_monitor.cancel()
+    app.state.db_status.stop()
+    app.state.process_pool.shutdown(cancel_futures=True)
 
 
 app = FastAPI(lifespan=lifespan)
-executor = ThreadPoolExecutor(max_workers=4)
 
 
 @app.get("/")
@@ -58,12 +74,87 @@ async def submit(request: Request, tasks: all_task_schemas,
     return added_tasks
 
 
-@app.post("/continue")
-async def collect(request: Request, platform_name: str, background_tasks: BackgroundTasks):
+def _start_jobs(request: Request, platforms: Optional[list[str]]) -> list[str]:
+    jobs: JobManager = request.app.state.jobs
+    try:
+        return [job.id for job in jobs.start(platforms)]
+    except KeyError as err:
+        raise HTTPException(status_code=404, detail=f"No manager for platform: {err}")
+
+
+@app.post("/submit_bulk")
+async def submit_bulk(request: Request, batch_size: int = 1000, stream_task_names: bool = False):
+    """
+    Submit tasks as NDJSON (each line a task, a task-group or a list of them).
+    Returns a summary (added tasks per platform, rejected lines) or, with stream_task_names,
+    a NDJSON stream of the added task names of each batch followed by the summary
+    """
     orch: PlatformOrchestrator = request.app.state.orchestrator
-    loop = asyncio.get_event_loop()
-    loop.run_in_executor(executor, orch.progress_tasks, [platform_name])
-    # background_tasks.add_task(orch.progress_tasks, [platform_name])
+    summary = BulkSubmitSummary()
+    added_batches = submit_ndjson(orch, request.stream(), request.app.state.process_pool, summary, batch_size)
+
+    if not stream_task_names:
+        async for _ in added_batches:
+            pass
+        return summary.model_dump()
+
+    async def stream():
+        async for task_names in added_batches:
+            yield orjson.dumps({"task_names": task_names}) + b"\n"
+        yield orjson.dumps({"summary": summary.model_dump()}) + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/continue")
+async def collect(request: Request, platform_name: str) -> dict[str, list[str]]:
+    return {"job_ids": _start_jobs(request, [platform_name])}
+
+
+@app.post("/jobs")
+async def start_job(request: Request, platforms: Optional[list[str]] = Query(None)) -> dict[str, list[str]]:
+    """
+    Start collecting the pending tasks of the platforms (default: all active platforms).
+    Platforms that are already collected by a running job are not started twice, the id of that job is returned
+    """
+    return {"job_ids": _start_jobs(request, platforms)}
+
+
+@app.get("/jobs")
+async def list_jobs(request: Request) -> list[dict]:
+    jobs: JobManager = request.app.state.jobs
+    jobs.prune()
+    return [job.state(jobs.orchestrator) for job in jobs.jobs.values()]
+
+
+@app.get("/jobs/{job_id}")
+async def job_progress(request: Request, job_id: str, interval: float = 1.0) -> StreamingResponse:
+    """
+    Server-Sent Events stream with the progress of the job, until it is finished
+    """
+    jobs: JobManager = request.app.state.jobs
+    try:
+        jobs.get(job_id)
+    except UnknownJob as err:
+        raise HTTPException(status_code=404, detail=err.args[0])
+    return StreamingResponse(jobs.progress_events(job_id, interval), media_type="text/event-stream")
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(request: Request, job_id: str) -> dict:
+    jobs: JobManager = request.app.state.jobs
+    try:
+        return jobs.cancel(job_id).state(jobs.orchestrator)
+    except UnknownJob as err:
+        raise HTTPException(status_code=404, detail=err.args[0])
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """
+    Prometheus exposition of the collection metrics
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 
 @app.get("/run_state")
@@ -79,11 +170,21 @@ async def set_activate(request: Request, platform: str, active: bool):
 
 
 @app.get("/status")
-async def status(task_status: bool = True, databases: Optional[list[Path]] = None):
-    return general_databases_status(task_status, databases)
+async def status(request: Request, task_status: bool = True, databases: Optional[list[Path]] = Query(None),
+                 fast: bool = False):
+    """
+    Status of the RUN_CONFIG databases from the cache (see "computed_at").
+    Other databases are counted in a worker thread.
+    fast: current post numbers from the post counters of the databases
+    """
+    if databases or fast:
+        rows = await run_in_threadpool(general_databases_status, task_status, databases, fast)
+        return {"computed_at": datetime.now().isoformat(timespec="seconds"), "databases": rows}
+    return request.app.state.db_status.status(task_status)
 
 
 @app.get("/databases")
-async def databases() -> dict[str, str]:
+async def databases(request: Request) -> dict[str, str]:
+    orch: PlatformOrchestrator = request.app.state.orchestrator
     return {platform: str(manager.platform_db.db_config.db_connection.db_path.relative_to(SqliteSettings().SQLITE_DBS_BASE_PATH)) for platform, manager in
-            PlatformOrchestrator().platform_managers.items()}
+            orch.platform_managers.items()}
@@ -1,47 +1,199 @@
+"""
+status of the platform databases: number of posts, task states and file size.
+Each database is read with its own read-only sqlite connection, several databases in parallel (thread pool).
+The fast mode reads the number of posts from the post counter (post_counter) or estimates it
+(sqlite_stat1 or the max rowid) instead of counting them.
+"""
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, TYPE_CHECKING, Generator
 
-from sqlalchemy.sql.schema import Table
+from big5_databases.databases.db_models import CollectionResult, DBCollectionTask, DBPost
+from src.post_counter import read_post_counter, reconcile_post_counter, BUSY_TIMEOUT
+from tools.project_logging import get_logger
 
-from big5_databases.databases import db_utils
-from big5_databases.databases.db_mgmt import DatabaseManager
-from big5_databases.databases.db_utils import count_posts, check_platforms
-from src.platform_orchestration import PlatformOrchestrator
+if TYPE_CHECKING:
+    from src.platform_manager import PlatformManager
+    from src.platform_orchestration import PlatformOrchestrator
+    from big5_databases.databases.external import DBConfig
 
+logger = get_logger(__file__)
 
-def general_databases_status(task_status: bool = True, databases: Optional[list[Path]] = None):
-    orchestrator = PlatformOrchestrator()
+TASK_STATUS_TYPES = ["done", "init", "paused", "aborted"]
+POST_TABLE = DBPost.__tablename__
+TASK_TABLE = DBCollectionTask.__tablename__
 
-    task_status_types = ["done", "init", "paused", "aborted"] if task_status else []
-    results = []
 
-    def calc_row(db: DatabaseManager, platform_: str) -> dict[str, str | int]:
-        if task_status:
-            tasks = db_utils.count_states(db)
-            status_numbers = [str(tasks.get(t, 0)) for t in task_status_types]
-        else:
-            status_numbers = []
-        total_posts = str(count_posts(db=db))
-        size = str(f"{int(db_utils.file_size(db) / (1024 * 1024))} Mb")
-        return {"platform": platform_, "total":total_posts,
-                "size": size, "path":str(db.config.db_connection.db_path)} | dict(zip(task_status_types, status_numbers))
-
-    # use a database
-    if databases:
-        for db_path in databases:
-            db = DatabaseManager.sqlite_db_from_path(db_path, create=False)
-            platforms = list(check_platforms(db))
+def connect_read_only(db_path: Path) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{Path(db_path).absolute()}?mode=ro", uri=True, check_same_thread=False)
+
+
+def estimate_post_count(conn: sqlite3.Connection) -> int:
+    """
+    the post counter, otherwise the row count of the last ANALYZE (sqlite_stat1),
+    otherwise the max rowid (exact, when no post was deleted)
+    """
+    if (counted := read_post_counter(conn)) is not None:
+        return counted
+    try:
+        # the first number of each row of the table is its row count
+        if stat := conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (POST_TABLE,)).fetchone():
+            return int(stat[0].split()[0])
+    except sqlite3.OperationalError:
+        # no sqlite_stat1 table, the database was never analyzed
+        pass
+    return conn.execute(f"SELECT coalesce(max(rowid), 0) FROM {POST_TABLE}").fetchone()[0]
+
+
+def count_post_rows(conn: sqlite3.Connection) -> int:
+    # sqlite uses the smallest index for count(*)
+    return conn.execute(f"SELECT count(*) FROM {POST_TABLE}").fetchone()[0]
+
+
+def file_size(db_path: Path) -> int:
+    # including the write-ahead log
+    return sum(os.path.getsize(p) for p in (db_path, Path(f"{db_path}-wal")) if p.exists())
+
+
+def database_status_row(db_path: Path, platform: Optional[str] = None, task_status: bool = True,
+                        fast: bool = False) -> dict[str, str | int]:
+    """
+    :param platform: the platform of the database. when None, it is read from the tasks
+    """
+    db_path = Path(db_path)
+    conn = connect_read_only(db_path)
+    try:
+        if not platform:
+            platforms = [r[0] for r in conn.execute(f"SELECT DISTINCT platform FROM {TASK_TABLE} LIMIT 2")]
             if len(platforms) > 1:
-                raise ValueError("Database has more than one platform")
-            platform = platforms[0]
+                raise ValueError(f"Database has more than one platform: {db_path}")
+            platform = platforms[0] if platforms else ""
+        row: dict[str, str | int] = {"platform": platform,
+                                     "total": estimate_post_count(conn) if fast else count_post_rows(conn),
+                                     "size": f"{int(file_size(db_path) / (1024 * 1024))} Mb",
+                                     "path": str(db_path)}
+        if task_status:
+            states = {s.lower(): c for s, c in conn.execute(
+                f"SELECT status, count(*) FROM {TASK_TABLE} GROUP BY status")}
+            row |= {t: states.get(t, 0) for t in TASK_STATUS_TYPES}
+        return row
+    finally:
+        conn.close()
+
+
+def scan_databases(databases: list[tuple[Optional[str], Path]],
+                   task_status: bool = True,
+                   fast: bool = False,
+                   max_workers: int = 8) -> Generator[dict[str, str | int], None, None]:
+    """
+    status rows of the databases (platform, path), in the order they are done
+    """
+    with ThreadPoolExecutor(max_workers=min(max_workers, max(len(databases), 1))) as executor:
+        futures = {executor.submit(database_status_row, path, platform, task_status, fast): path
+                   for platform, path in databases}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as err:
+                logger.error(f"Could not compute the status of {futures[future]}: {err}")
+
+
+def run_config_db_configs() -> dict[str, "DBConfig"]:
+    """
+    the database configs of the RUN-CONFIG, read from the config (without creating the clients and platform managers)
+    """
+    from src.clients.clients_models import RunConfig
+    from src.const import BIG5_CONFIG, read_run_config
+    config = RunConfig.model_validate(read_run_config())
+    for client_config in config.clients.values():
+        client_config.db_config.test_mode = BIG5_CONFIG.test_mode
+    return {platform: client_config.db_config for platform, client_config in config.clients.items()}
+
+
+def run_config_databases() -> list[tuple[Optional[str], Path]]:
+    return [(platform, db_config.db_connection.db_path) for platform, db_config in run_config_db_configs().items()]
+
+
+def general_databases_status(task_status: bool = True, databases: Optional[list[Path]] = None,
+                             fast: bool = False) -> list[dict[str, str | int]]:
+    """
+    status of the given databases, or of the databases of the RUN-CONFIG
+    """
+    selected = [(None, db_path) for db_path in databases] if databases else run_config_databases()
+    return list(scan_databases(selected, task_status, fast))
+
+
+class DatabaseStatusCache:
+    """
+    Keeps the status rows of the RUN_CONFIG databases in memory.
+    A background thread recomputes them every `ttl` seconds (post numbers from the post counters), in between the post counts
+    are updated from the inserts of the platform managers.
+    Every `reconcile_interval` seconds, the post counters are set to the exact counts. These are writes into the
+    databases the collection is writing to: each waits up to `busy_timeout` seconds for the write lock,
+    a database that stays locked is logged and reconciled in the next interval.
+    """
+
+    def __init__(self, orchestrator: "PlatformOrchestrator", ttl: int = 300, reconcile_interval: int = 3600,
+                 busy_timeout: float = BUSY_TIMEOUT):
+        self.ttl = ttl
+        self.reconcile_interval = reconcile_interval
+        self.busy_timeout = busy_timeout
+        self.reconciled_at: Optional[datetime] = None
+        self._db_paths: dict[str, Path] = {platform: manager.platform_db.db_config.db_connection.db_path
+                                           for platform, manager in orchestrator.platform_managers.items()}
+        self._rows: dict[str, dict[str, str | int]] = {}
+        self.computed_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        for manager in orchestrator.platform_managers.values():
+            manager.post_insert_callbacks.append(self.on_posts_inserted)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._refresh_loop, name="db-status-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.is_set():
+            if self.reconcile_interval and (not self.reconciled_at or (
+                    datetime.now() - self.reconciled_at).total_seconds() >= self.reconcile_interval):
+                self.reconcile()
+            self.refresh()
+            self._stop.wait(self.ttl)
+
+    def refresh(self) -> None:
+        rows = {row["platform"]: row for row in
+                scan_databases([(platform, path) for platform, path in self._db_paths.items()], fast=True)}
+        with self._lock:
+            # keep the last row of databases that failed
+            self._rows = self._rows | rows
+            self.computed_at = datetime.now()
 
-            row = calc_row(db, platform)
-            results.append(row)
+    def reconcile(self) -> None:
+        for platform, db_path in self._db_paths.items():
+            try:
+                reconcile_post_counter(db_path, self.busy_timeout)
+            except Exception as err:
+                logger.error(f"Could not reconcile the post counter of {platform}: {err}")
+        self.reconciled_at = datetime.now()
 
-    # normal method. use databases as defined in RUN-CONFIG
-    else:
-        for platform, manager in orchestrator.platform_managers.items():
-            row = calc_row(manager.platform_db.db_mgmt, platform)
-            results.append(row)
+    def on_posts_inserted(self, manager: "PlatformManager", collection: CollectionResult) -> None:
+        with self._lock:
+            if row := self._rows.get(manager.platform_name):
+                row["total"] += len(collection.added_posts)
 
-    return results
+    def status(self, task_status: bool = True) -> dict:
+        with self._lock:
+            rows = [dict(row) for row in self._rows.values()]
+            computed_at = self.computed_at
+        if not task_status:
+            rows = [{k: v for k, v in row.items() if k not in TASK_STATUS_TYPES} for row in rows]
+        return {"computed_at": computed_at.isoformat(timespec="seconds") if computed_at else None,
+                "databases": rows}
@@ -90,7 +90,7 @@ class TaskManager:
             if task.platform in missing_platform_managers:
                 all_added = False
                 continue
-            if task.platform not in self.orchestration.platform_managers:
+            if not self.orchestration.platform_manager(task.platform):
                 logger.warning(f"No manager found for platform: {task.platform}")
                 all_added = False
                 missing_platform_managers.add(task.platform)
@@ -99,7 +99,7 @@ class TaskManager:
             grouped_by_platform[task.platform].append(task)
 
         for group, g_tasks in grouped_by_platform.items():
-            manager = self.orchestration.platform_managers[group]
+            manager = self.orchestration.platform_manager(group)
             if not manager.active:
                 self.logger.warning(f"Tasks added to platform {group} is currently not set 'active'")
             added_tasks_names = manager.add_tasks(g_tasks)
@@ -0,0 +1,131 @@
+"""
+Per-task execution traces (TRACE_TASKS=true).
+Each processed task writes one line to data/traces/<platform>.jsonl with the time spent in the phases
+(collect: api pagination, convert: create_post_entry, insert: db, sleep: request_delay) and the
+latency and size of each fetched page.
+"""
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Generator, Any
+
+import orjson
+
+from big5_databases.databases.external import ClientTaskConfig
+from src.const import BASE_DATA_PATH, BIG5_CONFIG
+
+TRACES_PATH = BASE_DATA_PATH / "traces"
+PHASES = ["collect", "convert", "insert", "sleep"]
+
+# the trace of the task, that is processed in the current asyncio task
+current_trace: ContextVar[Optional["TaskTrace"]] = ContextVar("current_trace", default=None)
+
+
+@dataclass
+class TaskTrace:
+    platform: str
+    task_id: int
+    task_name: str
+    ts: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    items: int = 0
+    status: str = ""
+    # [latency in seconds, bytes]
+    pages: list[tuple[float, int]] = field(default_factory=list)
+    phases: dict[str, float] = field(default_factory=dict)
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - start
+
+    def dump(self) -> dict[str, Any]:
+        return {"platform": self.platform, "task_id": self.task_id, "task_name": self.task_name,
+                "ts": self.ts, "items": self.items, "status": self.status,
+                "pages": [[round(lat, 4), size] for lat, size in self.pages]} | {
+            p: round(t, 4) for p, t in self.phases.items()}
+
+
+@contextmanager
+def trace_task(task: ClientTaskConfig) -> Generator[Optional[TaskTrace], None, None]:
+    """
+    Trace the processing of a task and write it when done. yields None, when tracing is disabled
+    """
+    if not BIG5_CONFIG.trace_tasks:
+        yield None
+        return
+    trace = TaskTrace(task.platform, task.id, task.task_name)
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
+        write_trace(trace)
+
+
+@contextmanager
+def trace_phase(name: str) -> Generator[None, None, None]:
+    if trace := current_trace.get():
+        with trace.phase(name):
+            yield
+    else:
+        yield
+
+
+def record_page(latency: float, response: Any) -> None:
+    """
+    add a fetched page to the current trace. the size is the size of the json response
+    """
+    if trace := current_trace.get():
+        trace.pages.append((latency, len(orjson.dumps(response, default=str))))
+
+
+def write_trace(trace: TaskTrace) -> None:
+    TRACES_PATH.mkdir(exist_ok=True)
+    with (TRACES_PATH / f"{trace.platform}.jsonl").open("ab") as trace_file:
+        trace_file.write(orjson.dumps(trace.dump()) + b"\n")
+
+
+def read_traces(platforms: Optional[list[str]] = None, traces_path: Path = TRACES_PATH) -> list[dict[str, Any]]:
+    traces = []
+    for trace_file in sorted(traces_path.glob("*.jsonl")):
+        if platforms and trace_file.stem not in platforms:
+            continue
+        with trace_file.open(encoding="utf-8") as fin:
+            traces.extend(json.loads(line) for line in fin if line.strip())
+    return traces
+
+
+def _percentiles(values: list[float]) -> tuple[float, float]:
+    if not values:
+        return 0, 0
+    if len(values) == 1:
+        return values[0], values[0]
+    cuts = statistics.quantiles(values, n=20, method="inclusive")
+    return cuts[9], cuts[18]
+
+
+def summarize_traces(traces: list[dict[str, Any]]) -> list[dict[str, str | int | float]]:
+    """
+    p50/p95 (seconds) of each phase and of the page latency, per platform
+    """
+    by_platform: dict[str, list[dict]] = {}
+    for trace in traces:
+        by_platform.setdefault(trace["platform"], []).append(trace)
+
+    rows = []
+    for platform, p_traces in by_platform.items():
+        phase_values = {p: [t.get(p, 0) for t in p_traces] for p in PHASES}
+        phase_values["page"] = [lat for t in p_traces for lat, _ in t["pages"]]
+        for phase, values in phase_values.items():
+            p50, p95 = _percentiles(values)
+            rows.append({"platform": platform, "phase": phase, "n": len(values),
+                         "p50": round(p50, 3), "p95": round(p95, 3), "total": round(sum(values), 1)})
+    return rows
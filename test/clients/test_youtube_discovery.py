@@ -0,0 +1,31 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from src.clients.instances import youtube_discovery
+
+
+@pytest.fixture
+def discovery_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(youtube_discovery, "DISCOVERY_PATH", tmp_path)
+    return tmp_path / "youtube.v3.json"
+
+
+def test_fetch_only_when_outdated(discovery_path, monkeypatch):
+    fetched = {"revision": "2", "resources": {}}
+    monkeypatch.setattr(youtube_discovery, "_fetch", lambda: fetched)
+    discovery_path.write_text(json.dumps({"revision": "1", "resources": {}}))
+
+    assert youtube_discovery.load_discovery_document()["revision"] == "1"
+
+    os.utime(discovery_path, (0, 0))
+    assert youtube_discovery.load_discovery_document()["revision"] == "2"
+    assert json.loads(discovery_path.read_text())["revision"] == "2"
+
+
+def test_offline_fallback(discovery_path, monkeypatch):
+    monkeypatch.setattr(youtube_discovery, "_fetch", lambda: None)
+    assert "videos" in youtube_discovery.load_discovery_document(refresh=True)["resources"]
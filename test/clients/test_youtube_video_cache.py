@@ -0,0 +1,31 @@
+from src.clients.instances.youtube_video_cache import VideoDetailsCache
+
+
+def test_lru_and_ttl():
+    cache = VideoDetailsCache(max_entries=2, ttl=60)
+    cache.put_many([{"id": "a"}, {"id": "b"}], "statistics,contentDetails")
+    assert set(cache.get_many(["a", "b"], "contentDetails,statistics")) == {"a", "b"}
+    assert cache.get_many(["a"], "statistics") == {}
+
+    # b is the least recently used
+    cache.get_many(["a"], "contentDetails,statistics")
+    cache.put_many([{"id": "c"}], "contentDetails,statistics")
+    assert set(cache.get_many(["a", "b", "c"], "contentDetails,statistics")) == {"a", "c"}
+
+    cache.ttl = -1
+    assert cache.get_many(["a"], "contentDetails,statistics") == {}
+    assert cache.stats()["hits"] == 5
+
+
+def test_persistence_and_quota(tmp_path):
+    video_ids = [f"v{i}" for i in range(60)]
+    cache = VideoDetailsCache(db_path=tmp_path / "cache.sqlite")
+    cache.put_many([{"id": v, "statistics": {"viewCount": "1"}} for v in video_ids[:50]], "statistics")
+    cache.close()
+
+    reopened = VideoDetailsCache(db_path=tmp_path / "cache.sqlite")
+    found = reopened.get_many(video_ids, "statistics")
+    assert len(found) == 50 and found["v0"]["statistics"]["viewCount"] == "1"
+    # 2 requests for 60 ids, 1 for the missing 10
+    assert reopened.quota_units_saved == 1
+    assert reopened.hit_rate == 50 / 60
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from src.misc.platform_quotas import QuotaRegistry
+
+
+def test_halt_persisted_and_shared(tmp_path):
+    path = tmp_path / "platform_quotas.json"
+    registry = QuotaRegistry(path)
+    other = QuotaRegistry(path)
+    until = datetime.now().replace(second=0, microsecond=0) + timedelta(hours=2)
+
+    registry.set_halt("youtube", until)
+    other.set_halt("tiktok", until, "key1")
+    # the second write must not lose the first one
+    assert set(QuotaRegistry(path).all()) == {"youtube", "tiktok:key1"}
+
+    assert registry.halted_until("tiktok", "key1") is None
+    registry.reload()
+    assert registry.halted_until("tiktok", "key1") == until
+    assert registry.halted_until("tiktok") is None
+    assert registry.halted_until("youtube", "any-key") == until
+
+
+def test_expired_halts_removed(tmp_path):
+    path = tmp_path / "platform_quotas.json"
+    registry = QuotaRegistry(path)
+    registry.set_halt("youtube", datetime.now() - timedelta(minutes=5))
+    assert registry.halted_until("youtube") is None
+    registry.set_halt("twitter", datetime.now() + timedelta(hours=1))
+    assert list(QuotaRegistry(path).all()) == ["twitter"]
+    registry.clear_halt("twitter")
+    assert QuotaRegistry(path).all() == {}
@@ -0,0 +1,60 @@
+import json
+import sqlite3
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from src.scripts.backfill_column import backfill_column, POST_TABLE
+
+
+def _create(path, rows: list[tuple[str, dict | None]]) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE {POST_TABLE} (id INTEGER PRIMARY KEY, platform_id TEXT, metadata_content JSON)")
+    conn.executemany(f"INSERT INTO {POST_TABLE} (platform_id, metadata_content) VALUES (?, ?)",
+                     [(pid, json.dumps(value) if value is not None else None) for pid, value in rows])
+    conn.commit()
+    conn.close()
+
+
+def _values(path) -> dict[str, dict | None]:
+    conn = sqlite3.connect(path)
+    rows = conn.execute(f"SELECT platform_id, metadata_content FROM {POST_TABLE}").fetchall()
+    conn.close()
+    return {pid: json.loads(value) if value is not None else None for pid, value in rows}
+
+
+@pytest.fixture
+def dbs(tmp_path):
+    # 7 source posts with a value (not a multiple of the batch size), p7 has none, p8 is not in the target
+    src, target = tmp_path / "src.sqlite", tmp_path / "target.sqlite"
+    _create(src, [(f"p{i}", {"src": i}) for i in range(7)] + [("p7", None), ("p8", {"src": 8})])
+    _create(target, [("p0", {"old": 0}), ("p1", None), ("p2", {}), ("p3", {"old": 3, "src": -1}),
+                     ("p4", None), ("p5", {"old": 5}), ("p6", {"old": 6}), ("p7", {"old": 7})])
+    return src, target
+
+
+def test_copy(dbs):
+    src, target = dbs
+    result = backfill_column(src, target, mode="copy", batch_size=3)
+    assert (result.total, result.source_rows, result.updated, result.batches) == (8, 8, 7, 3)
+    assert _values(target) == {**{f"p{i}": {"src": i} for i in range(7)}, "p7": {"old": 7}}
+
+
+def test_merge(dbs):
+    src, target = dbs
+    result = backfill_column(src, target, mode="merge", batch_size=3)
+    assert result.updated == 7
+    values = _values(target)
+    assert values["p0"] == {"old": 0, "src": 0}
+    assert values["p1"] == {"src": 1}
+    assert values["p3"] == {"old": 3, "src": 3}
+    assert values["p7"] == {"old": 7}
+
+
+def test_only_missing(dbs):
+    src, target = dbs
+    result = backfill_column(src, target, mode="copy", only_missing=True, batch_size=3)
+    assert result.updated == 3
+    assert _values(target) == {"p0": {"old": 0}, "p1": {"src": 1}, "p2": {"src": 2}, "p3": {"old": 3, "src": -1},
+                               "p4": {"src": 4}, "p5": {"old": 5}, "p6": {"old": 6}, "p7": {"old": 7}}
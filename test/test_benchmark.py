@@ -0,0 +1,58 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("big5_databases")
+pytest.importorskip("googleapiclient")
+
+from src import platform_orchestration
+from src.benchmark import load_generator, run_benchmark
+from src.benchmark.fake_apis import ReplayConfig
+from src.const import BIG5_CONFIG
+from src.misc import platform_quotas
+from src.platform_orchestration import PlatformOrchestrator
+
+
+@pytest.fixture
+def orchestrator(tmp_path, monkeypatch):
+    """
+    a new orchestrator with a RUN_CONFIG database (prod/youtube.sqlite) and a main db that must not be used
+    """
+    monkeypatch.setenv("SQLITE_DBS_BASE_PATH", str(tmp_path))
+    monkeypatch.setattr(platform_orchestration, "read_run_config", lambda: {"clients": {"youtube": {
+        "db_config": {"create": True, "require_existing_parent_dir": False,
+                      "db_connection": {"db_path": "prod/youtube.sqlite"}}}}})
+    monkeypatch.setattr(PlatformOrchestrator, "_PlatformOrchestrator__instance", None)
+
+    def no_main_db(_):
+        raise AssertionError("the main db is used")
+
+    monkeypatch.setattr(PlatformOrchestrator, "main_db", property(no_main_db))
+    monkeypatch.setattr(platform_quotas, "_registry", None)
+    for name in ("test_mode", "send_posts"):
+        monkeypatch.setattr(BIG5_CONFIG, name, getattr(BIG5_CONFIG, name))
+    return PlatformOrchestrator()
+
+
+def test_scaling_uses_only_synthetic_dbs(orchestrator, tmp_path, monkeypatch):
+    monkeypatch.setattr(load_generator, "SYNTHETIC_PATH", tmp_path / "files")
+    rows = asyncio.run(load_generator.run_scaling(["youtube"], [2], posts_per_task=2, store=False))
+
+    assert {r.phase for r in rows} >= {"add_tasks", "process"}
+    # the manager of RUN_CONFIG is not created
+    assert list(orchestrator._platform_managers) == ["youtube"]
+    db_path = orchestrator._platform_managers["youtube"].platform_db.db_config.db_connection.db_path
+    assert "synthetic" in Path(db_path).parts
+    assert not list(tmp_path.rglob("prod"))
+
+
+def test_orchestrator_benchmark_uses_its_config(orchestrator, tmp_path):
+    run_config = BIG5_CONFIG.run_config_file_name
+    results = asyncio.run(run_benchmark.benchmark_orchestrator(["youtube"], ReplayConfig(id_offset=1), 2, 3))
+
+    assert [(r.platform, r.tasks) for r in results] == [("youtube", 2)] and results[0].posts > 0
+    assert BIG5_CONFIG.run_config_file_name == run_config
+    db_path = orchestrator._platform_managers["youtube"].platform_db.db_config.db_connection.db_path
+    assert "benchmark" in Path(db_path).parts
+    assert not list(tmp_path.rglob("prod"))
@@ -0,0 +1,49 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from src.bulk_submit import BulkSubmitSummary, submit_ndjson
+
+
+def _group(prefix: str, interval: dict) -> bytes:
+    return json.dumps({"platform": "youtube", "group_prefix": prefix, "static_params": {"limit": 10},
+                       "time_config": {"start": "2024-01-01T00:00:00", "end": "2024-01-01T02:00:00",
+                                       "interval": interval, "truncate_overflow": True}}).encode()
+
+
+def test_bad_line_in_stream():
+    added = []
+    threads = set()
+
+    def add_tasks(tasks):
+        threads.add(threading.get_ident())
+        added.extend(t.task_name for t in tasks)
+        return [t.task_name for t in tasks], True
+
+    orchestrator = SimpleNamespace(platform_manager={"youtube": object()}.get, task=SimpleNamespace(add_tasks=add_tasks))
+    lines = [_group("a", {"hours": 1}), _group("b", {"fortnights": 1}), b'"not an object"',
+             b"2024-01-01", _group("c", {"hours": 1})]
+
+    async def chunks():
+        yield b"\n".join(lines)
+
+    async def run():
+        summary = BulkSubmitSummary()
+        with ThreadPoolExecutor(2) as executor:
+            async for _ in submit_ndjson(orchestrator, chunks(), executor, summary, batch_size=1, window=2):
+                pass
+        return summary
+
+    summary = asyncio.run(run())
+    assert summary.lines == 5
+    assert [r["line"] for r in summary.rejected] == [2, 3, 4]
+    assert summary.added["youtube"] == 4
+    assert added == ["a_0", "a_1", "c_0", "c_1"]
+    # the tasks are added in the loop thread
+    assert threads == {threading.get_ident()}
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from big5_databases.databases.db_models import DBPost
+from src.coverage import post_counts, find_gaps
+from src.post_histogram import rebuild_histogram
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager.sqlite_db_from_path(tmp_path / "posts.sqlite", create=True)
+    db.init_database()
+    with db.get_session() as session:
+        session.add_all([DBPost(platform="youtube", platform_id=f"p{i}", post_url=f"https://youtube.com/p{i}",
+                                date_created=datetime(2024, 1, 1, hour, minute), content={})
+                         for i, (hour, minute) in enumerate([(0, 10), (0, 50), (2, 5), (3, 40)])])
+        session.commit()
+    return db
+
+
+@pytest.mark.parametrize("histogram", [False, True])
+def test_partial_buckets_are_counted(db, histogram):
+    if histogram:
+        rebuild_histogram(db)
+    counts = post_counts(db, datetime(2024, 1, 1, 0, 30), datetime(2024, 1, 1, 3, 15), "hour")
+    assert counts == {datetime(2024, 1, 1, 0): 2, datetime(2024, 1, 1, 1): 0,
+                      datetime(2024, 1, 1, 2): 1, datetime(2024, 1, 1, 3): 1}
+    gaps = find_gaps(counts, "hour", 1)
+    assert [(g.start.hour, g.end.hour) for g in gaps] == [(1, 2)]
@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from src.scripts.duplicate_db import SubsetFilter, subset_copy, POST_TABLE, TASK_TABLE
+
+
+def _create(path, side_tables: bool = False):
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE {TASK_TABLE} (id INTEGER PRIMARY KEY, task_name TEXT)")
+    conn.execute(f"CREATE TABLE {POST_TABLE} (id INTEGER PRIMARY KEY, platform TEXT, platform_id TEXT, "
+                 f"date_created TEXT, collection_task_id INTEGER)")
+    conn.execute(f"CREATE INDEX ix_platform_id ON {POST_TABLE} (platform_id)")
+    conn.execute(f"CREATE TRIGGER post_touch AFTER INSERT ON {POST_TABLE} BEGIN SELECT 1; END")
+    if side_tables:
+        conn.execute("CREATE TABLE post_labels (post_id INTEGER, label TEXT)")
+        conn.execute(f"CREATE TRIGGER post_labels_insert AFTER INSERT ON {POST_TABLE} "
+                     f"BEGIN INSERT INTO post_labels VALUES (NEW.id, 'x'); END")
+    return conn
+
+
+def test_subset_copy(tmp_path):
+    src = _create(tmp_path / "src.sqlite", side_tables=True)
+    src.executemany(f"INSERT INTO {TASK_TABLE} (id, task_name) VALUES (?, ?)",
+                    [(1, "a_1"), (2, "ab1"), (3, "b_1")])
+    src.executemany(f"INSERT INTO {POST_TABLE} (platform, platform_id, date_created, collection_task_id) "
+                    f"VALUES ('youtube', ?, '2024-01-01 00:00:00', ?)", [("p1", 1), ("p2", 2), ("p3", 3)])
+    src.commit()
+    src.close()
+
+    dest = _create(tmp_path / "dest.sqlite")
+    # a post without platform_id must not block the copy
+    dest.execute(f"INSERT INTO {POST_TABLE} (platform, platform_id) VALUES ('youtube', NULL)")
+    dest.commit()
+    dest.close()
+
+    # "_" is not a wildcard
+    result = subset_copy(tmp_path / "src.sqlite", tmp_path / "dest.sqlite", SubsetFilter(task_prefix="a_"))
+    assert (result.tasks, result.posts) == (1, 1)
+
+    new = tmp_path / "new.sqlite"
+    subset_copy(tmp_path / "src.sqlite", new, SubsetFilter())
+    conn = sqlite3.connect(new)
+    objects = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    assert {"ix_platform_id", "post_touch"} <= objects
+    assert not {"post_labels", "post_labels_insert"} & objects
+    assert conn.execute(f"SELECT count(*) FROM {POST_TABLE}").fetchone()[0] == 3
+    conn.close()
@@ -0,0 +1,90 @@
+import json
+import sqlite3
+
+import pytest
+
+pytest.importorskip("big5_databases")
+pa_parquet = pytest.importorskip("pyarrow.parquet")
+
+from src import export
+from src.export import export_database, load_state, POST_TABLE
+
+
+def _add_posts(db_path, posts: list[tuple[str, str, int]]):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {POST_TABLE} (id INTEGER PRIMARY KEY, platform TEXT, platform_id TEXT, "
+                 f"post_url TEXT, date_created TEXT, post_type TEXT, collection_task_id INTEGER, content TEXT, "
+                 f"metadata_content TEXT)")
+    conn.executemany(f"INSERT INTO {POST_TABLE} (platform, platform_id, date_created, collection_task_id, content, "
+                     f"metadata_content) VALUES ('youtube', ?, ?, 1, ?, ?)",
+                     [(platform_id, date, json.dumps({"statistics": {"viewCount": str(views)},
+                                                      "snippet": {"tags": ["a", "b"]}}),
+                       json.dumps({"labels": ["x"]})) for platform_id, date, views in posts])
+    conn.commit()
+    conn.close()
+
+
+def _exported(dest) -> list[dict]:
+    rows = []
+    for part_file in sorted(dest.rglob("*.parquet")):
+        rows.extend(pa_parquet.read_table(part_file).to_pylist())
+    return sorted(rows, key=lambda r: r["id"])
+
+
+def test_export_incremental(tmp_path):
+    db_path, dest = tmp_path / "youtube.sqlite", tmp_path / "export"
+    _add_posts(db_path, [("a", "2024-01-05 10:00:00.000000", 1), ("b", "2024-02-01 00:00:00.000000", 2),
+                         ("c", "2024-01-20 12:00:00.000000", 3)])
+    result = export_database(db_path, dest, chunk_size=2)
+    assert (result.posts, len(result.files)) == (3, 2)
+    assert (dest / "platform=youtube" / "year=2024" / "month=01").is_dir()
+    # 2 posts of january in one row group
+    january = next(f for f in result.files if "month=01" in f)
+    assert pa_parquet.ParquetFile(january).metadata.num_row_groups == 1
+
+    _add_posts(db_path, [("d", "2024-02-02 00:00:00.000000", 4)])
+    result = export_database(db_path, dest, chunk_size=2)
+    assert (result.from_post_id, result.to_post_id, result.posts) == (3, 4, 1)
+
+    rows = _exported(dest)
+    assert [r["platform_id"] for r in rows] == ["a", "b", "c", "d"]
+    assert rows[0]["views"] == 1 and rows[0]["tags"] == ["a", "b"] and rows[0]["labels"] == ["x"]
+    assert load_state(dest)[str(db_path.absolute())] == 4
+
+
+def test_failed_export_removes_files(tmp_path, monkeypatch):
+    db_path, dest = tmp_path / "youtube.sqlite", tmp_path / "export"
+    _add_posts(db_path, [("a", "2024-01-05 10:00:00.000000", 1), ("b", "2024-02-01 00:00:00.000000", 2)])
+    convert = export._convert
+
+    def failing(value, kind):
+        if value == "b":
+            raise ValueError("broken")
+        return convert(value, kind)
+
+    monkeypatch.setattr(export, "_convert", failing)
+    with pytest.raises(ValueError):
+        export_database(db_path, dest, chunk_size=1)
+    assert not list(dest.rglob("*.parquet"))
+    assert load_state(dest) == {}
+
+
+def test_buffered_rows_are_capped(tmp_path, monkeypatch):
+    db_path, dest = tmp_path / "youtube.sqlite", tmp_path / "export"
+    # every post in another month
+    _add_posts(db_path, [(str(i), f"20{10 + i // 12}-{i % 12 + 1:02d}-01 00:00:00.000000", i) for i in range(30)])
+    written, buffered = [0], []
+    write_batch = pa_parquet.ParquetWriter.write_batch
+
+    def count_rows(self, batch, *args, **kwargs):
+        written[0] += batch.num_rows
+        return write_batch(self, batch, *args, **kwargs)
+
+    monkeypatch.setattr(pa_parquet.ParquetWriter, "write_batch", count_rows)
+    # logged after each chunk
+    monkeypatch.setattr(export.logger, "debug", lambda msg: buffered.append(int(msg.split()[1]) - written[0]))
+    result = export_database(db_path, dest, chunk_size=4)
+
+    assert result.posts == written[0] == 30 and len(result.files) == 30
+    assert len(buffered) == 8 and max(buffered) <= 4
+    assert [r["platform_id"] for r in _exported(dest)] == [str(i) for i in range(30)]
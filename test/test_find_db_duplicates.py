@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from sqlalchemy import select
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from big5_databases.databases.db_models import DBPost
+from src.scripts.find_db_duplicates import find_duplicates
+
+# platform_id, content. a: 3 copies, b: 2 copies, c: no duplicate
+POSTS = [("a", {"x": 1}), ("b", {}), ("a", {"x": 1, "y": 2}), ("c", {}), ("b", {"x": 1}), ("a", {})]
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager.sqlite_db_from_path(tmp_path / "posts.sqlite", create=True)
+    db.init_database()
+    with db.get_session() as session:
+        session.add_all([DBPost(platform="youtube", platform_id=platform_id, post_url=f"https://youtube.com/{i}",
+                                content=content) for i, (platform_id, content) in enumerate(POSTS)])
+        session.commit()
+    return db
+
+
+def _ids(db: DatabaseManager) -> list[int]:
+    with db.get_session() as session:
+        return list(session.scalars(select(DBPost.id).order_by(DBPost.id)))
+
+
+@pytest.mark.parametrize("keep, remaining", [("oldest", [1, 2, 4]), ("newest", [4, 5, 6]), ("richest", [3, 4, 5])])
+def test_keep_rules(db, keep, remaining):
+    # 3 rows to remove, batches of 2
+    report = find_duplicates(db, keep=keep, batch_size=2)
+    assert (report.duplicate_groups, report.rows_to_remove, report.removed) == (2, 3, 3)
+    assert report.examples[0] == ("a", 3)
+    assert _ids(db) == remaining
+
+
+def test_dry_run(db):
+    report = find_duplicates(db, dry=True)
+    assert (report.rows_to_remove, report.removed) == (3, 0)
+    assert _ids(db) == [1, 2, 3, 4, 5, 6]
+    # the staging table is dropped
+    assert find_duplicates(db, batch_size=1).removed == 3
@@ -0,0 +1,43 @@
+import json
+import sqlite3
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from src.hot_fields import HotField, ensure_hot_fields, hot_columns, drop_hot_field, POST_TABLE
+
+FIELDS = [HotField("views", "$.statistics.viewCount", "int"), HotField("channel_id", "$.snippet.channelId", "text")]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "posts.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE {POST_TABLE} (id INTEGER PRIMARY KEY, content TEXT)")
+    conn.executemany(f"INSERT INTO {POST_TABLE} (content) VALUES (?)",
+                     [(json.dumps({"statistics": {"viewCount": "12"}, "snippet": {"channelId": "c1"}}),),
+                      ("not json",), (None,)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_ensure_hot_fields(db_path):
+    assert ensure_hot_fields(db_path, FIELDS) == ["hot_views", "hot_channel_id"]
+    assert ensure_hot_fields(db_path, FIELDS) == []
+
+    conn = sqlite3.connect(db_path)
+    assert hot_columns(conn) == {"hot_views", "hot_channel_id"}
+    # computed for existing and new posts, invalid json is NULL
+    conn.execute(f"INSERT INTO {POST_TABLE} (content) VALUES (?)", (json.dumps({"statistics": {"viewCount": 5}}),))
+    assert conn.execute(f"SELECT hot_views, hot_channel_id FROM {POST_TABLE} ORDER BY id").fetchall() == [
+        (12, "c1"), (None, None), (None, None), (5, None)]
+    plan = conn.execute(f"EXPLAIN QUERY PLAN SELECT id FROM {POST_TABLE} WHERE hot_views > 10").fetchall()
+    assert "ix_" in str(plan)
+    conn.close()
+
+    drop_hot_field(db_path, "views")
+    conn = sqlite3.connect(db_path)
+    assert hot_columns(conn) == {"hot_channel_id"}
+    conn.close()
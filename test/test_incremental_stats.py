@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from sqlalchemy import update
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from big5_databases.databases.db_models import DBPost
+from src import incremental_stats
+from src.incremental_stats import update_stats, stats_path
+from src.post_histogram import HOUR_COUNTS
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental_stats, "STATS_PATH", tmp_path / "stats")
+    db = DatabaseManager.sqlite_db_from_path(tmp_path / "posts.sqlite", create=True)
+    db.init_database()
+    return db
+
+
+def _insert(db: DatabaseManager, dates: list[datetime]) -> None:
+    with db.get_session() as session:
+        session.add_all([DBPost(platform="youtube", platform_id=str(date), post_url="", content={},
+                                date_created=date) for date in dates])
+        session.commit()
+
+
+def test_update_stats(db, tmp_path):
+    _insert(db, [datetime(2024, 1, 1, 5), datetime(2024, 1, 1, 6), datetime(2024, 1, 3)])
+    stats = update_stats(db, "day")
+    assert stats.counts == {"2024-01-01": 2, "2024-01-03": 1}
+    assert (stats.total_posts, stats.max_post_id) == (3, 3)
+
+    # only the new posts are counted
+    _insert(db, [datetime(2024, 1, 3, 1), datetime(2024, 2, 1)])
+    stats = update_stats(db, "month")
+    assert stats.counts == {"2024-01": 4, "2024-02": 1}
+    assert (stats.total_posts, stats.max_post_id) == (5, 5)
+
+    stored = json.loads(stats_path(tmp_path / "posts.sqlite", "month").read_text())
+    assert stored["counts"] == stats.counts and stored["max_post_id"] == 5
+    assert stats_path(tmp_path / "posts.sqlite", "day").exists()
+    assert stats_path(tmp_path / "posts.sqlite", "day") != stats_path(tmp_path / "other" / "posts.sqlite", "day")
+
+
+def test_full_recount(db):
+    _insert(db, [datetime(2024, 1, 1), datetime(2024, 1, 2)])
+    update_stats(db, "day", store=False)
+    with db.get_session() as session:
+        session.execute(update(HOUR_COUNTS).values(count=100))
+        session.commit()
+
+    assert update_stats(db, "day", store=False).total_posts == 200
+    assert update_stats(db, "day", full=True, store=False).counts == {"2024-01-01": 1, "2024-01-02": 1}
+    assert not incremental_stats.STATS_PATH.exists()
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from src import job_manager
+from src.clients.abstract_client import QuotaExceeded
+from src.job_manager import JobManager, JobStatus, CollectionJob, UnknownJob
+
+
+class Result:
+
+    def __init__(self, added: int):
+        self.added_posts = list(range(added))
+
+
+class FakeManager:
+    """
+    reports the results (an exception fails the task), then waits until it is released
+    """
+
+    def __init__(self, *results):
+        self.active = True
+        self.queue_size = len(results)
+        self.results = results
+        self.release = asyncio.Event()
+
+    async def process_all_tasks(self, result_callback=None):
+        for result in self.results:
+            await asyncio.sleep(0)
+            if isinstance(result, ValueError):
+                result_callback(job_manager.CollectionException(result))
+                raise result
+            result_callback(result)
+        await self.release.wait()
+
+
+@pytest.fixture(autouse=True)
+def fake_results(monkeypatch):
+    monkeypatch.setattr(job_manager, "CollectionResult", Result)
+
+
+def _jobs(**managers) -> JobManager:
+    return JobManager(SimpleNamespace(platform_managers=managers))
+
+
+def test_start_once_per_platform():
+    async def run():
+        youtube, twitter = FakeManager(Result(2), QuotaExceeded(Exception())), FakeManager(Result(1))
+        twitter.active = False
+        jobs = _jobs(youtube=youtube, twitter=twitter)
+
+        job, = jobs.start()
+        assert job.platforms == ["youtube"]
+        # youtube is running already
+        started = jobs.start(["youtube", "twitter"])
+        assert started[0] is job and started[1].platforms == ["twitter"]
+        with pytest.raises(KeyError):
+            jobs.start(["tiktok"])
+
+        await asyncio.sleep(0.01)
+        youtube.release.set()
+        twitter.release.set()
+        await asyncio.gather(*(j.task for j in started))
+        return job, started[1]
+
+    job, twitter_job = asyncio.run(run())
+    assert job.status == twitter_job.status == JobStatus.done
+    assert job.progress["youtube"].tasks_done == 1 and job.progress["youtube"].posts_added == 2
+    assert job.progress["youtube"].quota_halts == 1 and job.progress["youtube"].tasks_failed == 0
+
+
+def test_failed_task():
+    async def run():
+        jobs = _jobs(youtube=FakeManager(Result(1), ValueError("broken")))
+        job, = jobs.start()
+        await job.task
+        return job
+
+    job = asyncio.run(run())
+    assert job.status == JobStatus.failed and job.error == "broken"
+    assert (job.progress["youtube"].tasks_done, job.progress["youtube"].tasks_failed) == (1, 1)
+
+
+def test_cancel_and_events():
+    async def run():
+        jobs = _jobs(youtube=FakeManager(Result(3)))
+        job, = jobs.start()
+        events = []
+
+        async def listen():
+            async for event in jobs.progress_events(job.id, interval=0.01):
+                events.append(json.loads(event.removeprefix("data: ")))
+
+        listener = asyncio.create_task(listen())
+        await asyncio.sleep(0.05)
+        jobs.cancel(job.id)
+        await asyncio.wait_for(listener, 1)
+        with pytest.raises(UnknownJob):
+            jobs.cancel("nope")
+        return events
+
+    events = asyncio.run(run())
+    assert events[0]["status"] == "running"
+    assert events[-1]["status"] == "cancelled"
+    assert events[-1]["platforms"]["youtube"]["posts_added"] == 3
+
+
+def test_prune_finished_jobs():
+    jobs = JobManager(SimpleNamespace(platform_managers={}), finished_ttl=300, max_finished=2)
+    now = datetime.now()
+    for minutes in (0, 1, 2, 5):
+        job = CollectionJob(["youtube"], status=JobStatus.done)
+        job.finished = now - timedelta(minutes=minutes, seconds=30)
+        jobs.jobs[job.id] = job
+    running = CollectionJob(["twitter"])
+    jobs.jobs[running.id] = running
+
+    jobs.prune()
+    # too old: 5 minutes, above max_finished: 2 minutes
+    assert len(jobs.jobs) == 3 and running.id in jobs.jobs
+    with pytest.raises(UnknownJob):
+        jobs.get("nope")
@@ -0,0 +1,22 @@
+from src.metrics import Counter, Histogram, MetricsRegistry
+
+
+def test_exposition_format():
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("test_requests", "requests", ("platform",)))
+    latency = registry.register(Histogram("test_latency_seconds", "latency", ("platform",), buckets=(0.1, 1.0)))
+
+    requests.inc(platform="youtube")
+    requests.inc(2, platform="youtube")
+    latency.observe(0.05, platform="youtube")
+    latency.observe(0.5, platform="youtube")
+    latency.observe(5, platform="youtube")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE platform_clients_test_requests counter" in lines
+    assert 'platform_clients_test_requests_total{platform="youtube"} 3' in lines
+    assert 'platform_clients_test_latency_seconds_bucket{platform="youtube",le="0.1"} 1' in lines
+    assert 'platform_clients_test_latency_seconds_bucket{platform="youtube",le="1.0"} 2' in lines
+    assert 'platform_clients_test_latency_seconds_bucket{platform="youtube",le="+Inf"} 3' in lines
+    assert 'platform_clients_test_latency_seconds_count{platform="youtube"} 3' in lines
+    assert latency.total(platform="youtube") == 5.55
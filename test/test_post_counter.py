@@ -0,0 +1,24 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from src.post_counter import reconcile_post_counter, read_post_counter, POST_TABLE, COUNTER_TABLE
+
+
+def test_reconcile_post_counter(tmp_path):
+    db_path = tmp_path / "posts.sqlite"
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute(f"CREATE TABLE {POST_TABLE} (id INTEGER PRIMARY KEY, content TEXT)")
+    conn.executemany(f"INSERT INTO {POST_TABLE} (content) VALUES (?)", [("a",)] * 5)
+
+    assert reconcile_post_counter(db_path) == (None, 5)
+    conn.executemany(f"INSERT INTO {POST_TABLE} (content) VALUES (?)", [("b",)] * 3)
+    conn.execute(f"DELETE FROM {POST_TABLE} WHERE id = 1")
+    assert read_post_counter(conn) == 7
+
+    conn.execute(f"UPDATE {COUNTER_TABLE} SET count = 2")
+    assert reconcile_post_counter(db_path) == (2, 7)
+    assert read_post_counter(conn) == 7
+    conn.close()
@@ -0,0 +1,113 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from sqlalchemy import select, delete, text, func, inspect
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from big5_databases.databases.db_models import DBPost
+from src.post_histogram import (update_histogram, rebuild_histogram, histogram_counts, histogram_watermark,
+                                HOUR_COUNTS, DELETE_TRIGGER)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager.sqlite_db_from_path(tmp_path / "posts.sqlite", create=True)
+    db.init_database()
+    return db
+
+
+def _insert(db: DatabaseManager, dates: list[datetime], platform: str = "youtube") -> None:
+    with db.get_session() as session:
+        session.add_all([DBPost(platform=platform, platform_id=f"{platform}_{date}_{i}", post_url="", content={},
+                                date_created=date) for i, date in enumerate(dates)])
+        session.commit()
+
+
+def _hours(db: DatabaseManager) -> dict[tuple[str, str], int]:
+    with db.get_session() as session:
+        return {(p, b): c for p, b, c in session.execute(select(HOUR_COUNTS))}
+
+
+def _exact(db: DatabaseManager) -> dict[tuple[str, str], int]:
+    bucket = func.substr(DBPost.date_created, 1, 13)
+    with db.get_session() as session:
+        return {(p, b): c for p, b, c in session.execute(
+            select(DBPost.platform, bucket, func.count()).where(DBPost.date_created.is_not(None))
+            .group_by(DBPost.platform, bucket))}
+
+
+def _delete_ids(db: DatabaseManager, ids: list[int]) -> None:
+    with db.get_session() as session:
+        session.execute(delete(DBPost).where(DBPost.id.in_(ids)))
+        session.commit()
+
+
+def test_incremental_update_matches_rebuild(db):
+    assert not update_histogram(db, build=False)
+    with db.get_session() as session:
+        assert not inspect(session.connection()).has_table(HOUR_COUNTS.name)
+
+    _insert(db, [datetime(2024, 1, 1, 10, 5), datetime(2024, 1, 1, 10, 50), datetime(2024, 1, 2, 3)])
+    assert update_histogram(db)
+    _insert(db, [datetime(2024, 1, 1, 10, 30), datetime(2024, 2, 1)], "twitter")
+    _insert(db, [None])
+    assert update_histogram(db, build=False)
+    assert histogram_watermark(db) == 6
+    incremental = _hours(db)
+    assert incremental == _exact(db)
+
+    rebuild_histogram(db)
+    assert _hours(db) == incremental
+
+
+def test_deleted_and_reused_ids(db):
+    _insert(db, [datetime(2024, 1, 1, h) for h in range(6)])
+    update_histogram(db)
+
+    # a counted post in the middle and the top ones, sqlite reuses the ids of the top ones
+    _delete_ids(db, [2, 5, 6])
+    assert histogram_watermark(db) == 4
+    assert ("youtube", "2024-01-01 01") not in _hours(db)
+    _insert(db, [datetime(2024, 3, 1), datetime(2024, 3, 2)])
+    with db.get_session() as session:
+        assert list(session.scalars(select(DBPost.id).order_by(DBPost.id))) == [1, 3, 4, 5, 6]
+    update_histogram(db, build=False)
+    assert _hours(db) == _exact(db)
+
+
+def test_histogram_without_delete_trigger_is_rebuilt(db):
+    _insert(db, [datetime(2024, 1, 1, h) for h in range(3)])
+    update_histogram(db)
+    with db.get_session() as session:
+        session.execute(text(f"DROP TRIGGER {DELETE_TRIGGER}"))
+        session.commit()
+    _delete_ids(db, [3])
+    _insert(db, [datetime(2024, 5, 1)])
+
+    update_histogram(db, build=False)
+    assert _hours(db) == _exact(db)
+
+
+@pytest.mark.parametrize("granularity, expected", [
+    ("hour", {datetime(2024, 1, 1, 10): 2, datetime(2024, 1, 1, 11): 1, datetime(2024, 1, 2, 0): 1,
+              datetime(2024, 2, 3, 4): 1}),
+    ("day", {datetime(2024, 1, 1): 3, datetime(2024, 1, 2): 1, datetime(2024, 2, 3): 1}),
+    ("month", {datetime(2024, 1, 1): 4, datetime(2024, 2, 1): 1}),
+    ("year", {datetime(2024, 1, 1): 5}),
+])
+def test_histogram_counts(db, granularity, expected):
+    _insert(db, [datetime(2024, 1, 1, 10, 1), datetime(2024, 1, 1, 10, 2), datetime(2024, 1, 1, 11),
+                 datetime(2024, 1, 2), datetime(2024, 2, 3, 4)])
+    _insert(db, [datetime(2025, 1, 1)], "twitter")
+    update_histogram(db)
+    assert histogram_counts(db, granularity, platform="youtube") == expected
+
+
+def test_histogram_counts_range(db):
+    _insert(db, [datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11)])
+    update_histogram(db)
+    assert histogram_counts(db, "hour", datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11)) == \
+           {datetime(2024, 1, 1, 10): 1}
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from sqlalchemy import select, text, delete
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from big5_databases.databases.db_models import DBPost
+from src.post_labels import (ensure_label_index, label_index_exists, add_label, remove_label, count_labels,
+                             POST_LABELS)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager.sqlite_db_from_path(tmp_path / "posts.sqlite", create=True)
+    db.init_database()
+    with db.get_session() as session:
+        session.add_all([DBPost(platform="youtube", platform_id=f"p{i}", post_url=f"https://youtube.com/p{i}",
+                                content={}, metadata_content=metadata)
+                         for i, metadata in enumerate([{"labels": ["a"]}, {"other": 1}, None, {"labels": ["a", "b"]}])])
+        session.commit()
+    return db
+
+
+def _labels(db: DatabaseManager) -> set[tuple[str, str]]:
+    with db.get_session() as session:
+        return {(post.platform_id, label) for post, label in session.execute(
+            select(DBPost, POST_LABELS.c.label).join(POST_LABELS, POST_LABELS.c.post_id == DBPost.id))}
+
+
+def _metadata(db: DatabaseManager, platform_id: str):
+    with db.get_session() as session:
+        return session.scalar(select(DBPost.metadata_content).where(DBPost.platform_id == platform_id))
+
+
+def test_add_and_remove(db):
+    ensure_label_index(db)
+    assert count_labels(db) == {"a": 2, "b": 1}
+
+    ids = [1, 2, 3, 4]
+    # the posts that have the label already are not changed
+    assert add_label(db, "a", ids) == 2
+    assert _metadata(db, "p1") == {"other": 1, "labels": ["a"]}
+    assert _metadata(db, "p2") == {"labels": ["a"]}
+    assert count_labels(db) == {"a": 4, "b": 1}
+
+    assert remove_label(db, "a", [1, 2]) == 2
+    assert _metadata(db, "p1") == {"other": 1, "labels": []}
+    assert remove_label(db, "a") == 2
+    assert _labels(db) == {("p3", "b")}
+
+
+def test_orm_writes_keep_the_index(db):
+    ensure_label_index(db)
+    with db.get_session() as session:
+        post = session.scalar(select(DBPost).where(DBPost.platform_id == "p1"))
+        post.metadata_content = {"labels": ["c"]}
+        session.add(DBPost(platform="youtube", platform_id="p4", post_url="https://youtube.com/p4", content={},
+                           metadata_content={"labels": ["d"]}))
+        session.execute(delete(DBPost).where(DBPost.platform_id == "p3"))
+        session.commit()
+    assert _labels(db) == {("p0", "a"), ("p1", "c"), ("p4", "d")}
+
+
+def test_missing_trigger_rebuilds(db):
+    ensure_label_index(db)
+    with db.get_session() as session:
+        session.execute(text("DROP TRIGGER post_labels_update"))
+        session.commit()
+    assert not label_index_exists(db)
+    ensure_label_index(db)
+    assert label_index_exists(db)
+    assert count_labels(db) == {"a": 2, "b": 1}
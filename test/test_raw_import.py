@@ -0,0 +1,68 @@
+import json
+import sys
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from src import raw_import
+from src.raw_import import iter_raw_records, convert_records, insert_new_posts, ImportSummary
+
+RECORDS = [{"id": "1", "statistics": {"likes": "3"}}, {"id": "2", "statistics": {"likes": "5"}}]
+
+
+def test_iter_raw_records(tmp_path):
+    jsonl = tmp_path / "dump.jsonl"
+    jsonl.write_text("\n".join(json.dumps(r) for r in RECORDS) + "\n\n")
+    csv_file = tmp_path / "dump.csv"
+    csv_file.write_text("id,statistics.likes\n1,3\n2,5\n")
+
+    assert list(iter_raw_records(jsonl)) == RECORDS
+    assert list(iter_raw_records(csv_file)) == RECORDS
+    with pytest.raises(ValueError):
+        list(iter_raw_records(tmp_path / "dump.xml"))
+
+
+def test_iter_json_records(tmp_path):
+    pytest.importorskip("ijson")
+    json_file = tmp_path / "dump.json"
+    json_file.write_text(json.dumps({"data": {"videos": RECORDS}}))
+    assert list(iter_raw_records(json_file, "data.videos")) == RECORDS
+
+
+def test_json_records_need_ijson(tmp_path, monkeypatch):
+    # not loaded completely without ijson
+    monkeypatch.setitem(sys.modules, "ijson", None)
+    json_file = tmp_path / "dump.json"
+    json_file.write_text(json.dumps(RECORDS))
+    with pytest.raises(ModuleNotFoundError):
+        list(iter_raw_records(json_file))
+
+
+def test_convert_records_skips_bad_records(monkeypatch):
+    def convert(platform, items, task, trusted):
+        if any("bad" in item for item in items):
+            raise KeyError("bad")
+        return [{"platform_id": item["id"]} for item in items]
+
+    monkeypatch.setattr(raw_import, "convert_chunk", convert)
+    values, errors = convert_records("youtube", [{"id": "1"}, {"bad": 1}, {"id": "3"}], None, False, 100)
+    assert [v["platform_id"] for v in values] == ["1", "3"]
+    assert len(errors) == 1 and errors[0].startswith("record 101: KeyError")
+
+
+def test_insert_new_posts_dedupe(tmp_path):
+    db = DatabaseManager.sqlite_db_from_path(tmp_path / "posts.sqlite", create=True)
+    db.init_database()
+
+    def post(platform_id: str, day: int) -> dict:
+        return {"platform": "youtube", "platform_id": platform_id, "post_url": f"https://youtube.com/{platform_id}",
+                "date_created": datetime(2024, 1, day), "content": {}}
+
+    summary = ImportSummary(file="dump.jsonl", task_id=1)
+    insert_new_posts(db, [post("a", 1), post("b", 2), post("a", 3)], summary)
+    insert_new_posts(db, [post("b", 2), post("c", 4)], summary)
+    assert (summary.added, summary.duplicates) == (3, 2)
+    assert (summary.min_date, summary.max_date) == (datetime(2024, 1, 1), datetime(2024, 1, 4))
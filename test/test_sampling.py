@@ -0,0 +1,88 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from sqlalchemy import event, inspect, select
+
+from big5_databases.databases.db_mgmt import DatabaseManager
+from big5_databases.databases.db_models import DBPost
+from src import sampling
+from src.post_labels import count_labels, POST_LABELS
+from src.sampling import sample_posts, split_quotas
+
+# posts per day
+DAYS = {"2024-01-01": 30, "2024-01-02": 12, "2024-01-03": 1}
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager.sqlite_db_from_path(tmp_path / "posts.sqlite", create=True)
+    db.init_database()
+    with db.get_session() as session:
+        session.add_all([DBPost(platform="youtube", platform_id=f"{day}_{i}", post_url=f"https://youtube.com/{day}_{i}",
+                                date_created=datetime.fromisoformat(day) + timedelta(minutes=i), content={})
+                         for day, num in DAYS.items() for i in range(num)])
+        session.commit()
+    return db
+
+
+def _labelled(db: DatabaseManager, label: str) -> list[str]:
+    with db.get_session() as session:
+        return [post.platform_id for post in session.scalars(select(DBPost))
+                if label in ((post.metadata_content or {}).get("labels") or [])]
+
+
+def _post_updates(db: DatabaseManager) -> list[str]:
+    with db.get_session() as session:
+        engine = session.get_bind()
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_quotas_and_short_buckets(db):
+    statements = _post_updates(db)
+    result = sample_posts(db, "set1", per_bucket=5, stratify="day")
+
+    assert len(set(result.platform_ids)) == result.sampled == 11
+    assert Counter(pid[:10] for pid in result.platform_ids) == {"2024-01-01": 5, "2024-01-02": 5, "2024-01-03": 1}
+    assert result.short == {"2024-01-03": 4}
+    # labelled in one update
+    assert len([s for s in statements if s.lstrip().upper().startswith(f"UPDATE {DBPost.__tablename__.upper()}")]) == 1
+    assert result.labelled == 11
+    assert sorted(_labelled(db, "set1")) == sorted(result.platform_ids)
+    assert count_labels(db) == {"set1": 11}
+
+
+def test_fill_in_without_candidates(db, monkeypatch):
+    # no post passes the prefilter, the second pass samples from all posts of the buckets
+    monkeypatch.setattr(sampling, "candidate_threshold", lambda quota, size: 0)
+    result = sample_posts(db, "set1", per_bucket=8, stratify="day")
+    assert len(set(result.platform_ids)) == result.sampled == 17
+    assert Counter(pid[:10] for pid in result.platform_ids) == {"2024-01-01": 8, "2024-01-02": 8, "2024-01-03": 1}
+
+
+def test_exclude_label(db):
+    first = sample_posts(db, "set1", per_bucket=10, stratify="day")
+    second = sample_posts(db, "set2", per_bucket=10, stratify="day", exclude_label="set1")
+    assert not set(first.platform_ids) & set(second.platform_ids)
+    # 2 posts of the second day are left, the post of the third day is in the first sample
+    assert Counter(pid[:10] for pid in second.platform_ids) == {"2024-01-01": 10, "2024-01-02": 2}
+
+
+def test_dry_run_does_not_write(db):
+    result = sample_posts(db, "set1", per_bucket=3, stratify="day", exclude_label="other", dry=True)
+    assert result.sampled == 7 and result.labelled == 0
+    with db.get_session() as session:
+        assert not inspect(session.connection()).has_table(POST_LABELS.name)
+    assert not _labelled(db, "set1")
+
+
+def test_split_quotas():
+    quotas = split_quotas({"a": 10, "b": 10, "c": 10}, 7)
+    assert sum(quotas.values()) == 7 and sorted(quotas.values()) == [2, 2, 3]
+    assert split_quotas({}, 7) == {}
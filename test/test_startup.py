@@ -0,0 +1,28 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# modules that no command needs at startup
+HEAVY_MODULES = ["googleapiclient", "twscrape", "tiktok_research_api_python", "src.platform_orchestration",
+                 "src.clients.instances.youtube_client", "big5_databases.databases.db_merge",
+                 "big5_databases.commands"]
+
+_PROBE = """
+import json, sys
+sys.argv = ["main.py", "status"]
+import main
+print(json.dumps({"modules": list(sys.modules)}))
+"""
+
+
+def test_cli_import_is_light():
+    pytest.importorskip("big5_databases")
+    pytest.importorskip("typer")
+    out = subprocess.run([sys.executable, "-c", _PROBE], cwd=Path(__file__).parent.parent,
+                         capture_output=True, text=True, check=True).stdout
+    probe = json.loads(out.strip().splitlines()[-1])
+    loaded = [m for m in HEAVY_MODULES if m in probe["modules"]]
+    assert not loaded, f"imported at startup: {loaded}"
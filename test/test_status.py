@@ -0,0 +1,113 @@
+import sqlite3
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("big5_databases")
+
+from src.post_counter import read_post_counter
+from src.status import (DatabaseStatusCache, POST_TABLE, TASK_TABLE, TASK_STATUS_TYPES, scan_databases,
+                        database_status_row)
+
+
+def _create_db(db_path: Path, platform: str, posts: int, tasks: dict[str, int]) -> Path:
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE {POST_TABLE} (id INTEGER PRIMARY KEY, platform TEXT)")
+    conn.execute(f"CREATE TABLE {TASK_TABLE} (id INTEGER PRIMARY KEY, platform TEXT, status TEXT)")
+    conn.executemany(f"INSERT INTO {POST_TABLE} (platform) VALUES (?)", [(platform,)] * posts)
+    conn.executemany(f"INSERT INTO {TASK_TABLE} (platform, status) VALUES (?, ?)",
+                     [(platform, status) for status, num in tasks.items() for _ in range(num)])
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _manager(platform: str, db_path: Path) -> SimpleNamespace:
+    return SimpleNamespace(platform_name=platform, post_insert_callbacks=[],
+                           platform_db=SimpleNamespace(db_config=SimpleNamespace(
+                               db_connection=SimpleNamespace(db_path=db_path))))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    youtube = _create_db(tmp_path / "youtube.sqlite", "youtube", 3, {"done": 2, "init": 1})
+    return DatabaseStatusCache(SimpleNamespace(platform_managers={"youtube": _manager("youtube", youtube)}))
+
+
+def test_refresh_and_inserted_posts(cache):
+    assert cache.status() == {"computed_at": None, "databases": []}
+    cache.refresh()
+    row, = cache.status()["databases"]
+    assert (row["platform"], row["total"], row["done"], row["init"]) == ("youtube", 3, 2, 1)
+
+    manager = SimpleNamespace(platform_name="youtube")
+    cache.on_posts_inserted(manager, SimpleNamespace(added_posts=[1, 2]))
+    # posts of a platform without a row are ignored
+    cache.on_posts_inserted(SimpleNamespace(platform_name="twitter"), SimpleNamespace(added_posts=[1]))
+    assert [r["total"] for r in cache.status()["databases"]] == [5]
+
+
+def test_status_without_tasks(cache):
+    cache.refresh()
+    row, = cache.status(task_status=False)["databases"]
+    assert not set(TASK_STATUS_TYPES) & set(row)
+    # the cached row keeps the task states
+    assert cache.status()["databases"][0]["done"] == 2
+
+
+def test_reconcile_installs_the_counter(cache, tmp_path):
+    db_path = tmp_path / "youtube.sqlite"
+    cache.refresh()
+    cache.on_posts_inserted(SimpleNamespace(platform_name="youtube"), SimpleNamespace(added_posts=[1]))
+    cache.reconcile()
+    assert cache.reconciled_at
+    with sqlite3.connect(db_path) as conn:
+        assert read_post_counter(conn) == 3
+    # the next refresh reads the counter
+    cache.refresh()
+    assert cache.status()["databases"][0]["total"] == 3
+
+
+def test_reconcile_waits_for_the_write_lock(cache, tmp_path, caplog):
+    cache.busy_timeout = 0.05
+    writer = sqlite3.connect(tmp_path / "youtube.sqlite", isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        cache.reconcile()
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+    assert "Could not reconcile the post counter of youtube" in caplog.text
+    with sqlite3.connect(tmp_path / "youtube.sqlite") as conn:
+        assert read_post_counter(conn) is None
+
+
+def test_scan_databases_skips_bad_databases(tmp_path, caplog):
+    youtube = _create_db(tmp_path / "youtube.sqlite", "youtube", 4, {"done": 1})
+    twitter = _create_db(tmp_path / "twitter.sqlite", "twitter", 2, {"paused": 2, "aborted": 1})
+    missing = tmp_path / "missing.sqlite"
+
+    rows = list(scan_databases([(None, youtube), (None, missing), (None, twitter)], max_workers=3))
+    # in the order they are done
+    assert sorted((r["platform"], r["total"], r["path"]) for r in rows) == [("twitter", 2, str(twitter)),
+                                                                           ("youtube", 4, str(youtube))]
+    assert {r["platform"]: (r["done"], r["paused"], r["aborted"]) for r in rows} == {"youtube": (1, 0, 0),
+                                                                                     "twitter": (0, 2, 1)}
+    assert f"Could not compute the status of {missing}" in caplog.text
+    assert not missing.exists()
+
+
+def test_database_status_row(tmp_path):
+    db_path = _create_db(tmp_path / "posts.sqlite", "youtube", 3, {"init": 1})
+    # fast: the max rowid, without a post counter or sqlite_stat1
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(f"DELETE FROM {POST_TABLE} WHERE id = 1")
+    assert database_status_row(db_path, fast=True)["total"] == 3
+    row = database_status_row(db_path, "given", task_status=False)
+    assert (row["platform"], row["total"]) == ("given", 2) and "init" not in row
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(f"INSERT INTO {TASK_TABLE} (platform, status) VALUES ('twitter', 'done')")
+    with pytest.raises(ValueError):
+        database_status_row(db_path)
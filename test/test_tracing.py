@@ -0,0 +1,14 @@
+from src.tracing import summarize_traces
+
+
+def test_summarize_traces():
+    traces = [{"platform": "youtube", "pages": [[0.2, 1000], [0.4, 1200]], "collect": 0.6, "convert": 0.1,
+               "insert": 0.05, "sleep": 1.0} for _ in range(10)]
+    traces.append({"platform": "tiktok", "pages": [], "collect": 2.0})
+    rows = {(r["platform"], r["phase"]): r for r in summarize_traces(traces)}
+
+    assert rows[("youtube", "collect")]["p50"] == 0.6
+    assert rows[("youtube", "page")]["n"] == 20
+    assert rows[("youtube", "page")]["p95"] == 0.4
+    assert rows[("tiktok", "insert")]["total"] == 0
+    assert rows[("tiktok", "page")]["n"] == 0